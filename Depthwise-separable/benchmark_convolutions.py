@@ -0,0 +1,200 @@
+import csv
+import json
+import argparse
+import itertools
+from time import perf_counter
+
+import numpy as np
+import torch
+from torch import nn
+from torch.profiler import profile, record_function, ProfilerActivity
+from torch.utils.flop_counter import FlopCounterMode
+
+from models import Net, DepthwiseSeparableConv, DepthwiseSeparableNet
+
+# Сети рассчитаны только на вход 28x28 (fc1 ждет 8 * 7 * 7 признаков)
+NET_RESOLUTION = 28
+MEMORY_FORMATS = {'contiguous': torch.contiguous_format, 'channels_last': torch.channels_last}
+# Категории времени в профиле
+CATEGORIES = ['depthwise', 'pointwise', 'conv', 'linear', 'pool', 'other']
+
+
+def build_targets(names, channels):
+    """Объекты замера: (имя, число каналов, модуль, каналы входа, только 28x28)"""
+    targets = []
+    for name in names:
+        if name == 'Net':
+            targets.append((name, 8, Net(), 1, True))
+        elif name == 'DepthwiseSeparableNet':
+            targets.append((name, 8, DepthwiseSeparableNet(), 1, True))
+        elif name == 'Conv2d':
+            # Обычная свертка 3x3 того же размера, что DepthwiseSeparableConv, для сравнения
+            targets += [(name, c, nn.Conv2d(c, c, kernel_size=3, padding=1), c, False) for c in channels]
+        elif name == 'DepthwiseSeparableConv':
+            targets += [(name, c, DepthwiseSeparableConv(c, c, kernel_size=3, padding=1), c, False) for c in channels]
+    return targets
+
+
+def category(name, module):
+    """Категория модуля для профиля по его роли в сети"""
+    if isinstance(module, nn.Conv2d):
+        role = name.rsplit('.', 1)[-1]
+        return role if role in ('depthwise', 'pointwise') else 'conv'
+    if isinstance(module, nn.Linear):
+        return 'linear'
+    if isinstance(module, nn.MaxPool2d):
+        return 'pool'
+    return None
+
+
+def instrument(model):
+    """Хуки, оборачивающие forward листовых модулей в record_function('category::...')"""
+    handles = []
+    for name, module in model.named_modules():
+        label = category(name, module)
+        if label is None:
+            continue
+
+        def pre_hook(module, inputs, label=label):
+            module._record = record_function(f'category::{label}')
+            module._record.__enter__()
+
+        def hook(module, inputs, output):
+            module._record.__exit__(None, None, None)
+
+        handles.append(module.register_forward_pre_hook(pre_hook))
+        handles.append(module.register_forward_hook(hook))
+    return handles
+
+
+def profile_categories(model, batch, iterations):
+    """Время по категориям операций (мс на батч) по torch.profiler"""
+    handles = instrument(model)
+    try:
+        with torch.inference_mode(), profile(activities=[ProfilerActivity.CPU]) as profiler:
+            with record_function('category::total'):
+                for _ in range(iterations):
+                    model(batch)
+    finally:
+        for handle in handles:
+            handle.remove()
+
+    # Процессорное время самих категорий (cpu_time_total включает вложенные операции aten)
+    times = {event.key.split('::', 1)[1]: event.cpu_time_total / 1000 / iterations
+             for event in profiler.key_averages() if event.key.startswith('category::')}
+    total = times.pop('total', 0.0)
+    result = {label: round(times.get(label, 0.0), 4) for label in CATEGORIES[:-1]}
+    result['other'] = round(max(total - sum(result.values()), 0.0), 4)
+    return result
+
+
+def count_flops(model, sample):
+    """FLOP на одно изображение (умножение и сложение считаются отдельно)"""
+    counter = FlopCounterMode(display=False)
+    with torch.inference_mode(), counter:
+        model(sample)
+    return counter.get_total_flops()
+
+
+def measure(model, batch, warmup, repeat, iterations):
+    """Задержка прямого прохода: прогрев, затем repeat замеров по iterations проходов"""
+    with torch.inference_mode():
+        for _ in range(warmup):
+            model(batch)
+        timings = []
+        for _ in range(repeat):
+            start_time = perf_counter()
+            for _ in range(iterations):
+                model(batch)
+            timings.append((perf_counter() - start_time) / iterations)
+    return np.array(timings)
+
+
+def run(args):
+    default_threads = torch.get_num_threads()
+    results = []
+    skipped = set()
+
+    for name, channels, model, in_channels, fixed in build_targets(args.models, args.channels):
+        model.eval()
+        params = sum(p.numel() for p in model.parameters())
+        for resolution in args.resolutions:
+            if fixed and resolution != NET_RESOLUTION:
+                skipped.add(name)
+                continue
+            flops = count_flops(model, torch.zeros(1, in_channels, resolution, resolution))
+
+            for batch_size, threads, memory_format in itertools.product(args.batch_sizes, args.threads,
+                                                                        args.memory_formats):
+                torch.set_num_threads(threads if threads > 0 else default_threads)
+                layout = MEMORY_FORMATS[memory_format]
+                model = model.to(memory_format=layout)
+                batch = torch.randn(batch_size, in_channels, resolution, resolution).contiguous(memory_format=layout)
+
+                timings = measure(model, batch, args.warmup, args.repeat, args.iterations)
+                median = float(np.median(timings))
+                result = {
+                    'model': name,
+                    'channels': channels,
+                    'resolution': resolution,
+                    'batch_size': batch_size,
+                    'threads': torch.get_num_threads(),
+                    'memory_format': memory_format,
+                    'params': params,
+                    'flops_per_image': flops,
+                    'latency_ms': round(median * 1000, 4),
+                    'latency_p90_ms': round(float(np.percentile(timings, 90)) * 1000, 4),
+                    'throughput': round(batch_size / median, 1),
+                    'gflops_per_sec': round(flops * batch_size / median / 1e9, 3),
+                }
+                if args.profile:
+                    result.update({f'{label}_ms': value for label, value in
+                                   profile_categories(model, batch, args.iterations).items()})
+                results.append(result)
+                print(f"{name:<24} c={channels:<4} {resolution:>4}px b={batch_size:<4} t={result['threads']:<2} "
+                      f"{memory_format:<13} {result['latency_ms']:>10.4f} мс {result['throughput']:>12.1f} изобр./с")
+
+        model.to(memory_format=torch.contiguous_format)
+
+    torch.set_num_threads(default_threads)
+    for name in sorted(skipped):
+        print(f"{name}: замер только на {NET_RESOLUTION}x{NET_RESOLUTION}, остальные разрешения пропущены")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Скорость инференса обычных и depthwise-separable сверток')
+    parser.add_argument('--models', nargs='+', choices=['Net', 'DepthwiseSeparableNet', 'Conv2d', 'DepthwiseSeparableConv'],
+                        default=['Net', 'DepthwiseSeparableNet', 'Conv2d', 'DepthwiseSeparableConv'])
+    parser.add_argument('--channels', type=int, nargs='+', default=[8, 32, 128],
+                        help='Каналы для отдельных сверток (у сетей - как в модели)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64, 256])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 0], help='Потоки torch (0 - по умолчанию)')
+    parser.add_argument('--memory-formats', nargs='+', choices=list(MEMORY_FORMATS), default=list(MEMORY_FORMATS))
+    parser.add_argument('--resolutions', type=int, nargs='+', default=[28, 56, 112],
+                        help='Разрешения входа (сети - только 28)')
+    parser.add_argument('--warmup', type=int, default=10, help='Прогревочных проходов')
+    parser.add_argument('--repeat', type=int, default=10, help='Количество замеров')
+    parser.add_argument('--iterations', type=int, default=20, help='Проходов в одном замере')
+    parser.add_argument('--profile', action='store_true',
+                        help='Время по операциям (depthwise, pointwise, conv, linear) через torch.profiler')
+    parser.add_argument('--csv', help='Путь к CSV-файлу с результатами')
+    parser.add_argument('--json', help='Путь к JSON-файлу с результатами')
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    results = run(args)
+
+    if args.csv and results:
+        fields = list(dict.fromkeys(field for result in results for field in result))
+        with open(args.csv, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({'torch': torch.__version__, 'results': results}, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
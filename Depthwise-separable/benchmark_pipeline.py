@@ -0,0 +1,90 @@
+import os
+import json
+import argparse
+
+import torch
+from torch.utils.data import DataLoader
+from torchvision import datasets, transforms
+
+from models import build_model
+from data_pipeline import TensorMNIST, BatchAugment, make_loader
+from training import train_model
+
+
+def pil_loaders(path, batch_size):
+    """Прежний конвейер ноутбука: аугментация PIL по одному изображению в одном процессе"""
+    transform_basic = transforms.Compose([
+        transforms.ToTensor(),
+        transforms.Normalize((0.5,), (0.5,))
+    ])
+    transform_augmented = transforms.Compose([
+        transforms.RandomRotation(10),
+        transforms.RandomAffine(0, translate=(0.1, 0.1)),
+        transforms.ToTensor(),
+        transforms.Normalize((0.5,), (0.5,))
+    ])
+    trainset = datasets.MNIST(path, download=True, train=True, transform=transform_augmented)
+    testset = datasets.MNIST(path, download=True, train=False, transform=transform_basic)
+    return (DataLoader(trainset, batch_size=batch_size, shuffle=True),
+            DataLoader(testset, batch_size=batch_size, shuffle=False))
+
+
+def tensor_loaders(path, batch_size, workers):
+    trainset = TensorMNIST(path, train=True, augment=BatchAugment(degrees=10, translate=(0.1, 0.1)))
+    testset = TensorMNIST(path, train=False)
+    return (make_loader(trainset, batch_size=batch_size, shuffle=True, workers=workers),
+            make_loader(testset, batch_size=batch_size, shuffle=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Время загрузки и вычислений при обучении: PIL и аугментация батчем')
+    parser.add_argument('--data', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'temp'),
+                        help='Каталог MNIST')
+    parser.add_argument('--architecture', default='DepthwiseSeparableNet', choices=['Net', 'DepthwiseSeparableNet'])
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2],
+                        help='Процессы загрузки для батчевого конвейера')
+    parser.add_argument('--skip-pil', action='store_true', help='Не замерять прежний конвейер')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Путь к JSON-файлу с результатами (по умолчанию - stdout)')
+    args = parser.parse_args()
+
+    configurations = [] if args.skip_pil else [('pil', 0)]
+    configurations += [('tensor', workers) for workers in args.workers]
+
+    results = []
+    for pipeline, workers in configurations:
+        if pipeline == 'pil':
+            trainloader, testloader = pil_loaders(args.data, args.batch_size)
+        else:
+            trainloader, testloader = tensor_loaders(args.data, args.batch_size, workers)
+
+        torch.manual_seed(args.seed)
+        net = build_model(args.architecture)
+        accuracy, training_time, timings = train_model(net, trainloader, testloader,
+                                                       epochs=args.epochs, log_every=0)
+        results.append({
+            'pipeline': pipeline,
+            'workers': workers,
+            'epochs': args.epochs,
+            'accuracy': round(accuracy, 2),
+            'training_time': round(training_time, 2),
+            'load_time': round(timings['load'], 2),
+            'compute_time': round(timings['compute'], 2),
+            'load_share': round(timings['load'] / (timings['load'] + timings['compute']), 3),
+            'epoch_times': [{name: round(value, 2) for name, value in epoch.items()} for epoch in timings['epochs']],
+        })
+        print(f"{pipeline} (workers={workers}): точность {accuracy:.2f}%, время {training_time:.1f}с "
+              f"(загрузка {timings['load']:.1f}с, вычисления {timings['compute']:.1f}с)")
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import os
+import json
+import argparse
+import tempfile
+from time import perf_counter
+
+import cv2
+import numpy as np
+import torch
+
+from models import build_model
+from recognizer import DigitRecognizer
+
+
+def recognize_per_contour(image, model_path):
+    """Прежний recognize_digits: загрузка чекпоинта на каждый вызов и прямой проход на каждый контур"""
+    checkpoint = torch.load(model_path, map_location='cpu')
+    model = build_model(checkpoint['model_architecture'])
+    model.load_state_dict(checkpoint['model_state_dict'])
+    model.eval()
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    contours = sorted(contours, key=lambda c: cv2.boundingRect(c)[0])
+
+    results = []
+    for cnt in contours:
+        x, y, w, h = cv2.boundingRect(cnt)
+        digit = binary[y:y+h, x:x+w]
+
+        size = max(w, h) + 20
+        square = np.zeros((size, size), dtype=np.uint8)
+        x_offset = (size - w) // 2
+        y_offset = (size - h) // 2
+        square[y_offset:y_offset+h, x_offset:x_offset+w] = digit
+
+        digit_resized = cv2.resize(square, (28, 28))
+        digit_normalized = digit_resized.astype(np.float32) / 255.0
+        digit_normalized = (digit_normalized - 0.5) / 0.5
+
+        tensor_img = torch.from_numpy(digit_normalized).unsqueeze(0).unsqueeze(0).float()
+        with torch.no_grad():
+            output = model(tensor_img)
+            results.append(torch.argmax(output, dim=1).item())
+    return results
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start_time = perf_counter()
+        result = function()
+        timings.append(perf_counter() - start_time)
+    return float(np.median(timings)), result
+
+
+def main():
+    base = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Скорость распознавания цифр: цикл по контурам и батч')
+    parser.add_argument('--image', default=os.path.join(base, '0-9.png'), help='Изображение с цифрами')
+    parser.add_argument('--model', help='Путь к best_model.pth (по умолчанию - случайные веса, '
+                                        'на скорость они не влияют)')
+    parser.add_argument('--architecture', default='DepthwiseSeparableNet', help='Архитектура для случайных весов')
+    parser.add_argument('--images', type=int, default=50, help='Количество изображений в пакете')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 0], help='Потоки torch (0 - по умолчанию)')
+    parser.add_argument('--repeat', type=int, default=5, help='Количество повторов замера')
+    parser.add_argument('--output', help='Путь к JSON-файлу с результатами (по умолчанию - stdout)')
+    args = parser.parse_args()
+
+    image = cv2.imread(args.image)
+    if image is None:
+        print(f"Ошибка: не удалось загрузить {args.image}")
+        return
+    images = [image] * args.images
+
+    with tempfile.TemporaryDirectory() as folder:
+        model_path = args.model
+        if model_path is None:
+            model = build_model(args.architecture)
+            model_path = os.path.join(folder, 'random_model.pth')
+            torch.save({'model_state_dict': model.state_dict(),
+                        'model_architecture': args.architecture,
+                        'input_shape': (1, 1, 28, 28)}, model_path)
+
+        default_threads = torch.get_num_threads()
+        results = []
+        for threads in args.threads:
+            torch.set_num_threads(threads if threads > 0 else default_threads)
+            recognizer = DigitRecognizer(model_path)
+
+            loop_time, expected = measure(lambda: [recognize_per_contour(img, model_path) for img in images],
+                                          args.repeat)
+            image_time, per_image = measure(lambda: [recognizer.recognize(img)[1] for img in images], args.repeat)
+            batch_time, batched = measure(lambda: [digits for _, digits in recognizer.recognize_many(images)],
+                                          args.repeat)
+
+            digits = sum(len(result) for result in expected)
+            results.append({
+                'threads': torch.get_num_threads(),
+                'images': len(images),
+                'digits': digits,
+                'per_contour_digits_per_sec': round(digits / loop_time, 1),
+                'batched_per_image_digits_per_sec': round(digits / image_time, 1),
+                'batched_all_digits_per_sec': round(digits / batch_time, 1),
+                'speedup': round(loop_time / batch_time, 2),
+                'same_predictions': per_image == expected and batched == expected,
+            })
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import math
+
+import torch
+import torch.nn.functional as F
+from torch.utils.data import Dataset, DataLoader, BatchSampler, RandomSampler, SequentialSampler
+from torchvision import datasets
+
+# Нормализация как в transforms.Normalize((0.5,), (0.5,))
+MEAN = 0.5
+STD = 0.5
+
+
+class BatchAugment:
+    """Случайный поворот и сдвиг сразу для всего батча (B, 1, H, W) со значениями в [0, 1].
+
+    Заменяет RandomRotation(degrees) + RandomAffine(0, translate) из torchvision: обе операции
+    собираются в одну аффинную матрицу на изображение, и батч пересэмплируется одним вызовом
+    grid_sample. Углы и сдвиги распределены так же (равномерно, сдвиг округляется до пикселя),
+    фон за краем - ноль, интерполяция по умолчанию - ближайший сосед, как у torchvision"""
+
+    def __init__(self, degrees=10, translate=(0.1, 0.1), mode='nearest'):
+        self.degrees = degrees
+        self.translate = translate
+        self.mode = mode
+
+    def __call__(self, images):
+        batch, _, height, width = images.shape
+        angle = torch.empty(batch).uniform_(-self.degrees, self.degrees) * (math.pi / 180)
+        shift_x = torch.empty(batch).uniform_(-self.translate[0] * width, self.translate[0] * width).round()
+        shift_y = torch.empty(batch).uniform_(-self.translate[1] * height, self.translate[1] * height).round()
+
+        # affine_grid переводит координаты выхода в координаты входа (нормированные в [-1, 1]),
+        # поэтому матрица обратная: сначала убираем сдвиг, затем поворачиваем обратно
+        cos, sin = torch.cos(angle), torch.sin(angle)
+        shift_x = shift_x * (2 / width)
+        shift_y = shift_y * (2 / height)
+        theta = torch.stack([
+            torch.stack([cos, sin, -(cos * shift_x + sin * shift_y)], dim=1),
+            torch.stack([-sin, cos, sin * shift_x - cos * shift_y], dim=1),
+        ], dim=1)
+
+        grid = F.affine_grid(theta, images.shape, align_corners=False)
+        return F.grid_sample(images, grid, mode=self.mode, padding_mode='zeros', align_corners=False)
+
+
+class TensorMNIST(Dataset):
+    """MNIST целиком в памяти одним тензором uint8 (N, 28, 28).
+
+    Индексируется списком индексов и сразу возвращает батч (images, labels):
+    выборка, перевод во float, аугментация и нормализация - по одной операции на батч"""
+
+    def __init__(self, path, train=True, augment=None, download=True):
+        dataset = datasets.MNIST(path, train=train, download=download)
+        self.data = dataset.data
+        self.targets = dataset.targets
+        self.augment = augment
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, indices):
+        indices = torch.as_tensor(indices)
+        images = self.data[indices].unsqueeze(1).float().div_(255)
+        if self.augment is not None:
+            images = self.augment(images)
+        return images.sub_(MEAN).div_(STD), self.targets[indices]
+
+
+def make_loader(dataset, batch_size=64, shuffle=True, workers=0, persistent=True):
+    """Загрузчик батчей TensorMNIST.
+
+    workers=0 - батчи готовятся в основном процессе; workers>0 - в отдельных процессах,
+    persistent=True сохраняет их между эпохами (без повторного запуска и копирования данных)"""
+    sampler = RandomSampler(dataset) if shuffle else SequentialSampler(dataset)
+    return DataLoader(dataset, sampler=BatchSampler(sampler, batch_size, drop_last=False), batch_size=None,
+                      num_workers=workers, persistent_workers=persistent and workers > 0)
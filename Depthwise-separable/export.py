@@ -0,0 +1,214 @@
+import os
+import copy
+import json
+import inspect
+import argparse
+from time import perf_counter
+
+import numpy as np
+import torch
+from torch import nn
+from torchvision import datasets
+from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+from inference import InferenceEngine, load_model, METADATA_FILE
+
+INPUT_SHAPE = (1, 1, 28, 28)
+VARIANTS = ['eager', 'eager_channels_last', 'torchscript', 'torchscript_channels_last',
+            'int8_dynamic', 'int8_static', 'onnx', 'onnx_int8']
+
+
+def load_mnist(path, train):
+    """MNIST одним массивом (N, 1, 28, 28) с той же нормализацией, что при обучении"""
+    dataset = datasets.MNIST(path, download=True, train=train)
+    images = (dataset.data.numpy().astype(np.float32) / 255.0 - 0.5) / 0.5
+    return images[:, None], dataset.targets.numpy()
+
+
+def select_quantized_engine():
+    """Бэкенд квантованных операций: x86 (fbgemm + onednn) на новых версиях, иначе fbgemm или qnnpack"""
+    for engine in ('x86', 'fbgemm', 'qnnpack'):
+        if engine in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = engine
+            return engine
+    raise RuntimeError('квантованные операции недоступны в этой сборке torch')
+
+
+def save_torchscript(module, path, metadata):
+    torch.jit.save(module, path, _extra_files={METADATA_FILE: json.dumps(metadata)})
+
+
+def export_torchscript(model, path, channels_last=False):
+    """Замороженная TorchScript-модель; conv+relu сливаются при загрузке (optimize_for_inference)"""
+    model = copy.deepcopy(model).eval()
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+    module = torch.jit.freeze(torch.jit.script(model))
+    save_torchscript(module, path, {'channels_last': channels_last, 'optimize': True})
+
+
+def export_int8_dynamic(model, path):
+    """Динамическое квантование: веса Linear в int8, активации квантуются на лету (свертки остаются float)"""
+    # Упакованные веса Linear зависят от бэкенда так же, как при статическом квантовании
+    engine = select_quantized_engine()
+    quantized = quantize_dynamic(copy.deepcopy(model).eval(), {nn.Linear}, dtype=torch.qint8)
+    save_torchscript(torch.jit.freeze(torch.jit.script(quantized)), path,
+                     {'quantization': 'dynamic', 'engine': engine})
+
+
+def export_int8_static(model, path, calibration, batch_size):
+    """Статическое квантование в режиме FX: conv+relu и linear+relu сливаются автоматически
+    (в т.ч. F.relu в forward), диапазоны активаций берутся по калибровочным изображениям"""
+    engine = select_quantized_engine()
+    example = (torch.from_numpy(calibration[:1]),)
+    prepared = prepare_fx(copy.deepcopy(model).eval(), get_default_qconfig_mapping(engine), example)
+    with torch.no_grad():
+        for start in range(0, len(calibration), batch_size):
+            prepared(torch.from_numpy(calibration[start:start + batch_size]))
+    quantized = convert_fx(prepared)
+    save_torchscript(torch.jit.freeze(torch.jit.script(quantized)), path,
+                     {'quantization': 'static', 'engine': engine})
+
+
+def export_onnx(model, path):
+    # Экспорт через TorchScript: с torch 2.9 по умолчанию dynamo=True, а параметр появился только в torch 2.5
+    # (до этого экспортер и так прежний)
+    options = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+    torch.onnx.export(copy.deepcopy(model).eval(), torch.zeros(INPUT_SHAPE), path,
+                      input_names=['input'], output_names=['logits'],
+                      dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+                      opset_version=17, **options)
+
+
+def export_onnx_int8(onnx_path, path):
+    from onnxruntime.quantization import quantize_dynamic as quantize_onnx, QuantType
+
+    quantize_onnx(onnx_path, path, weight_type=QuantType.QInt8)
+
+
+def export_variants(model_path, folder, variants, calibration, batch_size):
+    """Экспорт выбранных вариантов; возвращает имя варианта -> (путь, channels_last)"""
+    model = load_model(model_path)
+    name = model.__class__.__name__
+    os.makedirs(folder, exist_ok=True)
+
+    def target(suffix):
+        return os.path.join(folder, name + suffix)
+
+    paths = {}
+    for variant in variants:
+        if variant == 'eager':
+            paths[variant] = (model_path, False)
+        elif variant == 'eager_channels_last':
+            paths[variant] = (model_path, True)
+        elif variant == 'torchscript':
+            export_torchscript(model, target('.pt'))
+            paths[variant] = (target('.pt'), False)
+        elif variant == 'torchscript_channels_last':
+            export_torchscript(model, target('_channels_last.pt'), channels_last=True)
+            paths[variant] = (target('_channels_last.pt'), True)
+        elif variant == 'int8_dynamic':
+            export_int8_dynamic(model, target('_int8_dynamic.pt'))
+            paths[variant] = (target('_int8_dynamic.pt'), False)
+        elif variant == 'int8_static':
+            export_int8_static(model, target('_int8_static.pt'), calibration, batch_size)
+            paths[variant] = (target('_int8_static.pt'), False)
+        elif variant == 'onnx':
+            export_onnx(model, target('.onnx'))
+            paths[variant] = (target('.onnx'), False)
+        elif variant == 'onnx_int8':
+            if not os.path.exists(target('.onnx')):
+                export_onnx(model, target('.onnx'))
+            export_onnx_int8(target('.onnx'), target('_int8.onnx'))
+            paths[variant] = (target('_int8.onnx'), False)
+    return paths
+
+
+def measure(function, warmup, repeat):
+    for _ in range(warmup):
+        function()
+    timings = []
+    for _ in range(repeat):
+        start_time = perf_counter()
+        function()
+        timings.append(perf_counter() - start_time)
+    return float(np.median(timings))
+
+
+def evaluate(engine, images, labels, batch_size, warmup, repeat):
+    """Точность на тестовом наборе, задержка на одном изображении и пропускная способность батчами"""
+    predictions = np.concatenate([engine.predict(images[start:start + batch_size])
+                                  for start in range(0, len(images), batch_size)])
+    latency = measure(lambda: engine.predict(images[:1]), warmup, repeat)
+    batch = images[:batch_size]
+    batch_time = measure(lambda: engine.predict(batch), warmup, repeat)
+    return {
+        'accuracy': round(100 * float(np.mean(predictions == labels)), 2),
+        'latency_ms': round(latency * 1000, 4),
+        'throughput': round(len(batch) / batch_time, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Экспорт модели (TorchScript, ONNX, int8) и сравнение вариантов')
+    parser.add_argument('--model', required=True, help='Путь к best_model.pth')
+    parser.add_argument('--data', help='Каталог MNIST (по умолчанию - каталог модели)')
+    parser.add_argument('--output', help='Каталог экспортированных моделей (по умолчанию - exported рядом с моделью)')
+    parser.add_argument('--variants', nargs='+', default=VARIANTS, choices=VARIANTS)
+    parser.add_argument('--threads', type=int, default=0, help='Потоки инференса (0 - по умолчанию)')
+    parser.add_argument('--batch-size', type=int, default=256, help='Размер батча для пропускной способности')
+    parser.add_argument('--calibration', type=int, default=2000,
+                        help='Изображений обучающего набора для калибровки статического int8')
+    parser.add_argument('--warmup', type=int, default=5, help='Прогревочных прогонов')
+    parser.add_argument('--repeat', type=int, default=50, help='Количество повторов замера')
+    parser.add_argument('--min-accuracy', type=float, default=98.0, help='Минимально допустимая точность (%)')
+    parser.add_argument('--report', help='Путь к JSON-файлу с результатами')
+    args = parser.parse_args()
+
+    base = os.path.dirname(os.path.abspath(args.model))
+    data = args.data or base
+    folder = args.output or os.path.join(base, 'exported')
+
+    test_images, test_labels = load_mnist(data, train=False)
+    calibration = None
+    if 'int8_static' in args.variants:
+        calibration = load_mnist(data, train=True)[0][:args.calibration]
+
+    paths = export_variants(args.model, folder, args.variants, calibration, args.batch_size)
+
+    results = []
+    for variant, (path, channels_last) in paths.items():
+        engine = InferenceEngine(path, threads=args.threads, channels_last=channels_last)
+        result = {'variant': variant, 'path': path, 'size_kb': round(os.path.getsize(path) / 1024, 1)}
+        result.update(evaluate(engine, test_images, test_labels, args.batch_size, args.warmup, args.repeat))
+        results.append(result)
+
+    # Потеря точности относительно исходной float-модели
+    reference = next((result['accuracy'] for result in results if result['variant'] == 'eager'), None)
+    for result in results:
+        result['accuracy_drop'] = None if reference is None else round(reference - result['accuracy'], 2)
+
+    print(f"{'Вариант':<26} {'Размер, КБ':>10} {'Точность':>9} {'Потеря':>7} {'Задержка, мс':>13} {'Изобр./с':>10}")
+    for result in results:
+        drop = '-' if result['accuracy_drop'] is None else f"{result['accuracy_drop']:.2f}"
+        print(f"{result['variant']:<26} {result['size_kb']:>10.1f} {result['accuracy']:>8.2f}% {drop:>7} "
+              f"{result['latency_ms']:>13.4f} {result['throughput']:>10.1f}")
+
+    # Самый быстрый вариант, не опускающийся ниже допустимой точности
+    passed = [result for result in results if result['accuracy'] >= args.min_accuracy]
+    best = max(passed, key=lambda result: result['throughput']) if passed else None
+    if best is None:
+        print(f"\nНи один вариант не достиг точности {args.min_accuracy:.2f}%")
+    else:
+        print(f"\nРекомендуемый вариант: {best['variant']} ({best['path']})")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as file:
+            json.dump({'min_accuracy': args.min_accuracy, 'threads': torch.get_num_threads(),
+                       'recommended': None if best is None else best['variant'], 'results': results},
+                      file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import os
+import copy
+import json
+import zipfile
+import threading
+
+import numpy as np
+import torch
+
+from models import build_model
+
+# Метаданные, сохраняемые вместе с TorchScript-моделью (_extra_files)
+METADATA_FILE = 'metadata.json'
+
+# Загруженные модели и движки: (абсолютный путь, время изменения файла, ...) -> объект
+_models = {}
+_engines = {}
+_lock = threading.Lock()
+
+
+def load_model(model_path):
+    """Загрузка чекпоинта один раз на процесс; перезаписанный файл загружается заново"""
+    key = (os.path.abspath(model_path), os.path.getmtime(model_path))
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            checkpoint = torch.load(model_path, map_location='cpu')
+            model = build_model(checkpoint['model_architecture'])
+            model.load_state_dict(checkpoint['model_state_dict'])
+            model.eval()
+            _models[key] = model
+    return model
+
+
+class InferenceEngine:
+    """Единый интерфейс predict(batch) для всех вариантов модели:
+    чекпоинт PyTorch (.pth), TorchScript (.pt, в т.ч. int8) и ONNX (.onnx)"""
+
+    def __init__(self, model_path=None, model=None, threads=0, channels_last=False):
+        # Число потоков внутри операций (0 - оставить значение по умолчанию)
+        if threads > 0:
+            torch.set_num_threads(threads)
+        self.threads = threads
+        self.channels_last = channels_last
+        self.session = None
+        self.model = None
+
+        if model is not None:
+            self.kind = 'eager'
+            self.model = model.eval()
+        else:
+            extension = os.path.splitext(model_path)[1].lower()
+            if extension == '.onnx':
+                self.kind = 'onnx'
+                self.session = InferenceEngine._load_onnx(model_path, threads)
+                self.input_name = self.session.get_inputs()[0].name
+            elif extension == '.pt':
+                self.kind = 'torchscript'
+                self.model, metadata = InferenceEngine._load_torchscript(model_path)
+                self.channels_last = metadata.get('channels_last', False)
+            else:
+                self.kind = 'eager'
+                self.model = load_model(model_path)
+
+        if self.kind == 'eager' and self.channels_last:
+            # Копия: to() меняет модуль на месте, а загруженная модель общая для процесса
+            self.model = copy.deepcopy(self.model).to(memory_format=torch.channels_last)
+
+    def _load_torchscript(model_path):
+        key = ('torchscript', os.path.abspath(model_path), os.path.getmtime(model_path))
+        with _lock:
+            if key not in _engines:
+                metadata = InferenceEngine._read_metadata(model_path)
+                # Упакованные веса int8 разворачиваются при загрузке под текущий бэкенд квантованных операций,
+                # поэтому он выставляется до torch.jit.load тем же, что при экспорте (настройка общая для процесса)
+                engine = metadata.get('engine')
+                if engine is not None:
+                    if engine not in torch.backends.quantized.supported_engines:
+                        raise RuntimeError(f"Бэкенд квантованных операций {engine} недоступен в этой сборке torch")
+                    torch.backends.quantized.engine = engine
+                module = torch.jit.load(model_path, map_location='cpu')
+                # Для float-вариантов: слияние conv+relu и перевод операций в MKLDNN при загрузке,
+                # в файле хранится только замороженная модель (оптимизированная не всегда сериализуется)
+                if metadata.get('optimize', False):
+                    module = torch.jit.optimize_for_inference(module)
+                _engines[key] = (module, metadata)
+            return _engines[key]
+
+    def _read_metadata(model_path):
+        """Метаданные TorchScript-модели без ее загрузки: файл - zip-архив, _extra_files лежат в <архив>/extra/"""
+        with zipfile.ZipFile(model_path) as archive:
+            for name in archive.namelist():
+                if name.endswith('/extra/' + METADATA_FILE):
+                    return json.loads(archive.read(name) or '{}')
+        return {}
+
+    def _load_onnx(model_path, threads):
+        key = ('onnx', os.path.abspath(model_path), os.path.getmtime(model_path), threads)
+        with _lock:
+            if key not in _engines:
+                import onnxruntime
+
+                options = onnxruntime.SessionOptions()
+                options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+                if threads > 0:
+                    options.intra_op_num_threads = threads
+                _engines[key] = onnxruntime.InferenceSession(model_path, options,
+                                                             providers=['CPUExecutionProvider'])
+            return _engines[key]
+
+    def logits(self, batch):
+        """Выход сети (N, 10) для батча (N, 1, 28, 28) float32"""
+        if self.session is not None:
+            return self.session.run(None, {self.input_name: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+
+        tensor = torch.from_numpy(np.ascontiguousarray(batch, dtype=np.float32))
+        if self.channels_last:
+            tensor = tensor.contiguous(memory_format=torch.channels_last)
+        with torch.inference_mode():
+            return self.model(tensor).numpy()
+
+    def predict(self, batch):
+        """Классы для батча (N, 1, 28, 28) за один прямой проход"""
+        if len(batch) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return self.logits(batch).argmax(axis=1)
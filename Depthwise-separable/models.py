@@ -0,0 +1,78 @@
+import torch
+from torch import nn
+import torch.nn.functional as F
+
+
+class Net(nn.Module):
+    def __init__(self):
+        super(Net, self).__init__()
+        self.conv1 = nn.Conv2d(1, 8, 5, padding=2)
+        self.pool = nn.MaxPool2d(2, 2)
+        self.conv2 = nn.Conv2d(8, 8, 3, padding=1)
+        self.fc1 = nn.Linear(8 * 7 * 7, 128)
+        self.fc2 = nn.Linear(128, 64)
+        self.fc3 = nn.Linear(64, 10)
+        self.dropout = nn.Dropout(0.25)
+
+    def forward(self, x):
+        x = F.relu(self.conv1(x))
+        x = self.pool(x)
+        x2 = F.relu(self.conv2(x))
+        x = x + x2
+        x = self.pool(x)
+        x = x.reshape(-1, 8 * 7 * 7)
+        x = F.relu(self.fc1(x))
+        x = self.dropout(x)
+        x = F.relu(self.fc2(x))
+        x = self.fc3(x)
+        return x
+
+
+class DepthwiseSeparableConv(nn.Module):
+    def __init__(self, in_channels, out_channels, kernel_size=3, padding=1):
+        super(DepthwiseSeparableConv, self).__init__()
+        self.depthwise = nn.Conv2d(in_channels, in_channels, kernel_size=kernel_size, 
+                                  padding=padding, groups=in_channels)
+        self.pointwise = nn.Conv2d(in_channels, out_channels, kernel_size=1)
+        
+    def forward(self, x):
+        x = self.depthwise(x)
+        x = self.pointwise(x)
+        return x
+
+
+class DepthwiseSeparableNet(nn.Module):
+    def __init__(self):
+        super(DepthwiseSeparableNet, self).__init__()
+        self.conv1 = DepthwiseSeparableConv(1, 8, kernel_size=5, padding=2)
+        self.pool = nn.MaxPool2d(2, 2)
+        self.conv2 = DepthwiseSeparableConv(8, 8, kernel_size=3, padding=1)
+        self.fc1 = nn.Linear(8 * 7 * 7, 128)
+        self.fc2 = nn.Linear(128, 64)
+        self.fc3 = nn.Linear(64, 10)
+        self.dropout = nn.Dropout(0.25)
+
+    def forward(self, x):
+        x = F.relu(self.conv1(x))
+        x = self.pool(x)
+        x2 = F.relu(self.conv2(x))
+        x = x + x2
+        x = self.pool(x)
+        x = x.reshape(-1, 8 * 7 * 7)
+        x = F.relu(self.fc1(x))
+        x = self.dropout(x)
+        x = F.relu(self.fc2(x))
+        x = self.fc3(x)
+        return x
+
+
+# Архитектуры по имени класса, как оно записано в чекпоинте ('model_architecture')
+ARCHITECTURES = {
+    'Net': Net,
+    'DepthwiseSeparableNet': DepthwiseSeparableNet,
+}
+
+
+def build_model(architecture):
+    # Как в исходном recognize_digits: неизвестное имя - обычная сеть
+    return ARCHITECTURES.get(architecture, Net)()
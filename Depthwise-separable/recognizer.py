@@ -0,0 +1,145 @@
+import os
+import argparse
+
+import cv2
+import numpy as np
+
+from inference import InferenceEngine
+
+# Вход сети и нормализация как при обучении: 28x28, Normalize((0.5,), (0.5,))
+INPUT_SIZE = 28
+MEAN = 0.5
+STD = 0.5
+# Поля вокруг цифры: цифра вписывается в квадрат со стороной max(w, h) + PADDING
+PADDING = 20
+
+
+class DigitRecognizer:
+    """Распознавание цифр: все цифры изображения (или нескольких изображений)
+    подготавливаются одним векторным шагом и классифицируются одним батчем"""
+
+    def __init__(self, model_path=None, model=None, threads=0):
+        # Любой вариант модели: .pth, TorchScript .pt (в т.ч. int8) или .onnx
+        self.engine = InferenceEngine(model_path, model=model, threads=threads)
+
+    def find_digits(self, image):
+        """Бинаризация и рамки цифр (x, y, w, h) слева направо"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        boxes = np.array([cv2.boundingRect(cnt) for cnt in contours], dtype=np.int64).reshape(-1, 4)
+        return binary, boxes[np.argsort(boxes[:, 0], kind='stable')]
+
+    def preprocess(self, binary, boxes):
+        """Все цифры изображения в один массив (N, 1, 28, 28) без цикла по контурам.
+
+        Повторяет прежнюю подготовку (вырезка рамки, квадрат с полями, cv2.resize
+        INTER_LINEAR, нормализация), но билинейная выборка делается сразу из binary:
+        пиксели за пределами рамки цифры считаются нулями, как поля квадрата"""
+        count = len(boxes)
+        if count == 0:
+            # Изображение без цифр: пустой батч той же формы, что и для найденных цифр
+            return np.zeros((0, 1, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+
+        x, y, w, h = boxes.T
+        size = np.maximum(w, h) + PADDING
+        scale = size / INPUT_SIZE
+        dst = np.arange(INPUT_SIZE) + 0.5
+
+        # Координаты выборки в квадрате как в cv2.resize, затем сдвиг в координаты изображения
+        source_x = dst[None, :] * scale[:, None] - 0.5 - ((size - w) // 2)[:, None] + x[:, None]
+        source_y = dst[None, :] * scale[:, None] - 0.5 - ((size - h) // 2)[:, None] + y[:, None]
+
+        def neighbours(source, start, length, limit):
+            # Два соседних пикселя по оси (N, 2, 28) и их веса; за рамкой цифры вес нулевой
+            index0 = np.floor(source).astype(np.int64)
+            weight1 = (source - index0).astype(np.float32)
+            index = np.stack([index0, index0 + 1], axis=1)
+            weight = np.stack([1 - weight1, weight1], axis=1)
+            weight *= (index >= start[:, None, None]) & (index < (start + length)[:, None, None])
+            return np.clip(index, 0, limit - 1), weight
+
+        column_index, column_weight = neighbours(source_x, x, w, binary.shape[1])
+        row_index, row_weight = neighbours(source_y, y, h, binary.shape[0])
+
+        # Одна выборка всех нужных пикселей (N, 2, 28, 56) по плоским индексам,
+        # затем интерполяция по строкам и по столбцам
+        flat = (row_index * binary.shape[1])[:, :, :, None] + column_index.reshape(count, 1, 1, -1)
+        values = np.take(binary.ravel(), flat)
+        rows = np.einsum('naij,nai->nij', values, row_weight, dtype=np.float32)
+        batch = np.einsum('nibj,nbj->nij', rows.reshape(count, INPUT_SIZE, 2, INPUT_SIZE), column_weight)
+
+        batch = (batch / 255.0 - MEAN) / STD
+        return batch[:, None].astype(np.float32)
+
+    def predict(self, batch):
+        """Классы для батча (N, 1, 28, 28) за один прямой проход"""
+        return self.engine.predict(batch)
+
+    def recognize(self, image):
+        """Цифры на одном изображении: (изображение с разметкой, список цифр)"""
+        return self.recognize_many([image])[0]
+
+    def recognize_many(self, images):
+        """Цифры на нескольких изображениях: подготовка по изображениям, классификация одним батчем"""
+        prepared = [self.find_digits(image) for image in images]
+        batches = [self.preprocess(binary, boxes) for binary, boxes in prepared]
+        counts = [len(batch) for batch in batches]
+
+        # Сеть вызывается только при наличии цифр; пустые изображения получают пустой список
+        if sum(counts):
+            predictions = np.asarray(self.predict(np.concatenate(batches)))
+        else:
+            predictions = np.zeros(0, dtype=np.int64)
+        # Разбиение общего ответа по изображениям: границы - накопленные количества цифр
+        per_image = np.split(predictions, np.cumsum(counts)[:-1]) if counts else []
+
+        return [(self.draw(image, boxes, digits.tolist()), digits.tolist())
+                for image, (_, boxes), digits in zip(images, prepared, per_image)]
+
+    def draw(self, image, boxes, digits):
+        result_img = image.copy()
+        for (x, y, w, h), digit_pred in zip(boxes.tolist(), digits):
+            cv2.rectangle(result_img, (x, y), (x+w, y+h), (0, 255, 0), 2)
+            cv2.putText(result_img, str(digit_pred), (x, y-10),
+                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+        return result_img
+
+
+def recognize_digits(image_path, model_path, threads=0):
+    """Прежний интерфейс ноутбука: (изображение с разметкой, список цифр)"""
+    image = cv2.imread(image_path)
+    if image is None:
+        print(f"Ошибка: не удалось загрузить {image_path}")
+        return None
+    return DigitRecognizer(model_path, threads=threads).recognize(image)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Распознавание цифр на изображениях')
+    parser.add_argument('images', nargs='+', help='Пути к изображениям')
+    parser.add_argument('--model', required=True, help='Путь к best_model.pth, .pt или .onnx')
+    parser.add_argument('--threads', type=int, default=0, help='Потоки инференса (0 - по умолчанию)')
+    parser.add_argument('--output', help='Каталог для изображений с разметкой')
+    args = parser.parse_args()
+
+    images = []
+    for image_path in args.images:
+        image = cv2.imread(image_path)
+        if image is None:
+            print(f"Ошибка: не удалось загрузить {image_path}")
+            continue
+        images.append((image_path, image))
+
+    recognizer = DigitRecognizer(args.model, threads=args.threads)
+    results = recognizer.recognize_many([image for _, image in images])
+    for (image_path, _), (result_img, digits) in zip(images, results):
+        print(f"{image_path}: {digits}")
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+            cv2.imwrite(os.path.join(args.output, os.path.basename(image_path)), result_img)
+
+
+if __name__ == '__main__':
+    main()
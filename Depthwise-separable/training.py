@@ -0,0 +1,68 @@
+from time import time, perf_counter
+
+import torch
+from torch import nn, optim
+
+
+def evaluate(net, testloader):
+    """Точность (%) на тестовом наборе"""
+    net.eval()
+    correct = 0
+    total = 0
+    with torch.inference_mode():
+        for images, labels in testloader:
+            outputs = net(images)
+            _, predicted = torch.max(outputs, 1)
+            total += labels.size(0)
+            correct += (predicted == labels).sum().item()
+    return 100 * correct / total
+
+
+def train_model(net, trainloader, testloader, epochs=5, learning_rate=0.003, log_every=100):
+    """Обучение как в ноутбуке; дополнительно возвращает разбиение времени эпох
+    на ожидание батча от загрузчика (load) и прямой/обратный проход с шагом оптимизатора (compute)"""
+    criterion = nn.CrossEntropyLoss()
+    optimizer = optim.SGD(net.parameters(), lr=learning_rate, momentum=0.9)
+
+    timings = {'epochs': []}
+    start_time = time()
+
+    for epoch in range(epochs):
+        running_loss = 0.0
+        net.train()
+        load_time = 0.0
+        compute_time = 0.0
+
+        batches = iter(trainloader)
+        i = 0
+        while True:
+            load_start = perf_counter()
+            try:
+                images, labels = next(batches)
+            except StopIteration:
+                break
+            compute_start = perf_counter()
+
+            optimizer.zero_grad()
+            outputs = net(images)
+            loss = criterion(outputs, labels)
+            loss.backward()
+            optimizer.step()
+
+            running_loss += loss.item()
+            load_time += compute_start - load_start
+            compute_time += perf_counter() - compute_start
+            i += 1
+
+            if log_every and i % log_every == 0:
+                print(f'[Эпоха {epoch+1}, шаг {i}] loss: {running_loss/log_every:.3f}')
+                running_loss = 0.0
+
+        timings['epochs'].append({'load': load_time, 'compute': compute_time})
+
+    training_time = time() - start_time
+    timings['load'] = sum(epoch['load'] for epoch in timings['epochs'])
+    timings['compute'] = sum(epoch['compute'] for epoch in timings['epochs'])
+
+    accuracy = evaluate(net, testloader)
+    return accuracy, training_time, timings
@@ -0,0 +1,84 @@
+
+from core.batch_processor import BatchProcessor
+from utils.metrics import METRICS
+from shared.constants import MAX_DIMENSION, BATCH_WORKERS, BATCH_CV_THREADS, OUTPUT_IMAGE_FORMAT
+from shared.load_library import argparse
+from shared.load_library import sys
+
+def print_result(result):
+    """Вывод статуса обработки одного файла"""
+    if result["status"] == "ok":
+        documents = f"документов {result['documents']}, " if result.get("documents", 1) > 1 else ""
+        print(f"[OK]     {result['path']}: {documents}строк {result['count_lines']}, "
+              f"символов {result['count_characters']} ({result['time']:.2f}с)")
+    elif result["status"] == "rejected":
+        print(f"[ОТКЛОНЕН] {result['path']}: {result['error']} ({result['time']:.2f}с)")
+    elif result["status"] == "unreadable":
+        print(f"[НЕ ЧИТАЕТСЯ] {result['path']}: {result['error']}")
+    else:
+        print(f"[ОШИБКА] {result['path']}: {result['error']} ({result['time']:.2f}с)")
+
+def main():
+    """ Пакетная обработка документов без графического интерфейса """
+    parser = argparse.ArgumentParser(description="Пакетная обработка документов")
+    parser.add_argument("inputs", nargs="+", help="Каталоги, glob-шаблоны или пути к изображениям")
+    parser.add_argument("-w", "--workers", type=int, default=BATCH_WORKERS,
+                        help="Количество процессов (0 - по числу ядер CPU)")
+    parser.add_argument("--max-dimension", type=int, default=MAX_DIMENSION,
+                        help="Максимальный размер изображения для поиска углов")
+    parser.add_argument("--cv-threads", type=int, default=BATCH_CV_THREADS,
+                        help="Количество потоков OpenCV в каждом процессе")
+    parser.add_argument("--no-save", action="store_true", help="Не сохранять результаты")
+    parser.add_argument("--image-format", choices=("png", "jpeg", "webp"), default=OUTPUT_IMAGE_FORMAT,
+                        help="Формат сохраняемых изображений")
+    parser.add_argument("--image-quality", type=int,
+                        help="Уровень сжатия PNG (0-9) или качество JPEG/WebP (0-100)")
+    parser.add_argument("--multi", action="store_true",
+                        help="Несколько документов на одной фотографии (каждый сохраняется отдельно)")
+    parser.add_argument("--multiscale", action="store_true",
+                        help="Грубый поиск углов на маленьком изображении и уточнение по окнам в полном разрешении")
+    parser.add_argument("--adaptive-text", action="store_true",
+                        help="Анализ текста в рабочем разрешении по оценке высоты текста (быстрее на больших сканах)")
+    parser.add_argument("--prefilter", action="store_true",
+                        help="Отклонять размытые, темные, пересвеченные и пустые снимки до сегментации")
+    parser.add_argument("--lean", action="store_true",
+                        help="Экономный режим памяти: исходное изображение освобождается, рамки рисуются только при сохранении")
+    parser.add_argument("--cache-dir", help="Каталог кэша углов и рамок текста (повторные фото не обрабатываются заново)")
+    parser.add_argument("--metrics-jsonl", help="Сохранить замеры этапов в формате JSON lines")
+    parser.add_argument("--metrics-prom", help="Сохранить метрики этапов в текстовом формате Prometheus")
+    args = parser.parse_args()
+
+    print("=== ПАКЕТНАЯ ОБРАБОТКА ДОКУМЕНТОВ ===")
+
+    paths = BatchProcessor.collect_paths(args.inputs)
+    if not paths:
+        sys.exit("Изображения не найдены")
+
+    processor = BatchProcessor(workers=args.workers, max_dimension=args.max_dimension,
+                               cv_threads=args.cv_threads, save=not args.no_save,
+                               cache_dir=args.cache_dir, lean=args.lean,
+                               image_format=args.image_format, quality=args.image_quality,
+                               multi=args.multi, multiscale=args.multiscale,
+                               adaptive_text=args.adaptive_text, prefilter=args.prefilter)
+    results, summary = processor.run(paths, callback=print_result)
+
+    print(f"Обработано: {summary['processed']}/{summary['total']}, ошибок: {summary['failed']}")
+    if summary["unreadable"] > 0:
+        print(f"Из них не удалось прочитать: {summary['unreadable']}")
+    if summary["rejected"] > 0:
+        print(f"Отклонено предварительной проверкой: {summary['rejected']}, "
+              f"сэкономлено около {summary['saved']:.2f}с")
+    print(f"Время: {summary['elapsed']:.2f}с, производительность: {summary['throughput']:.2f} док/с")
+
+    if args.metrics_jsonl:
+        with open(args.metrics_jsonl, "w", encoding="utf-8") as file:
+            file.write(METRICS.to_json_lines())
+    if args.metrics_prom:
+        with open(args.metrics_prom, "w", encoding="utf-8") as file:
+            file.write(METRICS.to_prometheus())
+
+    if summary["failed"] > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from benchmarks.synthetic import make_photo
+from core.document_transformation import DocumentTransformation, SEGMENTATION_METHODS
+from shared.constants import MAX_DIMENSION, COARSE_DIMENSION
+from shared.load_library import np
+from shared.load_library import sys
+from shared.load_library import time
+from shared.load_library import json
+from shared.load_library import argparse
+
+# Ошибка угла, начиная с которой сегментация считается неудачной (пиксели исходного изображения)
+FAILURE_ERROR = 50
+
+def measure_mode(transform, photo, truth, repeat):
+    """Время поиска углов (без декодирования и выравнивания) и ошибка каждого угла"""
+    timings = []
+    corners = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        corners = transform.detect_corners(photo)
+        timings.append(time.perf_counter() - start_time)
+    if corners is None or len(corners) != 4:
+        return float(np.median(timings)), None
+    return float(np.median(timings)), np.linalg.norm(corners - truth, axis=1)
+
+def summarize(timings, errors, failures):
+    errors = np.concatenate(errors) if errors else np.zeros(0)
+    return {
+        "detect_p50_ms": round(float(np.median(timings)) * 1000, 3),
+        "error_mean_px": round(float(errors.mean()), 3) if len(errors) else None,
+        "error_p95_px": round(float(np.percentile(errors, 95)), 3) if len(errors) else None,
+        "failures": failures,
+    }
+
+def main():
+    """ Точность и стоимость поиска углов: одно уменьшенное изображение и грубый поиск с уточнением """
+    parser = argparse.ArgumentParser(description="Точность углов и время их поиска на больших фотографиях")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[12, 24, 48],
+                        help="Размеры синтетических изображений (мегапиксели)")
+    parser.add_argument("--photos", type=int, default=5, help="Фотографий каждого размера")
+    parser.add_argument("--repeat", type=int, default=3, help="Количество повторов замера")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[MAX_DIMENSION, 2 * MAX_DIMENSION],
+                        help="max_dimension для обычного режима")
+    parser.add_argument("--coarse-dimension", type=int, default=COARSE_DIMENSION)
+    parser.add_argument("--segmentation", choices=SEGMENTATION_METHODS, default="edges")
+    parser.add_argument("--seed", type=int, default=0, help="Начальное значение генератора")
+    parser.add_argument("--output", help="Путь к JSON-файлу с результатами (по умолчанию - stdout)")
+    args = parser.parse_args()
+
+    modes = {f"single_{dimension}": DocumentTransformation(max_dimension=dimension, segmentation=args.segmentation)
+             for dimension in args.dimensions}
+    modes["multiscale"] = DocumentTransformation(segmentation=args.segmentation, multiscale=True,
+                                                 coarse_dimension=args.coarse_dimension)
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    for megapixels in args.sizes:
+        timings = {name: [] for name in modes}
+        errors = {name: [] for name in modes}
+        failures = {name: 0 for name in modes}
+        for _ in range(args.photos):
+            photo, truth, _ = make_photo(rng, megapixels)
+            truth = modes["multiscale"]._sort_corners(np.float32(truth))
+            for name, transform in modes.items():
+                latency, error = measure_mode(transform, photo, truth, args.repeat)
+                timings[name].append(latency)
+                # Неудачная сегментация учитывается отдельно, чтобы не смешивать ее с точностью углов
+                if error is None or error.max() > FAILURE_ERROR:
+                    failures[name] += 1
+                else:
+                    errors[name].append(error)
+            del photo
+
+        case = {"megapixels": megapixels, "photos": args.photos}
+        for name in modes:
+            case[name] = summarize(timings[name], errors[name], failures[name])
+        results.append(case)
+        print(f"{megapixels} МП: " + ", ".join(
+            f"{name} {case[name]['detect_p50_ms']:.1f} мс, ошибка {case[name]['error_mean_px']} пикс."
+            for name in modes), file=sys.stderr)
+
+    text = json.dumps({"segmentation": args.segmentation, "failure_error_px": FAILURE_ERROR, "results": results},
+                      ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
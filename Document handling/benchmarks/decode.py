@@ -0,0 +1,93 @@
+from benchmarks.synthetic import make_photo
+from benchmarks.pipeline import peak_rss_mb
+from core.document_transformation import DocumentTransformation, SEGMENTATION_METHODS
+from shared.constants import MAX_DIMENSION
+from shared.load_library import cv
+from shared.load_library import np
+from shared.load_library import os
+from shared.load_library import sys
+from shared.load_library import time
+from shared.load_library import json
+from shared.load_library import argparse
+from shared.load_library import tempfile
+from shared.load_library import multiprocessing
+
+def run_mode(image_path, reduced_decode, repeat, max_dimension, segmentation):
+    """Декодирование и поиск углов в одном режиме (в отдельном процессе)"""
+    transform = DocumentTransformation(max_dimension=max_dimension, segmentation=segmentation,
+                                       reduced_decode=reduced_decode)
+    transform.metrics.reset()
+
+    timings = []
+    corners = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        document = transform.process_document(image_path)
+        timings.append(time.perf_counter() - start_time)
+        corners = None if not document else document.get_transformed_img().shape[:2]
+
+    # Суммарное время декодирования (полное + уменьшенное) и поиска углов по метрикам этапов
+    stages = {}
+    for entry in transform.metrics.drain():
+        stages.setdefault(entry["stage"], []).append(entry["wall"])
+    detect_stages = ("decode_reduced", "decode", "resize", "preprocess", "segment", "corners")
+    decode_and_detect = sum(np.sum(stages.get(stage, [])) for stage in detect_stages) / repeat
+
+    return {
+        "reduced_decode": reduced_decode,
+        "total_p50_ms": round(float(np.percentile(timings, 50)) * 1000, 3),
+        "decode_and_detect_ms": round(float(decode_and_detect) * 1000, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "output_shape": None if corners is None else list(corners),
+    }
+
+def main():
+    """ Сравнение полного и уменьшенного декодирования для поиска углов """
+    parser = argparse.ArgumentParser(description="Экономия времени и памяти при уменьшенном декодировании")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[5, 12, 24, 50],
+                        help="Размеры синтетических изображений (мегапиксели)")
+    parser.add_argument("--repeat", type=int, default=5, help="Количество повторов замера")
+    parser.add_argument("--seed", type=int, default=0, help="Начальное значение генератора")
+    parser.add_argument("--max-dimension", type=int, default=MAX_DIMENSION)
+    # Метод задается явно: при GrabCut (SEGMENTATION_METHOD по умолчанию) сегментация на порядки
+    # дольше декодирования, и разница между режимами декодирования теряется
+    parser.add_argument("--segmentation", choices=SEGMENTATION_METHODS, default="edges")
+    parser.add_argument("--output", help="Путь к JSON-файлу с результатами (по умолчанию - stdout)")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for megapixels in args.sizes:
+            photo, _, _ = make_photo(np.random.default_rng(args.seed), megapixels)
+            image_path = os.path.join(folder, f"photo_{megapixels}.jpg")
+            cv.imwrite(image_path, photo, [cv.IMWRITE_JPEG_QUALITY, 90])
+            del photo
+
+            case = {"megapixels": megapixels}
+            for reduced_decode in (False, True):
+                # Каждый режим в новом процессе для честного замера пиковой памяти
+                with context.Pool(1) as pool:
+                    mode = pool.apply(run_mode, (image_path, reduced_decode, args.repeat, args.max_dimension,
+                                                 args.segmentation))
+                case["reduced" if reduced_decode else "full"] = mode
+
+            full, reduced = case["full"], case["reduced"]
+            case["time_saved_ms"] = round(full["decode_and_detect_ms"] - reduced["decode_and_detect_ms"], 3)
+            if full["peak_rss_mb"] is not None:
+                case["memory_saved_mb"] = round(full["peak_rss_mb"] - reduced["peak_rss_mb"], 1)
+            results.append(case)
+            print(f"{megapixels} МП: декодирование и поиск углов {full['decode_and_detect_ms']:.1f} -> "
+                  f"{reduced['decode_and_detect_ms']:.1f} мс, пиковая память {full['peak_rss_mb']} -> "
+                  f"{reduced['peak_rss_mb']} МБ", file=sys.stderr)
+
+    text = json.dumps({"max_dimension": args.max_dimension, "segmentation": args.segmentation, "results": results},
+                      ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
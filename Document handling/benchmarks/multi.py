@@ -0,0 +1,65 @@
+from benchmarks.synthetic import make_multi_photo
+from benchmarks.corners import FAILURE_ERROR
+from core.document_transformation import DocumentTransformation
+from shared.load_library import cv
+from shared.load_library import np
+from shared.load_library import os
+from shared.load_library import sys
+from shared.load_library import json
+from shared.load_library import argparse
+from shared.load_library import tempfile
+
+def corner_errors(found, truths):
+    """Ошибка углов каждой страницы разметки: ближайший найденный четырехугольник (пиксели)"""
+    errors = []
+    for truth in truths:
+        # Углы отсортированы так же, как в _sort_corners: ЛВ, ПВ, ПН, ЛН
+        distances = [float(np.linalg.norm(corners - truth, axis=1).max()) for corners in found]
+        errors.append(min(distances) if distances else None)
+    return errors
+
+def main():
+    """ Проверка режима нескольких документов с параметрами по умолчанию из shared/constants.py """
+    parser = argparse.ArgumentParser(description="Режим нескольких документов на синтетических фотографиях")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 2, 3], help="Количество страниц на фотографии")
+    parser.add_argument("--samples", type=int, default=3, help="Фотографий с каждым количеством страниц")
+    parser.add_argument("--megapixels", type=float, default=2, help="Размер фотографий (мегапиксели)")
+    parser.add_argument("--seed", type=int, default=0, help="Начальное значение генератора")
+    parser.add_argument("--output", help="Путь к JSON-файлу с результатами (по умолчанию - stdout)")
+    args = parser.parse_args()
+
+    # Никаких параметров: проверяется именно то, что получит batch.py --multi
+    transform = DocumentTransformation()
+    rng = np.random.default_rng(args.seed)
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for count in args.counts:
+            for sample in range(args.samples):
+                photo, truths = make_multi_photo(rng, args.megapixels, count)
+                image_path = os.path.join(folder, f"multi_{count}_{sample}.png")
+                cv.imwrite(image_path, photo)
+
+                documents = transform.process_documents(image_path)
+                found = transform.detect_all_corners(photo)
+                errors = corner_errors(found, truths)
+                passed = (len(documents) == count and
+                          all(error is not None and error < FAILURE_ERROR for error in errors))
+                results.append({"pages": count, "sample": sample, "found": len(documents),
+                                "segmentation": transform.used_segmentation,
+                                "max_error_px": None if None in errors else round(max(errors), 1),
+                                "passed": passed})
+                print(f"{count} стр. #{sample}: найдено {len(documents)}, метод {transform.used_segmentation}, "
+                      f"ошибка углов {results[-1]['max_error_px']} пикс.", file=sys.stderr)
+
+    text = json.dumps({"failure_error_px": FAILURE_ERROR, "results": results}, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+
+    if not all(result["passed"] for result in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+from benchmarks.synthetic import make_photo
+from core.document_transformation import DocumentTransformation, SEGMENTATION_METHODS
+from core.text_analyzer import TextAnalyzer
+from models.document import Document
+from shared.constants import MAX_DIMENSION, KERNEL, SEGMENTATION_METHOD
+from shared.load_library import cv
+from shared.load_library import np
+from shared.load_library import sys
+from shared.load_library import time
+from shared.load_library import argparse
+from shared.load_library import multiprocessing
+from shared.load_library import json
+from shared.load_library import platform
+
+STAGES = ("decode", "resize", "preprocess", "segment", "corners", "warp", "text")
+
+def peak_rss_mb():
+    """Пиковое потребление памяти процессом (МБ) или None, если недоступно"""
+    # В Linux ru_maxrss наследуется процессом, запущенным через spawn, от родителя,
+    # поэтому сначала берем VmHWM, который считается заново после exec
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux возвращает килобайты, macOS - байты
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def run_case(megapixels, seed, repeat, max_dimension, segmentation):
+    """Замер всех этапов на одном синтетическом изображении (в отдельном процессе)"""
+    rng = np.random.default_rng(seed)
+    photo, true_corners, truth = make_photo(rng, megapixels)
+    _, encoded = cv.imencode(".jpg", photo, [cv.IMWRITE_JPEG_QUALITY, 90])
+    del photo
+
+    transform = DocumentTransformation(max_dimension=max_dimension, segmentation=segmentation)
+    analyzer = TextAnalyzer()
+    timings = {stage: [] for stage in STAGES}
+
+    def measure(stage, function, *args):
+        start_time = time.perf_counter()
+        result = function(*args)
+        timings[stage].append(time.perf_counter() - start_time)
+        return result
+
+    sorted_corners = None
+    document = None
+    for _ in range(repeat):
+        image = measure("decode", cv.imdecode, encoded, cv.IMREAD_COLOR)
+        scale_factor = transform._calculate_scale_factor(image.shape[:2])
+        small_img = measure("resize", transform._resize_image, image, scale_factor)
+        processed_img = measure("preprocess", lambda: transform._preprocess_image(cv.cvtColor(small_img, cv.COLOR_BGR2GRAY)))
+        mask = measure("segment", transform._segment_document, small_img, processed_img)
+        corners = measure("corners", transform._find_corners, mask)
+        if corners is None or len(corners) != 4:
+            sorted_corners = None
+            continue
+        sorted_corners = transform._sort_corners(corners / scale_factor)
+        warped = measure("warp", transform._apply_perspective_transform, image, sorted_corners)
+
+        document = Document(image)
+        document.set_transformed_img(warped)
+        document = measure("text", analyzer.process_document, document)
+
+    result = {
+        "megapixels": megapixels,
+        "shape": list(image.shape[:2]),
+        "seed": seed,
+        "segmentation": transform.used_segmentation,
+        "stages": {},
+        "peak_rss_mb": peak_rss_mb(),
+        "truth": truth,
+        "accuracy": {"detected": sorted_corners is not None},
+    }
+    for stage, values in timings.items():
+        if values:
+            p50, p95 = np.percentile(values, [50, 95]) * 1000
+            result["stages"][stage] = {"p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3), "runs": len(values)}
+
+    if sorted_corners is not None:
+        diagonal = np.hypot(*image.shape[:2])
+        error = np.linalg.norm(sorted_corners - true_corners, axis=1)
+        result["accuracy"]["corner_error_px"] = round(float(error.mean()), 3)
+        result["accuracy"]["corner_error_max_px"] = round(float(error.max()), 3)
+        result["accuracy"]["corner_error_rel"] = round(float(error.mean() / diagonal), 6)
+    if document is not None:
+        count_lines, count_characters = document.get_info_text_img()
+        _, words = document.get_text_boxes()
+        result["accuracy"]["lines_error"] = count_lines - truth["lines"]
+        result["accuracy"]["words_error"] = len(words) - truth["words"]
+        result["accuracy"]["characters_error"] = count_characters - truth["characters"]
+    return result
+
+def main():
+    """ Воспроизводимый бенчмарк этапов обработки на синтетических документах """
+    parser = argparse.ArgumentParser(description="Бенчмарк этапов обработки документа")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5, 12, 24, 50],
+                        help="Размеры синтетических изображений (мегапиксели)")
+    parser.add_argument("--samples", type=int, default=3, help="Количество изображений каждого размера")
+    parser.add_argument("--repeat", type=int, default=5, help="Количество повторов замера на изображение")
+    parser.add_argument("--seed", type=int, default=0, help="Начальное значение генератора")
+    parser.add_argument("--max-dimension", type=int, default=MAX_DIMENSION)
+    # По умолчанию - метод из shared/constants.py: бенчмарк замеряет поставляемую конфигурацию,
+    # метод записывается в config результата
+    parser.add_argument("--segmentation", choices=SEGMENTATION_METHODS, default=SEGMENTATION_METHOD)
+    parser.add_argument("--output", help="Путь к JSON-файлу с результатами (по умолчанию - stdout)")
+    args = parser.parse_args()
+
+    report = {
+        "config": {
+            "max_dimension": args.max_dimension,
+            "kernel": list(KERNEL.shape),
+            "segmentation": args.segmentation,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "opencv": cv.__version__,
+            "numpy": np.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": [],
+    }
+
+    # Каждый случай в новом процессе, чтобы пиковая память не накапливалась
+    context = multiprocessing.get_context("spawn")
+    for megapixels in args.sizes:
+        for sample in range(args.samples):
+            seed = args.seed * 1000 + int(megapixels * 10) * 10 + sample
+            with context.Pool(1) as pool:
+                result = pool.apply(run_case, (megapixels, seed, args.repeat, args.max_dimension, args.segmentation))
+            report["results"].append(result)
+            print(f"{megapixels} МП, образец {sample}: " +
+                  ", ".join(f"{stage} {values['p50_ms']:.1f}мс" for stage, values in result["stages"].items()),
+                  file=sys.stderr)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
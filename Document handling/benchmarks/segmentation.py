@@ -0,0 +1,77 @@
+from core.document_transformation import DocumentTransformation, SEGMENTATION_METHODS
+from core.batch_processor import BatchProcessor
+from shared.load_library import cv
+from shared.load_library import np
+from shared.load_library import sys
+from shared.load_library import time
+from shared.load_library import argparse
+
+def detect_corners(transform, image, method):
+    """Поиск углов одним методом сегментации без запасного варианта"""
+    scale_factor = transform._calculate_scale_factor(image.shape[:2])
+    small_img = transform._resize_image(image, scale_factor)
+    processed_img = transform._preprocess_image(cv.cvtColor(small_img, cv.COLOR_BGR2GRAY))
+
+    start_time = time.perf_counter()
+    if method == "edges":
+        mask = transform._segment_edges(processed_img)
+    elif method == "threshold":
+        mask = transform._segment_threshold(processed_img)
+    else:
+        mask = transform._segment_grabcut(small_img)
+    latency = time.perf_counter() - start_time
+
+    if mask is None:
+        return None, latency
+    corners = transform._find_corners(mask)
+    if corners is None or len(corners) != 4:
+        return None, latency
+    return transform._sort_corners(corners / scale_factor), latency
+
+def main():
+    """ Сравнение методов сегментации: задержка и совпадение углов с GrabCut """
+    parser = argparse.ArgumentParser(description="Сравнение методов сегментации документа")
+    parser.add_argument("inputs", nargs="+", help="Каталоги, glob-шаблоны или пути к изображениям")
+    parser.add_argument("--repeat", type=int, default=3, help="Количество повторов замера")
+    args = parser.parse_args()
+
+    paths = BatchProcessor.collect_paths(args.inputs)
+    if not paths:
+        sys.exit("Изображения не найдены")
+
+    transform = DocumentTransformation()
+    latencies = {method: [] for method in SEGMENTATION_METHODS}
+    errors = {method: [] for method in SEGMENTATION_METHODS}
+    found = {method: 0 for method in SEGMENTATION_METHODS}
+
+    for path in paths:
+        image = cv.imread(path)
+        if image is None:
+            print(f"Не удалось загрузить {path}")
+            continue
+
+        corners = {}
+        for method in SEGMENTATION_METHODS:
+            for _ in range(args.repeat):
+                corners[method], latency = detect_corners(transform, image, method)
+                latencies[method].append(latency)
+            if corners[method] is not None:
+                found[method] += 1
+
+        # Совпадение углов: среднее расстояние до углов GrabCut в долях диагонали
+        diagonal = np.hypot(image.shape[0], image.shape[1])
+        for method in SEGMENTATION_METHODS:
+            if corners[method] is not None and corners["grabcut"] is not None:
+                distance = np.linalg.norm(corners[method] - corners["grabcut"], axis=1).mean()
+                errors[method].append(distance / diagonal)
+
+    print(f"{'Метод':<10} {'найдено':>8} {'p50, мс':>9} {'p95, мс':>9} {'отклонение от GrabCut, %':>26}")
+    for method in SEGMENTATION_METHODS:
+        if not latencies[method]:
+            continue
+        p50, p95 = np.percentile(latencies[method], [50, 95]) * 1000
+        error = f"{np.mean(errors[method]) * 100:.2f}" if errors[method] else "-"
+        print(f"{method:<10} {found[method]:>8} {p50:>9.1f} {p95:>9.1f} {error:>26}")
+
+if __name__ == "__main__":
+    main()
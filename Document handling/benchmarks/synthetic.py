@@ -0,0 +1,107 @@
+from shared.load_library import cv
+from shared.load_library import np
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+def render_page(rng, width, height):
+    """Страница с текстом и известным количеством строк, слов и символов"""
+    page = np.full((height, width, 3), 255, np.uint8)
+
+    # Размер шрифта пропорционален ширине страницы
+    ratio = width / 900
+    font_scale = 0.8 * ratio
+    thickness = max(1, int(round(2 * ratio)))
+    line_step = int(45 * ratio)
+    margin = int(60 * ratio)
+    word_gap = int(30 * ratio)
+
+    count_lines = 0
+    count_words = 0
+    count_characters = 0
+    y = margin + line_step
+    while y < height - margin:
+        x = margin
+        words_in_line = 0
+        while True:
+            word = "".join(rng.choice(list(LETTERS), int(rng.integers(2, 9))))
+            (word_width, _), _ = cv.getTextSize(word, cv.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+            if x + word_width > width - margin:
+                break
+            cv.putText(page, word, (x, y), cv.FONT_HERSHEY_SIMPLEX, font_scale, (0, 0, 0), thickness)
+            x += word_width + word_gap
+            words_in_line += 1
+            count_characters += len(word)
+        if words_in_line > 0:
+            count_lines += 1
+            count_words += words_in_line
+        y += line_step
+
+    truth = {"lines": count_lines, "words": count_words, "characters": count_characters}
+    return page, truth
+
+def render_background(rng, width, height):
+    """Загроможденный фон: шум и случайные темные фигуры"""
+    small = rng.integers(20, 120, (max(1, height // 16), max(1, width // 16), 3)).astype(np.uint8)
+    background = cv.resize(small, (width, height), interpolation=cv.INTER_LINEAR)
+
+    for _ in range(40):
+        color = tuple(int(c) for c in rng.integers(0, 160, 3))
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        size = int(rng.integers(width // 40 + 1, width // 8 + 2))
+        if rng.random() < 0.5:
+            cv.rectangle(background, (x, y), (x + size, y + size // 2), color, -1)
+        else:
+            cv.circle(background, (x, y), size // 2, color, max(1, size // 20))
+    return background
+
+def make_photo(rng, megapixels, aspect=4 / 3):
+    """Фотография документа с известными углами на фоне заданного размера"""
+    height = int(np.sqrt(megapixels * 1e6 / aspect))
+    width = int(height * aspect)
+    photo = render_background(rng, width, height)
+
+    # Страница занимает около половины кадра, углы случайно смещены
+    page_height = int(height * rng.uniform(0.6, 0.8))
+    page_width = int(page_height / np.sqrt(2))
+    page, truth = render_page(rng, page_width, page_height)
+
+    center = np.array([width / 2, height / 2])
+    half = np.array([page_width / 2, page_height / 2])
+    corners = np.float32([center - half, center + [half[0], -half[1]], center + half, center + [-half[0], half[1]]])
+    corners += rng.uniform(-0.08, 0.08, (4, 2)).astype(np.float32) * [page_width, page_height]
+
+    source = np.float32([[0, 0], [page_width - 1, 0], [page_width - 1, page_height - 1], [0, page_height - 1]])
+    matrix = cv.getPerspectiveTransform(source, corners)
+    warped = cv.warpPerspective(page, matrix, (width, height))
+    mask = cv.warpPerspective(np.full((page_height, page_width), 255, np.uint8), matrix, (width, height))
+    photo[mask > 0] = warped[mask > 0]
+
+    return photo, corners, truth
+
+def make_multi_photo(rng, megapixels, count, aspect=4 / 3):
+    """Фотография нескольких документов, лежащих рядом, с известными углами каждого (слева направо)"""
+    height = int(np.sqrt(megapixels * 1e6 / aspect))
+    width = int(height * aspect)
+    photo = render_background(rng, width, height)
+
+    # Каждая страница в своей колонке кадра, с полями между страницами
+    cell = width / count
+    all_corners = []
+    for index in range(count):
+        page_height = int(min(height * rng.uniform(0.55, 0.75), cell * 0.8 * np.sqrt(2)))
+        page_width = int(page_height / np.sqrt(2))
+        page, _ = render_page(rng, page_width, page_height)
+
+        center = np.array([cell * (index + 0.5), height / 2])
+        half = np.array([page_width / 2, page_height / 2])
+        corners = np.float32([center - half, center + [half[0], -half[1]], center + half, center + [-half[0], half[1]]])
+        corners += rng.uniform(-0.05, 0.05, (4, 2)).astype(np.float32) * [page_width, page_height]
+
+        source = np.float32([[0, 0], [page_width - 1, 0], [page_width - 1, page_height - 1], [0, page_height - 1]])
+        matrix = cv.getPerspectiveTransform(source, corners)
+        warped = cv.warpPerspective(page, matrix, (width, height))
+        mask = cv.warpPerspective(np.full((page_height, page_width), 255, np.uint8), matrix, (width, height))
+        photo[mask > 0] = warped[mask > 0]
+        all_corners.append(corners)
+
+    return photo, all_corners
@@ -0,0 +1,85 @@
+from benchmarks.synthetic import render_page
+from core.text_analyzer import TextAnalyzer
+from shared.constants import TEXT_HEIGHT
+from shared.load_library import np
+from shared.load_library import sys
+from shared.load_library import time
+from shared.load_library import json
+from shared.load_library import argparse
+
+# Отношение высоты страницы к ширине (A4)
+PAGE_ASPECT = 1.414
+
+def measure_mode(analyzer, page, repeat):
+    """Время анализа текста (без отрисовки) и количество строк, слов и символов"""
+    timings = []
+    counts = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        lines, words, characters, _, _ = analyzer._find_text_boxes(page)
+        timings.append(time.perf_counter() - start_time)
+        counts = (len(lines), len(words), len(characters))
+    return float(np.median(timings)), counts
+
+def summarize(timings, counts, truths):
+    counts = np.array(counts, dtype=np.float64)
+    truths = np.array(truths, dtype=np.float64)
+    # Относительная ошибка количества по каждой странице, затем среднее
+    errors = np.abs(counts - truths) / np.maximum(truths, 1)
+    return {
+        "text_p50_ms": round(float(np.median(timings)) * 1000, 3),
+        "lines": round(float(counts[:, 0].mean()), 1),
+        "words": round(float(counts[:, 1].mean()), 1),
+        "characters": round(float(counts[:, 2].mean()), 1),
+        "lines_error": round(float(errors[:, 0].mean()), 3),
+        "words_error": round(float(errors[:, 1].mean()), 3),
+        "characters_error": round(float(errors[:, 2].mean()), 3),
+    }
+
+def main():
+    """ Время анализа текста и устойчивость количества строк, слов и символов к разрешению страницы """
+    parser = argparse.ArgumentParser(description="Анализ текста в исходном и рабочем разрешении на страницах разного размера")
+    parser.add_argument("--widths", type=int, nargs="+", default=[700, 1240, 2480, 4960],
+                        help="Ширины синтетических страниц (пиксели; 2480 - A4 при 300 DPI)")
+    parser.add_argument("--pages", type=int, default=3, help="Страниц каждого размера")
+    parser.add_argument("--repeat", type=int, default=3, help="Количество повторов замера")
+    parser.add_argument("--text-height", type=int, default=TEXT_HEIGHT,
+                        help="Высота текста в рабочем разрешении (пиксели)")
+    parser.add_argument("--seed", type=int, default=0, help="Начальное значение генератора")
+    parser.add_argument("--output", help="Путь к JSON-файлу с результатами (по умолчанию - stdout)")
+    args = parser.parse_args()
+
+    modes = {"full": TextAnalyzer(), "adaptive": TextAnalyzer(adaptive=True, text_height=args.text_height)}
+
+    results = []
+    for width in args.widths:
+        # Одни и те же страницы для всех размеров: различается только разрешение
+        rng = np.random.default_rng(args.seed)
+        timings = {name: [] for name in modes}
+        counts = {name: [] for name in modes}
+        truths = []
+        for _ in range(args.pages):
+            page, truth = render_page(rng, width, round(width * PAGE_ASPECT))
+            truths.append((truth["lines"], truth["words"], truth["characters"]))
+            for name, analyzer in modes.items():
+                latency, count = measure_mode(analyzer, page, args.repeat)
+                timings[name].append(latency)
+                counts[name].append(count)
+
+        case = {"width": width, "pages": args.pages}
+        for name in modes:
+            case[name] = summarize(timings[name], counts[name], truths)
+        results.append(case)
+        print(f"{width} пикс.: " + ", ".join(
+            f"{name} {case[name]['text_p50_ms']:.1f} мс, строк {case[name]['lines']}, слов {case[name]['words']}, "
+            f"символов {case[name]['characters']}" for name in modes), file=sys.stderr)
+
+    text = json.dumps({"text_height": args.text_height, "results": results}, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+from benchmarks.synthetic import make_photo
+from benchmarks.pipeline import peak_rss_mb
+from core.document_transformation import DocumentTransformation
+from core.tiled_warp import TiledWarp
+from shared.constants import WARP_TILE_SIZE, WARP_THREADS
+from shared.load_library import cv
+from shared.load_library import np
+from shared.load_library import os
+from shared.load_library import sys
+from shared.load_library import time
+from shared.load_library import json
+from shared.load_library import argparse
+from shared.load_library import tempfile
+from shared.load_library import multiprocessing
+
+MODES = ("full", "tiled", "memmap", "stream")
+
+def rss_mb():
+    """Текущее потребление памяти процессом (МБ) или None, если недоступно"""
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+def run_mode(photo_path, corners, mode, tile_size, threads, repeat):
+    """Замер одного режима преобразования (в отдельном процессе)"""
+    # Изображение читается из файла, чтобы пик памяти не определялся генерацией
+    photo = np.load(photo_path)
+    corners = DocumentTransformation()._sort_corners(np.float32(corners))
+
+    # Размеры и матрица выходного изображения, как в DocumentTransformation
+    width = int(max(np.linalg.norm(corners[0] - corners[1]), np.linalg.norm(corners[2] - corners[3])))
+    height = int(max(np.linalg.norm(corners[0] - corners[3]), np.linalg.norm(corners[1] - corners[2])))
+    dst_points = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]])
+    matrix = cv.getPerspectiveTransform(corners, dst_points)
+
+    with tempfile.TemporaryDirectory() as folder:
+        tiled_warp = TiledWarp(tile_size, threads, folder if mode == "memmap" else None)
+
+        before = rss_mb()
+        timings = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            if mode == "full":
+                warped = cv.warpPerspective(photo, matrix, (width, height))
+            elif mode == "stream":
+                # Полосы сразу записываются в файл, как в потоковый кодировщик
+                with open(os.path.join(folder, "warped.raw"), "wb") as file:
+                    for _, strip in tiled_warp.iter_strips(photo, matrix, (width, height)):
+                        file.write(strip.data)
+                warped = None
+            else:
+                warped = tiled_warp.warp(photo, matrix, (width, height))
+            timings.append(time.perf_counter() - start_time)
+            del warped
+        after = peak_rss_mb()
+
+    return {
+        "mode": mode,
+        "output_shape": [height, width],
+        "p50_ms": round(float(np.percentile(timings, 50)) * 1000, 3),
+        "peak_rss_mb": after,
+        "warp_peak_growth_mb": None if before is None else round(after - before, 1),
+    }
+
+def main():
+    """ Сравнение преобразования целиком и по плиткам на больших изображениях """
+    parser = argparse.ArgumentParser(description="Время и память перспективного преобразования по плиткам")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[24, 50, 100],
+                        help="Размеры синтетических изображений (мегапиксели)")
+    parser.add_argument("--tile-size", type=int, default=WARP_TILE_SIZE)
+    parser.add_argument("--threads", type=int, default=WARP_THREADS, help="Потоки для плиток (0 - по числу ядер)")
+    parser.add_argument("--cv-threads", type=int, default=1,
+                        help="Потоки OpenCV в процессе замера (как в пакетной обработке)")
+    parser.add_argument("--repeat", type=int, default=3, help="Количество повторов замера")
+    parser.add_argument("--seed", type=int, default=0, help="Начальное значение генератора")
+    parser.add_argument("--output", help="Путь к JSON-файлу с результатами (по умолчанию - stdout)")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for megapixels in args.sizes:
+            photo, corners, _ = make_photo(np.random.default_rng(args.seed), megapixels)
+            photo_path = os.path.join(folder, "photo.npy")
+            np.save(photo_path, photo)
+            del photo
+
+            case = {"megapixels": megapixels}
+            for mode in MODES:
+                # Каждый режим в новом процессе для честного замера пиковой памяти
+                with context.Pool(1, initializer=cv.setNumThreads, initargs=(args.cv_threads,)) as pool:
+                    case[mode] = pool.apply(run_mode, (photo_path, corners, mode, args.tile_size,
+                                                       args.threads, args.repeat))
+                print(f"{megapixels} МП, {mode}: {case[mode]['p50_ms']:.1f} мс, "
+                      f"рост пиковой памяти {case[mode]['warp_peak_growth_mb']} МБ", file=sys.stderr)
+            results.append(case)
+
+    config = {"tile_size": args.tile_size, "threads": args.threads, "cv_threads": args.cv_threads}
+    text = json.dumps({"config": config, "results": results}, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text)
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
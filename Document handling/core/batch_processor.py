@@ -0,0 +1,181 @@
+from core.document_transformation import DocumentTransformation
+from core.text_analyzer import TextAnalyzer
+from core.tiled_warp import TiledWarp
+from utils.file_handler import FileHandler
+from utils.output_writer import OutputWriter
+from utils.metrics import METRICS, Metrics
+from utils.result_cache import ResultCache
+from shared.constants import MAX_DIMENSION, FORMAT_IMAGE_FILE, BATCH_WORKERS, BATCH_CV_THREADS, LEAN_DOCUMENT
+from shared.constants import OUTPUT_IMAGE_FORMAT, MULTISCALE_CORNERS, ADAPTIVE_TEXT, PREFILTER
+from shared.load_library import cv
+from shared.load_library import os
+from shared.load_library import glob
+from shared.load_library import time
+from shared.load_library import multiprocessing
+
+# Обработчики, создаваемые один раз в каждом процессе пула
+_transform = None
+_analyzer = None
+_save = True
+_writer = None
+_image_format = OUTPUT_IMAGE_FORMAT
+_quality = None
+_multi = False
+
+
+def _init_worker(max_dimension, cv_threads, save, cache_dir, lean, image_format, quality, multi, multiscale,
+                adaptive_text, prefilter):
+    """Инициализация процесса пула: один поток OpenCV и свои обработчики"""
+    global _transform, _analyzer, _save, _writer, _image_format, _quality, _multi
+    cv.setNumThreads(cv_threads)
+    # Кэш на диске общий для всех процессов пула
+    cache = ResultCache(cache_dir) if cache_dir is not None else None
+    # Плитки больших страниц считаются в стольких же потоках, сколько у OpenCV
+    _transform = DocumentTransformation(max_dimension, cache=cache, lean=lean,
+                                        tiled_warp=TiledWarp(threads=cv_threads), multiscale=multiscale,
+                                        prefilter=prefilter)
+    _analyzer = TextAnalyzer(cache=cache, adaptive=adaptive_text)
+    _save = save
+    _image_format = image_format
+    _quality = quality
+    _multi = multi
+    if save is True:
+        # Запись результатов идет в фоне; оставшиеся задачи дописываются при завершении процесса
+        _writer = OutputWriter()
+        multiprocessing.util.Finalize(_writer, _writer.close, exitpriority=10)
+
+
+def _process_file(image_path):
+    """Обработка одного изображения в процессе пула (тот же путь, что и в main.py)"""
+    start_time = time.perf_counter()
+    result = {"path": image_path, "status": "ok", "error": None,
+              "count_lines": 0, "count_characters": 0, "time": 0.0}
+    try:
+        # В режиме нескольких документов все страницы берутся из одного декодирования и одной сегментации
+        if _multi is True:
+            documents = _transform.process_documents(image_path)
+        else:
+            document = _transform.process_document(image_path)
+            documents = [document] if document else []
+
+        if not documents and _transform.unreadable is True:
+            result["status"] = "unreadable"
+            result["error"] = "не удалось прочитать изображение"
+        elif not documents and _transform.rejection is not None:
+            # Снимок отклонен до сегментации: это не ошибка обработки
+            result["status"] = "rejected"
+            result["error"] = f"отклонен предварительной проверкой: {_transform.rejection}"
+            result["reason"] = _transform.rejection
+        elif not documents:
+            result["status"] = "error"
+            result["error"] = "документ не найден"
+        else:
+            stem = os.path.splitext(os.path.basename(image_path))[0]
+            names = [f"{stem}_{index + 1}" if _multi is True else stem for index in range(len(documents))]
+            if _save is True:
+                # Имя закрепляется до записи, чтобы изображение, копия и информация
+                # одного входного файла получили одинаковый номер при совпадении имен
+                names = [FileHandler.reserve_name(name, _image_format) for name in names]
+                for document, name in zip(documents, names):
+                    FileHandler.save_image(image=document.get_transformed_img(), name=name, writer=_writer,
+                                           image_format=_image_format, quality=_quality)
+
+            documents = _analyzer.process_documents(documents)
+            if any(document is None for document in documents):
+                result["status"] = "error"
+                result["error"] = "ошибка анализа текста"
+                if _save is True:
+                    for name in names:
+                        FileHandler.release_name(name)
+            else:
+                result["documents"] = len(documents)
+                for document, name in zip(documents, names):
+                    count_lines, count_characters = document.get_info_text_img()
+                    result["count_lines"] += count_lines
+                    result["count_characters"] += count_characters
+                    if _save is True:
+                        FileHandler.save_image(image=document.get_selected_text_img(), copy=True, name=name,
+                                               writer=_writer, image_format=_image_format, quality=_quality)
+                        FileHandler.save_info_text(document, name=name, writer=_writer, reserved=True)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+
+    result["time"] = time.perf_counter() - start_time
+    # Записи об этапах передаются в основной процесс вместе с результатом
+    result["stages"] = METRICS.drain()
+    return result
+
+
+class BatchProcessor:
+
+    def __init__(self, workers=BATCH_WORKERS, max_dimension=MAX_DIMENSION,
+                 cv_threads=BATCH_CV_THREADS, save=True, cache_dir=None, lean=LEAN_DOCUMENT,
+                 image_format=OUTPUT_IMAGE_FORMAT, quality=None, multi=False, multiscale=MULTISCALE_CORNERS,
+                 adaptive_text=ADAPTIVE_TEXT, prefilter=PREFILTER):
+        # Формат проверяется сразу, а не в каждом процессе пула
+        FileHandler.encode_params(image_format, quality)
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.max_dimension = max_dimension
+        self.cv_threads = cv_threads
+        self.save = save
+        self.cache_dir = cache_dir
+        self.lean = lean
+        self.image_format = image_format
+        self.quality = quality
+        self.multi = multi
+        self.multiscale = multiscale
+        self.adaptive_text = adaptive_text
+        self.prefilter = prefilter
+
+    def collect_paths(inputs):
+        """Сбор списка изображений из каталогов, glob-шаблонов и отдельных файлов"""
+        extensions = tuple(pattern.lstrip("*").lower() for pattern in FORMAT_IMAGE_FILE.split())
+        paths = []
+        for item in inputs:
+            if os.path.isdir(item):
+                for name in sorted(os.listdir(item)):
+                    if name.lower().endswith(extensions):
+                        paths.append(os.path.join(item, name))
+            elif glob.has_magic(item):
+                paths.extend(sorted(glob.glob(item)))
+            else:
+                paths.append(item)
+
+        # Убираем повторы, сохраняя порядок
+        return list(dict.fromkeys(paths))
+
+    def run(self, paths, callback=None):
+        """Обработка списка изображений в пуле процессов"""
+        start_time = time.perf_counter()
+        results = []
+
+        with multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                  initargs=(self.max_dimension, self.cv_threads, self.save,
+                                            self.cache_dir, self.lean, self.image_format,
+                                            self.quality, self.multi, self.multiscale,
+                                            self.adaptive_text, self.prefilter)) as pool:
+            for result in pool.imap_unordered(_process_file, paths):
+                results.append(result)
+                METRICS.add_records(result["stages"])
+                if callback is not None:
+                    callback(result)
+            # Штатное завершение процессов, чтобы фоновая запись успела закончиться
+            pool.close()
+            pool.join()
+
+        elapsed = time.perf_counter() - start_time
+        processed = [result["time"] for result in results if result["status"] == "ok"]
+        rejected = [result["time"] for result in results if result["status"] == "rejected"]
+        summary = {
+            "total": len(paths),
+            "processed": len(processed),
+            "rejected": len(rejected),
+            "failed": len(results) - len(processed) - len(rejected),
+            # Нечитаемые файлы входят в число ошибок, но считаются и отдельно
+            "unreadable": sum(1 for result in results if result["status"] == "unreadable"),
+            "saved": Metrics.estimate_saved(len(rejected), sum(rejected), len(processed), sum(processed)),
+            "elapsed": elapsed,
+            "throughput": len(results) / elapsed if elapsed > 0 else 0.0,
+        }
+        return results, summary
@@ -0,0 +1,112 @@
+from core.projection_engine import BOX_DTYPE
+from shared.constants import CHAR_MIN_AREA, CHAR_MAX_ASPECT, CHAR_DOT_RATIO, CHAR_DOT_GAP, CHAR_SPLIT_WIDTH
+from shared.load_library import cv
+from shared.load_library import np
+
+class CharacterEngine:
+
+    def __init__(self, min_area=CHAR_MIN_AREA, max_aspect=CHAR_MAX_ASPECT,
+                 dot_ratio=CHAR_DOT_RATIO, dot_gap=CHAR_DOT_GAP, split_width=CHAR_SPLIT_WIDTH):
+        self.min_area = min_area        # Минимальная площадь компоненты (меньше - шум)
+        self.max_aspect = max_aspect    # Максимальное отношение ширины к высоте (больше - линейки, подчеркивания)
+        self.dot_ratio = dot_ratio      # Доля медианной площади символа, ниже которой компонента - точка
+        self.dot_gap = dot_gap          # Максимальный зазор между точкой и основой символа (в высотах точки)
+        self.split_width = split_width  # Ширина слипшихся символов в медианных ширинах символа
+
+    def find_characters(self, binary_image, lines):
+        """Находит символы во всех строках за один проход по компонентам связности"""
+        if len(lines) == 0:
+            return np.zeros(0, dtype=BOX_DTYPE)
+
+        # 16-битные метки вдвое уменьшают объем записи в память; на очень зашумленных
+        # страницах, где компонент больше 65535, OpenCV выдает ошибку и берутся 32-битные
+        try:
+            _, labels, stats, _ = cv.connectedComponentsWithStats(binary_image, connectivity=8, ltype=cv.CV_16U)
+        except cv.error:
+            _, labels, stats, _ = cv.connectedComponentsWithStats(binary_image, connectivity=8, ltype=cv.CV_32S)
+        stats = stats[1:]  # Без фона
+        x1 = stats[:, cv.CC_STAT_LEFT].copy()
+        y1 = stats[:, cv.CC_STAT_TOP].copy()
+        x2 = x1 + stats[:, cv.CC_STAT_WIDTH] - 1
+        y2 = y1 + stats[:, cv.CC_STAT_HEIGHT] - 1
+        area = stats[:, cv.CC_STAT_AREA]
+
+        # Отбрасываем шум и линейки
+        keep = (area >= self.min_area) & (stats[:, cv.CC_STAT_WIDTH] <= stats[:, cv.CC_STAT_HEIGHT] * self.max_aspect)
+        if not np.any(keep):
+            return np.zeros(0, dtype=BOX_DTYPE)
+        # Точки присоединяются до распределения по строкам: центр точки над i часто выше строки
+        self._merge_dots(labels, x1, y1, x2, y2, area, keep)
+
+        # Строка символа - та, в которую попадает центр его рамки по вертикали
+        center_y = (y1 + y2) / 2
+        line_index = np.searchsorted(lines["y1"], center_y, side="right") - 1
+        keep &= line_index >= 0
+        line_index = np.maximum(line_index, 0)
+        keep &= center_y <= lines["y2"][line_index]
+
+        # Рисунки выше двух строк - не символы
+        line_height = lines["y2"][line_index] - lines["y1"][line_index] + 1
+        keep &= y2 - y1 + 1 <= 2 * line_height
+
+        characters = np.zeros(np.count_nonzero(keep), dtype=BOX_DTYPE)
+        characters["x1"] = x1[keep]
+        characters["y1"] = y1[keep]
+        characters["x2"] = x2[keep]
+        characters["y2"] = y2[keep]
+        characters["line"] = line_index[keep]
+        characters = self._split_merged(characters)
+
+        # Порядок чтения: по строкам, внутри строки слева направо
+        return characters[np.lexsort((characters["x1"], characters["line"]))]
+
+    def _merge_dots(self, labels, x1, y1, x2, y2, area, keep):
+        """Присоединяет точки (над i, j, верхняя точка двоеточия) к компоненте под ними:
+        рамка основы расширяется до рамки точки, точка исключается из keep"""
+        dots = np.flatnonzero(keep & (area < np.median(area[keep]) * self.dot_ratio))
+        if len(dots) == 0:
+            return
+
+        # Под каждой точкой просматриваем метки на высоту dot_gap высот точки
+        # в трех столбцах: левый край, центр и правый край точки
+        dot_height = y2[dots] - y1[dots] + 1
+        steps = np.arange(1, int(dot_height.max() * self.dot_gap) + 1)
+        rows = np.minimum(y2[dots][:, None] + steps[None, :], labels.shape[0] - 1)
+        columns = np.stack([x1[dots], (x1[dots] + x2[dots]) // 2, x2[dots]], axis=1)
+        probe = labels[rows[:, :, None], columns[:, None, :]].astype(np.int64)
+        probe[steps[None, :] > dot_height[:, None] * self.dot_gap] = 0
+
+        # Первая непустая метка под точкой
+        hit = probe > 0
+        found = hit.any(axis=(1, 2))
+        first_row = hit.any(axis=2).argmax(axis=1)
+        first_column = hit[np.arange(len(dots)), first_row].argmax(axis=1)
+        base = probe[np.arange(len(dots)), first_row, first_column] - 1
+
+        merged = found & keep[np.maximum(base, 0)] & (base != dots)
+        if not np.any(merged):
+            return
+        dots, base = dots[merged], base[merged]
+        np.minimum.at(x1, base, x1[dots])
+        np.minimum.at(y1, base, y1[dots])
+        np.maximum.at(x2, base, x2[dots])
+        keep[dots] = False
+
+    def _split_merged(self, characters):
+        """Делит слипшиеся символы (компонента шире split_width медианных ширин) на равные части"""
+        if len(characters) == 0:
+            return characters
+        width = characters["x2"] - characters["x1"] + 1
+        median = np.median(width)
+        parts = np.where(width > median * self.split_width, np.maximum(np.round(width / median), 1), 1).astype(np.int64)
+        if np.all(parts == 1):
+            return characters
+
+        # Номер части внутри своей компоненты и ширина части
+        result = np.repeat(characters, parts)
+        index = np.arange(len(result)) - np.repeat(np.cumsum(parts) - parts, parts)
+        step = np.repeat(width / parts, parts)
+        x1 = np.repeat(characters["x1"], parts)
+        result["x1"] = x1 + np.floor(index * step)
+        result["x2"] = x1 + np.floor((index + 1) * step) - 1
+        return result
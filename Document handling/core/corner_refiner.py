@@ -0,0 +1,117 @@
+from shared.constants import REFINE_WINDOW, REFINE_SAMPLES, REFINE_MIN_ANGLE
+from shared.load_library import cv
+from shared.load_library import np
+
+class CornerRefiner:
+
+    def __init__(self, window=REFINE_WINDOW, samples=REFINE_SAMPLES, min_angle=REFINE_MIN_ANGLE):
+        self.window = window          # Длина участка стороны у угла на уровне пирамиды (пиксели уровня)
+        self.samples = samples        # Количество точек на каждой стороне для подгонки прямой
+        self.min_angle = min_angle    # Минимальный угол между сторонами (градусы), меньше - пересечение ненадежно
+
+    def refine(self, image, corners, coarse_scale):
+        """Уточнение отсортированных углов (в координатах image), найденных в масштабе coarse_scale.
+
+        Уровни пирамиды идут с удвоением масштаба до исходного разрешения; на каждом уровне
+        обрабатывается только окно вокруг угла: обе прилегающие стороны ищутся по максимуму
+        градиента поперек стороны, угол - пересечение прямых, подогнанных по найденным точкам"""
+        corners = np.float64(corners).reshape(4, 2)
+        scale = coarse_scale
+        while scale < 1.0:
+            scale = min(scale * 2, 1.0)
+            corners = np.array([self._refine_corner(image, corners, index, scale) for index in range(4)])
+        return corners.astype(np.float32)
+
+    def _refine_corner(self, image, corners, index, scale):
+        """Один угол на уровне scale; при неудаче остается прежним"""
+        corner = corners[index]
+        image_height, image_width = image.shape[:2]
+
+        # Окно уровня: стороны на длину window и поиск поперек на половину window,
+        # вырезается из исходного изображения и уменьшается только оно
+        half = 1.5 * self.window / scale + 2
+        x0 = max(int(np.floor(corner[0] - half)), 0)
+        y0 = max(int(np.floor(corner[1] - half)), 0)
+        x1 = min(int(np.ceil(corner[0] + half)) + 1, image_width)
+        y1 = min(int(np.ceil(corner[1] + half)) + 1, image_height)
+        if x1 - x0 < 8 or y1 - y0 < 8:
+            return corner
+
+        patch = image[y0:y1, x0:x1]
+        if patch.ndim == 3:
+            patch = cv.cvtColor(patch, cv.COLOR_BGR2GRAY)
+        level_size = (max(int(round((x1 - x0) * scale)), 1), max(int(round((y1 - y0) * scale)), 1))
+        if scale < 1.0:
+            patch = cv.resize(patch, level_size, interpolation=cv.INTER_AREA)
+        scale_xy = np.float64([patch.shape[1] / (x1 - x0), patch.shape[0] / (y1 - y0)])
+        origin = np.float64([x0, y0])
+
+        patch = cv.GaussianBlur(patch, (3, 3), 0)
+        gradient_x = cv.Sobel(patch, cv.CV_32F, 1, 0, ksize=3)
+        gradient_y = cv.Sobel(patch, cv.CV_32F, 0, 1, ksize=3)
+
+        # Координаты уровня: центры пикселей, как у cv.resize
+        center = (corner - origin + 0.5) * scale_xy - 0.5
+        lines = []
+        for neighbour in (corners[(index + 1) % 4], corners[(index - 1) % 4]):
+            direction = (neighbour - corner) * scale_xy
+            length = np.linalg.norm(direction)
+            if length < self.window:
+                return corner
+            line = self._fit_side(gradient_x, gradient_y, center, direction / length)
+            if line is None:
+                return corner
+            lines.append(line)
+
+        point = self._intersect(*lines)
+        if point is None or np.linalg.norm(point - center) > self.window / 2:
+            return corner
+        return (point + 0.5) / scale_xy - 0.5 + origin
+
+    def _fit_side(self, gradient_x, gradient_y, center, direction):
+        """Прямая стороны документа у угла: (точка, направление) или None"""
+        normal = np.float64([-direction[1], direction[0]])
+        # Точки стороны начинаются отступив от угла: у скругленных и загнутых углов край не прямой
+        along = np.linspace(0.3 * self.window, self.window, self.samples)
+        across = np.arange(-(self.window // 2), self.window // 2 + 1, dtype=np.float64)
+
+        points = center + along[:, None, None] * direction + across[None, :, None] * normal
+        map_x = points[:, :, 0].astype(np.float32)
+        map_y = points[:, :, 1].astype(np.float32)
+        sampled_x = cv.remap(gradient_x, map_x, map_y, cv.INTER_LINEAR, borderMode=cv.BORDER_CONSTANT)
+        sampled_y = cv.remap(gradient_y, map_x, map_y, cv.INTER_LINEAR, borderMode=cv.BORDER_CONSTANT)
+        profile = sampled_x * normal[0] + sampled_y * normal[1]
+
+        # Перепад яркости на краю листа одного знака вдоль всей стороны:
+        # знак берется по сильнейшим откликам, перепады другого знака (фон, текст) отбрасываются
+        strongest = profile[np.arange(len(along)), np.abs(profile).argmax(axis=1)]
+        profile = profile * (1.0 if strongest.sum() >= 0 else -1.0)
+
+        peak = profile.argmax(axis=1)
+        value = profile[np.arange(len(along)), peak]
+        valid = (peak > 0) & (peak < len(across) - 1) & (value > 0.3 * value.max())
+        if np.count_nonzero(valid) < max(3, self.samples // 2):
+            return None
+
+        # Субпиксельное положение пика по параболе через три соседних значения
+        rows = np.flatnonzero(valid)
+        left = profile[rows, peak[rows] - 1]
+        middle = profile[rows, peak[rows]]
+        right = profile[rows, peak[rows] + 1]
+        denominator = left - 2 * middle + right
+        offset = np.where(denominator < 0, 0.5 * (left - right) / np.minimum(denominator, -1e-6), 0.0)
+        offset = across[peak[rows]] + np.clip(offset, -0.5, 0.5)
+
+        edge = center + along[rows, None] * direction + offset[:, None] * normal
+        vx, vy, px, py = cv.fitLine(edge.astype(np.float32), cv.DIST_HUBER, 0, 0.01, 0.01).ravel()
+        return np.float64([px, py]), np.float64([vx, vy])
+
+    def _intersect(self, first, second):
+        """Пересечение двух прямых (точка, направление) или None для почти параллельных"""
+        (point1, direction1), (point2, direction2) = first, second
+        cross = direction1[0] * direction2[1] - direction1[1] * direction2[0]
+        if abs(cross) < np.sin(np.radians(self.min_angle)):
+            return None
+        delta = point2 - point1
+        t = (delta[0] * direction2[1] - delta[1] * direction2[0]) / cross
+        return point1 + t * direction1
@@ -0,0 +1,274 @@
+from core.document_transformation import DocumentTransformation
+from core.text_analyzer import TextAnalyzer
+from core.tiled_warp import TiledWarp
+from utils.file_handler import FileHandler
+from utils.metrics import METRICS, Metrics
+from utils.result_cache import ResultCache
+from shared.constants import MAX_DIMENSION, LEAN_DOCUMENT, BATCH_CV_THREADS, MULTISCALE_CORNERS, ADAPTIVE_TEXT
+from shared.constants import PREFILTER
+from shared.constants import SERVER_WORKERS, SERVER_QUEUE_SIZE, SERVER_MAX_UPLOAD, SERVER_LATENCY_HISTORY
+from shared.load_library import cv
+from shared.load_library import np
+from shared.load_library import os
+from shared.load_library import json
+from shared.load_library import time
+from shared.load_library import asyncio
+from shared.load_library import base64
+from shared.load_library import hashlib
+from shared.load_library import threading
+from shared.load_library import deque
+from shared.load_library import ThreadPoolExecutor
+from shared.load_library import urlsplit, parse_qs
+
+HTTP_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 422: "Unprocessable Entity", 429: "Too Many Requests",
+               500: "Internal Server Error"}
+
+# Обработчики, создаваемые один раз в каждом потоке пула
+_local = threading.local()
+
+
+class DocumentService:
+    """HTTP-сервис обработки документов: обработчики создаются один раз на поток пула,
+    одновременно выполняется не больше workers запросов, еще queue_size ждут, остальные получают 429"""
+
+    def __init__(self, workers=SERVER_WORKERS, queue_size=SERVER_QUEUE_SIZE, max_dimension=MAX_DIMENSION,
+                 cv_threads=BATCH_CV_THREADS, lean=LEAN_DOCUMENT, cache_dir=None, max_upload=SERVER_MAX_UPLOAD,
+                 multiscale=MULTISCALE_CORNERS, adaptive_text=ADAPTIVE_TEXT, prefilter=PREFILTER):
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.queue_size = queue_size
+        self.max_upload = max_upload
+        self.cache = ResultCache(cache_dir)   # Кэш в памяти общий для всех потоков, на диске - если указан каталог
+        # Число потоков OpenCV задается на весь процесс, а не на поток пула, поэтому - один раз здесь
+        cv.setNumThreads(cv_threads)
+        self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="document-worker",
+                                           initializer=DocumentService._init_thread,
+                                           initargs=(max_dimension, cv_threads, lean, multiscale,
+                                                     adaptive_text, prefilter, self.cache))
+        self.semaphore = None                 # Создается в запущенном цикле событий
+        self.pending = 0                      # Запросы в работе и в очереди
+        self.started = time.time()
+        self.completed = 0
+        self.failed = 0                       # Ошибки обработки (документ не найден, ошибка анализа)
+        self.client_errors = 0                # Некорректные запросы к /process (ответы 400 и 413)
+        self.rejected = 0
+        self.prefiltered = 0                  # Снимки, отклоненные предварительной проверкой
+        self.prefiltered_time = 0.0           # Суммарная задержка отклоненных снимков
+        self.completed_time = 0.0             # Суммарная задержка обработанных снимков
+        self.latencies = deque(maxlen=SERVER_LATENCY_HISTORY)
+
+    def _init_thread(max_dimension, cv_threads, lean, multiscale, adaptive_text, prefilter, cache):
+        """Инициализация потока пула: свои обработчики (у них есть состояние между этапами);
+        плитки больших страниц считаются в cv_threads потоках, чтобы потоки запросов не умножались на число ядер"""
+        _local.transform = DocumentTransformation(max_dimension, cache=cache, lean=lean, multiscale=multiscale,
+                                                  prefilter=prefilter, tiled_warp=TiledWarp(threads=cv_threads))
+        _local.analyzer = TextAnalyzer(cache=cache, adaptive=adaptive_text)
+
+    async def serve(self, host, port):
+        """Запуск сервера до остановки цикла событий"""
+        self.semaphore = asyncio.Semaphore(self.workers)
+        # Потоки пула создаются заранее, чтобы первый запрос не ждал инициализации
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, time.sleep, 0.05)
+                               for _ in range(self.workers)))
+
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print(f"Сервер запущен: http://{host}:{port} (потоков: {self.workers}, очередь: {self.queue_size})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=True)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            status, content_type, body = await self._handle_request(reader)
+        except Exception as e:
+            status, content_type, body = self._json(500, {"error": str(e)})
+
+        headers = [f"HTTP/1.1 {status} {HTTP_STATUS.get(status, '')}",
+                   f"Content-Type: {content_type}",
+                   f"Content-Length: {len(body)}",
+                   "Connection: close"]
+        if status == 429:
+            headers.append("Retry-After: 1")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def _handle_request(self, reader):
+        """Разбор запроса HTTP/1.1 и выбор обработчика"""
+        request_line = await reader.readline()
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            return self._json(400, {"error": "некорректный запрос"})
+        method, target, _ = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        url = urlsplit(target)
+        if url.path == "/health":
+            return self._json(200, {"status": "ok"})
+        if url.path == "/metrics":
+            return 200, "text/plain; version=0.0.4", self.to_prometheus().encode("utf-8")
+        if url.path == "/stats":
+            return self._json(200, self.get_stats())
+        if url.path != "/process":
+            return self._json(404, {"error": "неизвестный путь"})
+        if method != "POST":
+            return self._json(405, {"error": "ожидается POST с изображением в теле запроса"})
+
+        # Content-Length - только десятичные цифры (int() принял бы еще знак, пробелы и "_")
+        length = headers.get("content-length", "0")
+        if not (length.isascii() and length.isdigit()):
+            return self._client_error(400, "некорректный заголовок Content-Length")
+        length = int(length)
+        if length == 0:
+            return self._client_error(400, "пустое тело запроса")
+        if length > self.max_upload:
+            return self._client_error(413, f"изображение больше {self.max_upload} байт")
+
+        # Backpressure: лишние запросы сразу отклоняются, тело даже не читается
+        if self.pending >= self.workers + self.queue_size:
+            self.rejected += 1
+            return self._json(429, {"error": "сервер перегружен, повторите запрос позже"})
+
+        self.pending += 1
+        try:
+            data = await reader.readexactly(length)
+            image_format = parse_qs(url.query).get("image", [None])[0]
+            start_time = time.perf_counter()
+            async with self.semaphore:
+                loop = asyncio.get_running_loop()
+                status, result = await loop.run_in_executor(self.executor, self._process, data, image_format)
+            latency = time.perf_counter() - start_time
+        finally:
+            self.pending -= 1
+
+        if status == 400:
+            # Ошибка в самом запросе (формат ответа, не изображение), а не в обработке;
+            # быстрые отказы не попадают в задержки, иначе p50/p95/p99 занижаются
+            self.client_errors += 1
+        else:
+            self.latencies.append(latency)
+            if status == 200:
+                self.completed += 1
+                self.completed_time += latency
+            elif "reason" in result:
+                self.prefiltered += 1
+                self.prefiltered_time += latency
+            else:
+                self.failed += 1
+        result["latency"] = latency
+        return self._json(status, result)
+
+    def _process(self, data, image_format):
+        """Обработка одного изображения в потоке пула"""
+        if image_format is not None:
+            # Проверяем формат до обработки, чтобы не тратить время на заведомо ошибочный запрос
+            try:
+                extension, params = FileHandler.encode_params(image_format)
+            except ValueError as e:
+                return 400, {"error": str(e)}
+
+        with METRICS.stage("decode") as timer:
+            timer.image = cv.imdecode(np.frombuffer(data, np.uint8), cv.IMREAD_COLOR)
+        image = timer.image
+        if image is None:
+            return 400, {"error": "не удалось декодировать изображение"}
+
+        # Хэш содержимого совпадает с хэшем файла, поэтому кэш общий с пакетным режимом
+        digest = hashlib.sha256(data).hexdigest()
+        document = _local.transform.process_image(image, digest)
+        if not document and _local.transform.rejection is not None:
+            return 422, {"error": "снимок отклонен предварительной проверкой", "reason": _local.transform.rejection}
+        if not document:
+            return 422, {"error": "документ не найден"}
+        document = _local.analyzer.process_document(document)
+
+        lines, words = document.get_text_boxes()
+        if lines is None:
+            return 500, {"error": "ошибка анализа текста"}
+        count_lines, count_characters = document.get_info_text_img()
+        height, width = document.get_transformed_img().shape[:2]
+        result = {
+            "count_lines": count_lines,
+            "count_words": document.get_count_words(),
+            "count_characters": count_characters,
+            "width": width,
+            "height": height,
+            "segmentation": _local.transform.used_segmentation,
+            "lines": [[int(line["x1"]), int(line["y1"]), int(line["x2"]), int(line["y2"])] for line in lines],
+            "words": [[int(word["x1"]), int(word["y1"]), int(word["x2"]), int(word["y2"]), int(word["line"])]
+                      for word in words],
+            "characters": [[int(char["x1"]), int(char["y1"]), int(char["x2"]), int(char["y2"]), int(char["line"])]
+                           for char in document.get_character_boxes()],
+        }
+        if image_format is not None:
+            _, encoded = cv.imencode(extension, document.get_transformed_img(), params)
+            result["image"] = base64.b64encode(encoded.tobytes()).decode("ascii")
+        return 200, result
+
+    def _client_error(self, status, message):
+        """Ответ на некорректный запрос к /process с учетом в статистике"""
+        self.client_errors += 1
+        return self._json(status, {"error": message})
+
+    def _json(self, status, value):
+        return status, "application/json; charset=utf-8", json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+    def get_stats(self):
+        """Задержка и пропускная способность сервиса"""
+        uptime = time.time() - self.started
+        stats = {
+            "uptime": uptime,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "client_errors": self.client_errors,
+            "rejected": self.rejected,
+            "prefiltered": self.prefiltered,
+            "prefilter_saved": Metrics.estimate_saved(self.prefiltered, self.prefiltered_time,
+                                                      self.completed, self.completed_time),
+            "throughput": self.completed / uptime if uptime > 0 else 0.0,
+            "cache": self.cache.get_stats(),
+        }
+        if self.latencies:
+            p50, p95, p99 = np.percentile(list(self.latencies), [50, 95, 99])
+            stats.update({"latency_p50": float(p50), "latency_p95": float(p95), "latency_p99": float(p99)})
+        return stats
+
+    def to_prometheus(self, prefix="document"):
+        """Метрики сервиса и этапов обработки в текстовом формате Prometheus"""
+        stats = self.get_stats()
+        lines = [
+            f"# TYPE {prefix}_requests_total counter",
+            f'{prefix}_requests_total{{status="ok"}} {stats["completed"]}',
+            f'{prefix}_requests_total{{status="error"}} {stats["failed"]}',
+            f'{prefix}_requests_total{{status="client_error"}} {stats["client_errors"]}',
+            f'{prefix}_requests_total{{status="rejected"}} {stats["rejected"]}',
+            f'{prefix}_requests_total{{status="prefiltered"}} {stats["prefiltered"]}',
+            f"# TYPE {prefix}_prefilter_saved_seconds gauge",
+            f"{prefix}_prefilter_saved_seconds {stats['prefilter_saved']:.6f}",
+            f"# TYPE {prefix}_requests_pending gauge",
+            f"{prefix}_requests_pending {stats['pending']}",
+            f"# TYPE {prefix}_throughput_per_second gauge",
+            f"{prefix}_throughput_per_second {stats['throughput']:.6f}",
+        ]
+        if "latency_p50" in stats:
+            lines.append(f"# TYPE {prefix}_request_latency_seconds summary")
+            for quantile in ("50", "95", "99"):
+                lines.append(f'{prefix}_request_latency_seconds{{quantile="0.{quantile}"}} '
+                             f'{stats["latency_p" + quantile]:.6f}')
+        return "\n".join(lines) + "\n" + METRICS.to_prometheus(prefix)
@@ -1,223 +1,614 @@
-from utils.file_handler import FileHandler
-from models.document import Document
-from shared.constants import KERNEL, MAX_DIMENSION, DEBUG_INFO, DEBUG_IMAGE
-from shared.load_library import cv
-from shared.load_library import np
-from shared.load_library import sys
-
-class DocumentTransformation:
-
-    def __init__(self, max_dimension=MAX_DIMENSION):
-        self.max_dimension = max_dimension  # Максимальный размер для обработки
-    
-    def process_document(self, image_path):
-        try:
-            document = Document(cv.imread(image_path))
-            if document.get_original_image() is None:
-                return False
-            elif DEBUG_INFO is True:
-                print("Изображение " + image_path + " загружено!")
-            
-            # Определяем коэффициент масштабирования
-            scale_factor = self._calculate_scale_factor(document.get_dimensions())
-            if DEBUG_INFO is True:
-                print("scale_factor = ", scale_factor)
-
-            # Масштабируем изображение для быстрой обработки
-            small_img = self._resize_image(document.get_original_image(), scale_factor)
-            
-            # Создание модели документа из уменьшенного изображения
-            gray_image = cv.cvtColor(small_img, cv.COLOR_BGR2GRAY)
-
-            # Предобработка изображения
-            processed_img = self._preprocess_image(gray_image)
-            
-            # Сегментация документа на уменьшенном изображении
-            mask = self._segment_document(small_img)
-            
-            # Поиск углов документа
-            corners = self._find_corners(mask)
-            if corners is None or len(corners) < 4:
-                print("Не найдено достаточно углов для преобразования")
-                return None
-            
-            # Масштабируем углы обратно к исходному размеру
-            original_corners = corners / scale_factor
-            
-            # Сортировка углов для правильного преобразования
-            sorted_corners = self._sort_corners(original_corners)
-            
-            # Применение перспективного преобразования к исходному изображению
-            document.set_transformed_img(self._apply_perspective_transform(document.original_image, sorted_corners))
-
-            # Сохранение результата
-            return document
-
-        except Exception as e:
-            print(f"Ошибка при обработке: {str(e)}")
-            return None
-
-    def _calculate_scale_factor(self, img_shape):
-        """Вычисление коэффициента масштабирования"""
-        height, width = img_shape
-        max_size = max(height, width)
-        
-        if max_size <= self.max_dimension:
-            return 1.0
-        
-        return self.max_dimension / max_size
-
-    def _resize_image(self, image, scale_factor):
-        """Масштабирование изображения"""
-        if scale_factor == 1.0:
-            return image
-            
-        new_width = int(image.shape[1] * scale_factor)
-        new_height = int(image.shape[0] * scale_factor)
-        
-        return cv.resize(image, (new_width, new_height), interpolation=cv.INTER_AREA)
-
-    def _preprocess_image(self, gray_image):
-        """Предобработка изображения"""
-        blurred = cv.GaussianBlur(gray_image, (3, 3), 0)
-        return cv.morphologyEx(blurred, cv.MORPH_CLOSE, KERNEL, iterations=2)
-    
-    def _segment_document(self, image):
-        """Сегментация документа с использованием GrabCut на уменьшенном изображении"""
-        mask = np.zeros(image.shape[:2], np.uint8)
-        
-        # Уменьшаем отступы для маленького изображения
-        margin = max(5, min(image.shape[0], image.shape[1]) // 20)
-        rectangle = [margin, margin, image.shape[1]-margin, image.shape[0]-margin]
-        
-        bgd_model = np.zeros((1,65), np.float64)
-        fgd_model = np.zeros((1,65), np.float64)
-        
-        # Уменьшаем количество итераций для скорости
-        cv.grabCut(image, mask, rectangle, bgd_model, fgd_model, 3, cv.GC_INIT_WITH_RECT)
-        
-        # Создание бинарной маски
-        mask2 = np.where((mask==2)|(mask==0), 0, 1).astype('uint8')
-        
-        # Используем меньшие ядра для морфологических операций
-        kernel = np.ones((3,3), np.uint8)
-        mask2 = cv.morphologyEx(mask2, cv.MORPH_CLOSE, kernel)
-        mask2 = cv.morphologyEx(mask2, cv.MORPH_OPEN, kernel)
-        
-        return mask2
-    
-    def _find_corners(self, mask):
-        """Поиск углов документа на уменьшенном изображении"""
-        mask_visual = mask * 255
-        
-        # Находим контуры
-        contours, _ = cv.findContours(mask_visual, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
-        if not contours:
-            return None
-            
-        # Берем самый большой контур
-        largest_contour = max(contours, key=cv.contourArea)
-        
-        # Увеличиваем epsilon для упрощения контура на маленьком изображении
-        epsilon = 0.03 * cv.arcLength(largest_contour, True)
-        approx = cv.approxPolyDP(largest_contour, epsilon, True)
-        
-        if len(approx) >= 4:
-            corners = approx.reshape(-1, 2)
-            # Убедимся, что углы находятся внутри изображения
-            return self._validate_corners(corners, mask.shape)
-        else:
-            # Используем хорошие особенности с меньшим минимальным расстоянием
-            corners = cv.goodFeaturesToTrack(mask_visual, 4, 0.01, 20)
-            if corners is not None:
-                corners = np.int32(corners).reshape(-1, 2)
-                return self._validate_corners(corners, mask.shape)
-            return None
-
-    def _validate_corners(self, corners, img_shape):
-        """Проверка, что углы находятся в пределах изображения"""
-        height, width = img_shape[:2]
-        valid_corners = []
-        
-        for corner in corners:
-            x, y = corner
-            if 0 <= x < width and 0 <= y < height:
-                valid_corners.append(corner)
-        
-        return np.array(valid_corners) if len(valid_corners) >= 4 else None
-    
-    def _sort_corners(self, corners):
-        """Сортировка углов в порядке: верхний-левый, верхний-правый, нижний-правый, нижний-левый"""
-        if len(corners) != 4:
-            return corners
-            
-        corners = corners.reshape(4, 2)
-        sorted_corners = np.zeros((4, 2), dtype=np.float32)
-        
-        sum_coords = corners.sum(axis=1)
-        sorted_corners[0] = corners[np.argmin(sum_coords)]  # верхний-левый
-        sorted_corners[2] = corners[np.argmax(sum_coords)]  # нижний-правый
-        
-        # Оставшиеся точки
-        remaining = np.delete(corners, [np.argmin(sum_coords), np.argmax(sum_coords)], axis=0)
-        
-        diff = np.diff(remaining, axis=1)
-        sorted_corners[1] = remaining[np.argmin(diff)]  # верхний-правый
-        sorted_corners[3] = remaining[np.argmax(diff)]  # нижний-левый
-        
-        return sorted_corners
-    
-    def _apply_perspective_transform(self, image, corners):
-        """Применение перспективного преобразования для выравнивания документа"""
-        if len(corners) != 4:
-            return image
-            
-        # Определяем размеры выходного изображения
-        width = max(
-            np.linalg.norm(corners[0] - corners[1]),
-            np.linalg.norm(corners[2] - corners[3])
-        )
-        height = max(
-            np.linalg.norm(corners[0] - corners[3]),
-            np.linalg.norm(corners[1] - corners[2])
-        )
-        
-        # Целевые точки для преобразования
-        dst_points = np.float32([
-            [0, 0],
-            [width - 1, 0],
-            [width - 1, height - 1],
-            [0, height - 1]
-        ])
-        
-        if DEBUG_IMAGE is True:
-            # Создаем копию изображения для отладки
-            debug_image = image.copy()
-            
-            # Отмечаем угловые точки на изображении
-            for i, corner in enumerate(corners):
-                x, y = corner.astype(int)
-                # Рисуем круги разных цветов для разных углов
-                colors = [(0, 0, 255), (0, 255, 0), (255, 0, 0), (255, 255, 0)]  # красный, зеленый, синий, голубой
-                cv.circle(debug_image, (x, y), 20, colors[i], -1)  # закрашенные круги
-                cv.putText(debug_image, str(i), (x + 15, y + 5), 
-                        cv.FONT_HERSHEY_SIMPLEX, 0.7, colors[i], 2)
-            
-            # Рисуем контур, соединяющий точки
-            for i in range(4):
-                start_point = corners[i].astype(int)
-                end_point = corners[(i + 1) % 4].astype(int)
-                cv.line(debug_image, tuple(start_point), tuple(end_point), (255, 255, 255), 2)
-            
-            # Показываем размеры на изображении
-            cv.putText(debug_image, f'Output: {int(width)}x{int(height)}', (10, 30), 
-                    cv.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            
-            cv.imshow("Image corners", debug_image)
-            cv.imwrite("Image corners.png", debug_image)
-
-        # Матрица перспективного преобразования
-        M = cv.getPerspectiveTransform(corners, dst_points)
-        
-        # Применяем преобразование
-        return cv.warpPerspective(image, M, (int(width), int(height)))
\ No newline at end of file
+from utils.file_handler import FileHandler
+from models.document import Document
+from utils.metrics import METRICS
+from utils.result_cache import ResultCache
+from utils.image_reader import ImageReader
+from core.tiled_warp import TiledWarp
+from core.corner_refiner import CornerRefiner
+from core.quality_gate import QualityGate
+from shared.constants import KERNEL, MAX_DIMENSION, DEBUG_INFO, DEBUG_IMAGE
+from shared.constants import SEGMENTATION_METHOD, SEGMENTATION_MIN_AREA, LEAN_DOCUMENT, REDUCED_DECODE
+from shared.constants import WARP_TILED_MIN_PIXELS, MULTI_DOCUMENT_MIN_AREA, MULTISCALE_CORNERS, COARSE_DIMENSION
+from shared.constants import MULTI_DOCUMENT_SEGMENTATION
+from shared.constants import PREFILTER
+from shared.constants import SEGMENTATION_MIN_SUPPORT, SEGMENTATION_EDGE_STEP, SEGMENTATION_SUPPORT_SAMPLES
+from shared.load_library import cv
+from shared.load_library import np
+from shared.load_library import sys
+
+SEGMENTATION_METHODS = ("edges", "threshold", "grabcut")
+# Методы, находящие отдельные четырехугольники (GrabCut выделяет только один документ)
+QUAD_SEGMENTATION_METHODS = ("edges", "threshold")
+
+class DocumentTransformation:
+
+    def __init__(self, max_dimension=MAX_DIMENSION, segmentation=SEGMENTATION_METHOD,
+                 min_area=SEGMENTATION_MIN_AREA, grabcut_fallback=True, metrics=None, cache=None,
+                 lean=LEAN_DOCUMENT, reduced_decode=REDUCED_DECODE, tiled_warp=None,
+                 multiscale=MULTISCALE_CORNERS, coarse_dimension=COARSE_DIMENSION, corner_refiner=None,
+                 prefilter=PREFILTER, quality_gate=None, multi_segmentation=MULTI_DOCUMENT_SEGMENTATION):
+        if segmentation not in SEGMENTATION_METHODS:
+            raise ValueError(f"Неизвестный метод сегментации: {segmentation}")
+        if multi_segmentation not in QUAD_SEGMENTATION_METHODS:
+            raise ValueError(f"Метод сегментации нескольких документов должен быть edges или threshold: {multi_segmentation}")
+        self.max_dimension = max_dimension  # Максимальный размер для обработки
+        self.segmentation = segmentation    # Метод сегментации документа
+        # Метод для нескольких документов: тот же, если он находит четырехугольники, иначе быстрый
+        self.multi_segmentation = segmentation if segmentation in QUAD_SEGMENTATION_METHODS else multi_segmentation
+        self.min_area = min_area            # Минимальная доля площади для четырехугольника
+        self.grabcut_fallback = grabcut_fallback  # Использовать GrabCut, если быстрый метод не справился
+        self.used_segmentation = None       # Метод, который фактически дал маску
+        self.metrics = metrics if metrics is not None else METRICS  # Замер этапов обработки
+        self.cache = cache                  # Кэш найденных углов (ResultCache или None)
+        self.lean = lean                    # Создавать документы в экономном режиме памяти
+        self.reduced_decode = reduced_decode  # Искать углы на JPEG, декодированном в уменьшенном разрешении
+        # Преобразование больших страниц по плиткам в нескольких потоках
+        self.tiled_warp = tiled_warp if tiled_warp is not None else TiledWarp()
+        # Грубый поиск углов на уровне coarse_dimension и уточнение в окнах вокруг углов
+        self.multiscale = multiscale
+        self.coarse_dimension = coarse_dimension
+        self.corner_refiner = corner_refiner if corner_refiner is not None else CornerRefiner()
+        # Отклонение непригодных снимков по миниатюре до сегментации
+        self.prefilter = prefilter
+        self.quality_gate = quality_gate if quality_gate is not None else QualityGate()
+        self.rejection = None               # Причина отклонения последнего снимка (код QualityGate)
+        self.unreadable = False             # Последний файл не удалось прочитать как изображение
+    
+    def process_document(self, image_path):
+        try:
+            self.rejection = None
+            self.unreadable = False
+            # Углы из кэша по хэшу файла и параметрам
+            digest = ResultCache.file_digest(image_path) if self.cache is not None else None
+            cache_key, sorted_corners = self._cached_corners(digest)
+            from_cache = sorted_corners is not None
+
+            # Поиск углов на изображении, декодированном сразу в уменьшенном разрешении
+            reduced_shape = None
+            if sorted_corners is None and self.reduced_decode is True:
+                with self.metrics.stage("decode_reduced") as timer:
+                    timer.image = ImageReader.read_reduced(image_path, self._detection_dimension())
+                reduced_image, timer.image = timer.image, None
+                if reduced_image is not None:
+                    reduced_shape = reduced_image.shape[:2]
+                    # Уточнение углов - уже по изображению в полном разрешении
+                    sorted_corners = self.detect_corners(reduced_image, refine=False)
+                    del reduced_image
+                    if sorted_corners is None:
+                        self._print_failure("Не найдено достаточно углов для преобразования")
+                        return None
+
+            # Единственное декодирование в полном разрешении
+            with self.metrics.stage("decode") as timer:
+                timer.image = cv.imread(image_path)
+            if timer.image is None:
+                # Файл отсутствует, поврежден или не является изображением
+                self.unreadable = True
+                print("Не удалось загрузить изображение " + image_path)
+                return None
+            document = Document(timer.image, lean=self.lean)
+            document.cache_key = cache_key
+            if DEBUG_INFO is True:
+                print("Изображение " + image_path + " загружено!")
+            
+            if reduced_shape is not None:
+                # Переносим углы из уменьшенного изображения в исходное
+                height, width = document.get_original_image().shape[:2]
+                scale = np.float32([width / reduced_shape[1], height / reduced_shape[0]])
+                sorted_corners = (sorted_corners * scale).astype(np.float32)
+                sorted_corners = self.refine_corners(document.get_original_image(), sorted_corners)
+            elif sorted_corners is None:
+                sorted_corners = self.detect_corners(document.get_original_image())
+            if sorted_corners is None:
+                self._print_failure("Не найдено достаточно углов для преобразования")
+                return None
+            if cache_key is not None and from_cache is False:
+                self.cache.put(cache_key, {"corners": sorted_corners})
+            
+            # Применение перспективного преобразования к исходному изображению
+            with self.metrics.stage("warp", document.get_original_image()):
+                document.set_transformed_img(self._apply_perspective_transform(document.original_image, sorted_corners))
+
+            # Сохранение результата
+            return document
+
+        except Exception as e:
+            print(f"Ошибка при обработке: {str(e)}")
+            return None
+
+    def process_image(self, image, digest=None):
+        """Поиск углов и выравнивание уже декодированного изображения (например, присланного по сети),
+        digest - SHA-256 исходного файла для кэша углов"""
+        try:
+            self.rejection = None
+            cache_key, sorted_corners = self._cached_corners(digest)
+            document = Document(image, lean=self.lean)
+            document.cache_key = cache_key
+
+            if sorted_corners is None:
+                sorted_corners = self.detect_corners(image)
+                if sorted_corners is None:
+                    self._print_failure("Не найдено достаточно углов для преобразования")
+                    return None
+                if cache_key is not None:
+                    self.cache.put(cache_key, {"corners": sorted_corners})
+
+            with self.metrics.stage("warp", image):
+                document.set_transformed_img(self._apply_perspective_transform(image, sorted_corners))
+            return document
+
+        except Exception as e:
+            print(f"Ошибка при обработке: {str(e)}")
+            return None
+
+    def process_documents(self, image_path, min_area=MULTI_DOCUMENT_MIN_AREA):
+        """Все документы на фотографии: одно декодирование, одна сегментация,
+        выравнивание каждого найденного четырехугольника. Возвращает список документов"""
+        try:
+            self.rejection = None
+            self.unreadable = False
+            cache_key = None
+            all_corners = None
+            if self.cache is not None:
+                cache_key = ResultCache.make_key(ResultCache.file_digest(image_path), "corners_multi",
+                                                 self._cache_params(), self.multi_segmentation, min_area)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    all_corners = list(cached["corners"])
+
+            # Поиск углов на изображении, декодированном сразу в уменьшенном разрешении
+            reduced_shape = None
+            if all_corners is None and self.reduced_decode is True:
+                with self.metrics.stage("decode_reduced") as timer:
+                    timer.image = ImageReader.read_reduced(image_path, self._detection_dimension())
+                reduced_image, timer.image = timer.image, None
+                if reduced_image is not None:
+                    reduced_shape = reduced_image.shape[:2]
+                    all_corners = self.detect_all_corners(reduced_image, min_area, refine=False)
+                    del reduced_image
+                    if not all_corners:
+                        self._print_failure("Документы не найдены")
+                        return []
+
+            with self.metrics.stage("decode") as timer:
+                timer.image = cv.imread(image_path)
+            image = timer.image
+            if image is None:
+                self.unreadable = True
+                print("Не удалось загрузить изображение " + image_path)
+                return []
+
+            if reduced_shape is not None:
+                # Переносим углы из уменьшенного изображения в исходное
+                scale = np.float32([image.shape[1] / reduced_shape[1], image.shape[0] / reduced_shape[0]])
+                all_corners = [self.refine_corners(image, (corners * scale).astype(np.float32))
+                               for corners in all_corners]
+            elif all_corners is None:
+                all_corners = self.detect_all_corners(image, min_area)
+            if not all_corners:
+                self._print_failure("Документы не найдены")
+                return []
+            if cache_key is not None and cached is None:
+                self.cache.put(cache_key, {"corners": np.stack(all_corners)})
+
+            documents = []
+            for index, corners in enumerate(all_corners):
+                # Документы ссылаются на одно декодированное изображение без копирования
+                document = Document(image, lean=self.lean)
+                if cache_key is not None:
+                    document.cache_key = ResultCache.make_key(cache_key, index)
+                with self.metrics.stage("warp", image):
+                    document.set_transformed_img(self._apply_perspective_transform(image, corners))
+                documents.append(document)
+            return documents
+
+        except Exception as e:
+            print(f"Ошибка при обработке: {str(e)}")
+            return []
+
+    def detect_corners(self, image, refine=True):
+        """Поиск отсортированных углов документа в масштабе исходного изображения;
+        в режиме multiscale углы уточняются по image, если refine=True"""
+        # Определяем коэффициент масштабирования
+        scale_factor = self._calculate_scale_factor(image.shape[:2])
+        if DEBUG_INFO is True:
+            print("scale_factor = ", scale_factor)
+
+        # Масштабируем изображение для быстрой обработки
+        with self.metrics.stage("resize", image):
+            small_img = self._resize_image(image, scale_factor)
+
+        # Непригодный снимок отклоняется до сегментации (и до декодирования в полном разрешении)
+        if self.check_quality(small_img) is False:
+            return None
+        
+        with self.metrics.stage("preprocess", small_img):
+            # Создание модели документа из уменьшенного изображения
+            gray_image = cv.cvtColor(small_img, cv.COLOR_BGR2GRAY)
+
+            # Предобработка изображения
+            processed_img = self._preprocess_image(gray_image)
+        
+        # Сегментация документа на уменьшенном изображении
+        with self.metrics.stage("segment", small_img):
+            mask = self._segment_document(small_img, processed_img)
+        if mask is None:
+            return None
+        
+        with self.metrics.stage("corners", mask):
+            # Поиск углов документа
+            corners = self._find_corners(mask)
+            if corners is None or len(corners) < 4:
+                return None
+            
+            # Масштабируем углы обратно к исходному размеру
+            original_corners = corners / scale_factor
+            
+            # Сортировка углов для правильного преобразования
+            sorted_corners = self._sort_corners(original_corners)
+        return self.refine_corners(image, sorted_corners) if refine is True else sorted_corners
+
+    def detect_all_corners(self, image, min_area=MULTI_DOCUMENT_MIN_AREA, refine=True):
+        """Углы всех документов на изображении за один проход сегментации, от большего к меньшему"""
+        scale_factor = self._calculate_scale_factor(image.shape[:2])
+
+        with self.metrics.stage("resize", image):
+            small_img = self._resize_image(image, scale_factor)
+
+        if self.check_quality(small_img) is False:
+            return []
+
+        with self.metrics.stage("preprocess", small_img):
+            processed_img = self._preprocess_image(cv.cvtColor(small_img, cv.COLOR_BGR2GRAY))
+
+        with self.metrics.stage("segment", small_img):
+            # Четырехугольники ищутся быстрым методом и при SEGMENTATION_METHOD = "grabcut"
+            if self.multi_segmentation == "edges":
+                quads = self._find_quads(self._edge_map(processed_img), processed_img, min_area)
+            else:
+                quads = self._find_quads(self._threshold_map(processed_img), processed_img, min_area)
+            self.used_segmentation = self.multi_segmentation
+
+            # GrabCut выделяет только один документ
+            mask = None
+            if not quads and self.grabcut_fallback is True:
+                mask = self._segment_grabcut(small_img)
+                self.used_segmentation = "grabcut"
+
+        with self.metrics.stage("corners", small_img):
+            if mask is not None:
+                corners = self._find_corners(mask)
+                if corners is None or len(corners) != 4:
+                    return []
+                all_corners = [self._sort_corners(corners / scale_factor)]
+            else:
+                all_corners = [self._sort_corners(quad.reshape(-1, 2) / scale_factor) for quad in quads]
+        if refine is False:
+            return all_corners
+        return [self.refine_corners(image, corners) for corners in all_corners]
+
+    def check_quality(self, image):
+        """Предварительная проверка снимка по миниатюре (только в режиме prefilter).
+        Миниатюра всегда размера quality_gate.dimension, поэтому пороги не зависят от того,
+        какое изображение передано (max_dimension, multiscale, уменьшенное декодирование).
+        Причина отклонения сохраняется в self.rejection, измерения - в записи этапа gate"""
+        self.rejection = None
+        if self.prefilter is False:
+            return True
+        with self.metrics.stage("gate", image) as timer:
+            self.rejection, measures = self.quality_gate.check(image)
+            timer.fields = dict(measures, outcome=self.rejection or "passed")
+        return self.rejection is None
+
+    def refine_corners(self, image, corners):
+        """Уточнение углов по окнам на уровнях пирамиды (только в режиме multiscale)"""
+        if self.multiscale is False or len(corners) != 4:
+            return corners
+        with self.metrics.stage("refine", image):
+            return self.corner_refiner.refine(image, corners, self._calculate_scale_factor(image.shape[:2]))
+
+    def _print_failure(self, message):
+        """Сообщение о том, что углы не найдены, или о причине отклонения снимка"""
+        if self.rejection is not None:
+            print(f"Снимок отклонен предварительной проверкой: {self.rejection}")
+        else:
+            print(message)
+
+    def _cached_corners(self, digest):
+        """Ключ кэша углов и углы из кэша (None, если кэш не задан или записи нет)"""
+        if self.cache is None or digest is None:
+            return None, None
+        cache_key = ResultCache.make_key(digest, "corners", self._cache_params())
+        cached = self.cache.get(cache_key)
+        return cache_key, None if cached is None else cached["corners"]
+
+    def _cache_params(self):
+        """Параметры, от которых зависят найденные углы (в том числе вход сегментации
+        при уменьшенном декодировании и отклонение снимков предварительной проверкой)"""
+        params = (self.max_dimension, KERNEL.shape, int(KERNEL.sum()), self.segmentation,
+                  self.min_area, self.grabcut_fallback, self.reduced_decode, self.prefilter)
+        if self.multiscale is True:
+            refiner = self.corner_refiner
+            params += (self.coarse_dimension, refiner.window, refiner.samples, refiner.min_angle)
+        return params
+
+    def _detection_dimension(self):
+        """Максимальный размер изображения для поиска углов"""
+        return self.coarse_dimension if self.multiscale is True else self.max_dimension
+
+    def _calculate_scale_factor(self, img_shape):
+        """Вычисление коэффициента масштабирования"""
+        height, width = img_shape
+        max_size = max(height, width)
+        
+        if max_size <= self._detection_dimension():
+            return 1.0
+        
+        return self._detection_dimension() / max_size
+
+    def _resize_image(self, image, scale_factor):
+        """Масштабирование изображения"""
+        if scale_factor == 1.0:
+            return image
+            
+        new_width = int(image.shape[1] * scale_factor)
+        new_height = int(image.shape[0] * scale_factor)
+        
+        return cv.resize(image, (new_width, new_height), interpolation=cv.INTER_AREA)
+
+    def _preprocess_image(self, gray_image):
+        """Предобработка изображения"""
+        blurred = cv.GaussianBlur(gray_image, (3, 3), 0)
+        return cv.morphologyEx(blurred, cv.MORPH_CLOSE, KERNEL, iterations=2)
+    
+    def _segment_document(self, image, processed_img=None):
+        """Сегментация документа выбранным методом с GrabCut в качестве запасного варианта"""
+        if self.segmentation != "grabcut":
+            if processed_img is None:
+                processed_img = self._preprocess_image(cv.cvtColor(image, cv.COLOR_BGR2GRAY))
+
+            if self.segmentation == "edges":
+                mask = self._segment_edges(processed_img)
+            else:
+                mask = self._segment_threshold(processed_img)
+
+            if mask is not None or self.grabcut_fallback is False:
+                self.used_segmentation = self.segmentation
+                return mask
+            if DEBUG_INFO is True:
+                print(f"Метод {self.segmentation} не нашел четырехугольник, используется GrabCut")
+
+        self.used_segmentation = "grabcut"
+        return self._segment_grabcut(image)
+
+    def _segment_edges(self, processed_img):
+        """Сегментация по границам: Canny + морфология + наибольший четырехугольник"""
+        return self._quad_mask(self._edge_map(processed_img), processed_img)
+
+    def _segment_threshold(self, processed_img):
+        """Сегментация по яркости: порог Оцу + морфология + наибольший четырехугольник"""
+        return self._quad_mask(self._threshold_map(processed_img), processed_img)
+
+    def _edge_map(self, processed_img):
+        """Границы Canny с соединенными разрывами"""
+        # Пороги Canny подбираются по медиане яркости
+        median = np.median(processed_img)
+        lower = int(max(0, 0.67 * median))
+        upper = int(min(255, 1.33 * median))
+        edges = cv.Canny(processed_img, lower, upper)
+
+        # Соединяем разрывы в границе документа
+        return cv.morphologyEx(edges, cv.MORPH_CLOSE, KERNEL)
+
+    def _threshold_map(self, processed_img):
+        """Бинаризация по порогу Оцу с морфологической очисткой"""
+        _, binary = cv.threshold(processed_img, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
+        binary = cv.morphologyEx(binary, cv.MORPH_CLOSE, KERNEL, iterations=2)
+        return cv.morphologyEx(binary, cv.MORPH_OPEN, KERNEL)
+
+    def _quad_mask(self, binary, processed_img):
+        """Маска наибольшего выпуклого четырехугольника или None, если он не найден"""
+        quads = self._find_quads(binary, processed_img, self.min_area, limit=1)
+        if not quads:
+            return None
+        mask = np.zeros(binary.shape[:2], np.uint8)
+        cv.fillConvexPoly(mask, quads[0], 1)
+        return mask
+
+    def _find_quads(self, binary, processed_img, min_area, limit=None):
+        """Выпуклые четырехугольники площадью не меньше доли min_area, от большего к меньшему;
+        каждая сторона должна лежать на перепаде яркости processed_img"""
+        contours, _ = cv.findContours(binary, cv.RETR_LIST, cv.CHAIN_APPROX_SIMPLE)
+        min_area = min_area * binary.shape[0] * binary.shape[1]
+
+        quads = []
+        for contour in sorted(contours, key=cv.contourArea, reverse=True):
+            if cv.contourArea(contour) < min_area:
+                break
+            epsilon = 0.03 * cv.arcLength(contour, True)
+            approx = cv.approxPolyDP(contour, epsilon, True)
+            if len(approx) != 4 or not cv.isContourConvex(approx):
+                continue
+
+            # Контур, слившийся с предметами фона, тоже упрощается до выпуклого четырехугольника,
+            # но часть его сторон проходит не по границе листа
+            if self._side_support(processed_img, approx).min() < SEGMENTATION_MIN_SUPPORT:
+                continue
+
+            # Контур внутри уже найденного документа - внутренняя граница листа или таблица на нем
+            center = approx.reshape(-1, 2).mean(axis=0)
+            if any(cv.pointPolygonTest(quad, (float(center[0]), float(center[1])), False) >= 0 for quad in quads):
+                continue
+            quads.append(approx)
+            if limit is not None and len(quads) >= limit:
+                break
+
+        return quads
+
+    def _side_support(self, processed_img, quad, band=2):
+        """Доля точек каждой стороны четырехугольника, у которых в полосе ±band пикселей
+        поперек стороны есть перепад яркости не меньше SEGMENTATION_EDGE_STEP на пиксель"""
+        height, width = processed_img.shape[:2]
+        corners = quad.reshape(4, 2).astype(np.float64)
+        starts = corners
+        directions = np.roll(corners, -1, axis=0) - corners
+        lengths = np.maximum(np.linalg.norm(directions, axis=1), 1e-9)
+        normals = np.stack([-directions[:, 1], directions[:, 0]], axis=1) / lengths[:, None]
+
+        # Точки сторон (4, samples, 2) и смещения поперек стороны
+        steps = (np.arange(SEGMENTATION_SUPPORT_SAMPLES) + 0.5) / SEGMENTATION_SUPPORT_SAMPLES
+        points = starts[:, None, :] + steps[None, :, None] * directions[:, None, :]
+        offsets = np.arange(-band, band + 1)
+
+        def sample(shift):
+            shifted = points[:, :, None, :] + (offsets[None, None, :, None] + shift) * normals[:, None, None, :]
+            x = np.clip(np.rint(shifted[..., 0]).astype(np.int64), 0, width - 1)
+            y = np.clip(np.rint(shifted[..., 1]).astype(np.int64), 0, height - 1)
+            return processed_img[y, x].astype(np.int32)
+
+        # Центральная разность поперек стороны
+        step = np.abs(sample(1) - sample(-1)) / 2
+        return (step.max(axis=2) >= SEGMENTATION_EDGE_STEP).mean(axis=1)
+
+    def _segment_grabcut(self, image):
+        """Сегментация документа с использованием GrabCut на уменьшенном изображении"""
+        mask = np.zeros(image.shape[:2], np.uint8)
+        
+        # Уменьшаем отступы для маленького изображения
+        margin = max(5, min(image.shape[0], image.shape[1]) // 20)
+        rectangle = [margin, margin, image.shape[1]-margin, image.shape[0]-margin]
+        
+        bgd_model = np.zeros((1,65), np.float64)
+        fgd_model = np.zeros((1,65), np.float64)
+        
+        # Уменьшаем количество итераций для скорости
+        cv.grabCut(image, mask, rectangle, bgd_model, fgd_model, 3, cv.GC_INIT_WITH_RECT)
+        
+        # Создание бинарной маски
+        mask2 = np.where((mask==2)|(mask==0), 0, 1).astype('uint8')
+        
+        # Используем меньшие ядра для морфологических операций
+        kernel = np.ones((3,3), np.uint8)
+        mask2 = cv.morphologyEx(mask2, cv.MORPH_CLOSE, kernel)
+        mask2 = cv.morphologyEx(mask2, cv.MORPH_OPEN, kernel)
+        
+        return mask2
+    
+    def _find_corners(self, mask):
+        """Поиск углов документа на уменьшенном изображении"""
+        mask_visual = mask * 255
+        
+        # Находим контуры
+        contours, _ = cv.findContours(mask_visual, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+            
+        # Берем самый большой контур
+        largest_contour = max(contours, key=cv.contourArea)
+        
+        # Увеличиваем epsilon для упрощения контура на маленьком изображении
+        epsilon = 0.03 * cv.arcLength(largest_contour, True)
+        approx = cv.approxPolyDP(largest_contour, epsilon, True)
+        
+        if len(approx) >= 4:
+            corners = approx.reshape(-1, 2)
+            # Убедимся, что углы находятся внутри изображения
+            return self._validate_corners(corners, mask.shape)
+        else:
+            # Используем хорошие особенности с меньшим минимальным расстоянием
+            corners = cv.goodFeaturesToTrack(mask_visual, 4, 0.01, 20)
+            if corners is not None:
+                corners = np.int32(corners).reshape(-1, 2)
+                return self._validate_corners(corners, mask.shape)
+            return None
+
+    def _validate_corners(self, corners, img_shape):
+        """Проверка, что углы находятся в пределах изображения"""
+        height, width = img_shape[:2]
+        valid_corners = []
+        
+        for corner in corners:
+            x, y = corner
+            if 0 <= x < width and 0 <= y < height:
+                valid_corners.append(corner)
+        
+        return np.array(valid_corners) if len(valid_corners) >= 4 else None
+    
+    def _sort_corners(self, corners):
+        """Сортировка углов в порядке: верхний-левый, верхний-правый, нижний-правый, нижний-левый"""
+        if len(corners) != 4:
+            return corners
+            
+        corners = corners.reshape(4, 2)
+        sorted_corners = np.zeros((4, 2), dtype=np.float32)
+        
+        sum_coords = corners.sum(axis=1)
+        sorted_corners[0] = corners[np.argmin(sum_coords)]  # верхний-левый
+        sorted_corners[2] = corners[np.argmax(sum_coords)]  # нижний-правый
+        
+        # Оставшиеся точки
+        remaining = np.delete(corners, [np.argmin(sum_coords), np.argmax(sum_coords)], axis=0)
+        
+        diff = np.diff(remaining, axis=1)
+        sorted_corners[1] = remaining[np.argmin(diff)]  # верхний-правый
+        sorted_corners[3] = remaining[np.argmax(diff)]  # нижний-левый
+        
+        return sorted_corners
+    
+    def _apply_perspective_transform(self, image, corners):
+        """Применение перспективного преобразования для выравнивания документа"""
+        if len(corners) != 4:
+            return image
+            
+        # Определяем размеры выходного изображения
+        width = max(
+            np.linalg.norm(corners[0] - corners[1]),
+            np.linalg.norm(corners[2] - corners[3])
+        )
+        height = max(
+            np.linalg.norm(corners[0] - corners[3]),
+            np.linalg.norm(corners[1] - corners[2])
+        )
+        
+        # Целевые точки для преобразования
+        dst_points = np.float32([
+            [0, 0],
+            [width - 1, 0],
+            [width - 1, height - 1],
+            [0, height - 1]
+        ])
+        
+        if DEBUG_IMAGE is True:
+            # Создаем копию изображения для отладки
+            debug_image = image.copy()
+            
+            # Отмечаем угловые точки на изображении
+            for i, corner in enumerate(corners):
+                x, y = corner.astype(int)
+                # Рисуем круги разных цветов для разных углов
+                colors = [(0, 0, 255), (0, 255, 0), (255, 0, 0), (255, 255, 0)]  # красный, зеленый, синий, голубой
+                cv.circle(debug_image, (x, y), 20, colors[i], -1)  # закрашенные круги
+                cv.putText(debug_image, str(i), (x + 15, y + 5), 
+                        cv.FONT_HERSHEY_SIMPLEX, 0.7, colors[i], 2)
+            
+            # Рисуем контур, соединяющий точки
+            for i in range(4):
+                start_point = corners[i].astype(int)
+                end_point = corners[(i + 1) % 4].astype(int)
+                cv.line(debug_image, tuple(start_point), tuple(end_point), (255, 255, 255), 2)
+            
+            # Показываем размеры на изображении
+            cv.putText(debug_image, f'Output: {int(width)}x{int(height)}', (10, 30), 
+                    cv.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            
+            cv.imshow("Image corners", debug_image)
+            cv.imwrite("Image corners.png", debug_image)
+
+        # Матрица перспективного преобразования
+        M = cv.getPerspectiveTransform(corners, dst_points)
+        
+        # Применяем преобразование; большие страницы - по плиткам в нескольких потоках
+        size = (int(width), int(height))
+        if size[0] * size[1] >= WARP_TILED_MIN_PIXELS:
+            return self.tiled_warp.warp(image, M, size)
+        return cv.warpPerspective(image, M, size)
\ No newline at end of file
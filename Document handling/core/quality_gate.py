@@ -0,0 +1,59 @@
+from shared.constants import GATE_DIMENSION, GATE_MIN_BRIGHTNESS, GATE_MAX_BRIGHTNESS, GATE_MIN_CONTRAST
+from shared.constants import GATE_MIN_SHARPNESS, GATE_MIN_EDGES
+from shared.load_library import cv
+from shared.load_library import np
+
+# Коды причин отклонения в порядке проверки
+REJECT_REASONS = ("dark", "overexposed", "low_contrast", "blurry", "no_edges")
+
+class QualityGate:
+
+    def __init__(self, dimension=GATE_DIMENSION, min_brightness=GATE_MIN_BRIGHTNESS,
+                 max_brightness=GATE_MAX_BRIGHTNESS, min_contrast=GATE_MIN_CONTRAST,
+                 min_sharpness=GATE_MIN_SHARPNESS, min_edges=GATE_MIN_EDGES):
+        self.dimension = dimension            # Размер миниатюры по большей стороне
+        self.min_brightness = min_brightness  # Минимальная средняя яркость (недодержка)
+        self.max_brightness = max_brightness  # Максимальная средняя яркость (пересвет)
+        self.min_contrast = min_contrast      # Минимальное стандартное отклонение яркости (пустой кадр)
+        self.min_sharpness = min_sharpness    # Минимальная дисперсия лапласиана (размытие)
+        self.min_edges = min_edges            # Минимальная доля пикселей границ
+
+    def check(self, image):
+        """Проверка снимка по миниатюре размером dimension по большей стороне.
+
+        Возвращает причину отклонения (код из REJECT_REASONS или None, если снимок пригоден)
+        и измерения миниатюры. Дисперсия лапласиана и доля границ зависят от размера изображения,
+        поэтому любое входное изображение (исходный снимок, уменьшенное декодирование или уровень
+        грубого поиска) приводится к одному размеру, и пороги относятся к миниатюре"""
+        gray = cv.cvtColor(self._thumbnail(image), cv.COLOR_BGR2GRAY)
+
+        mean, std = cv.meanStdDev(gray)
+        _, laplacian_std = cv.meanStdDev(cv.Laplacian(gray, cv.CV_32F))
+        edges = cv.Canny(cv.GaussianBlur(gray, (3, 3), 0), 50, 150)
+        measures = {
+            "brightness": round(float(mean[0, 0]), 2),
+            "contrast": round(float(std[0, 0]), 2),
+            "sharpness": round(float(laplacian_std[0, 0]) ** 2, 2),
+            "edges": round(np.count_nonzero(edges) / edges.size, 5),
+        }
+
+        if measures["brightness"] < self.min_brightness:
+            return "dark", measures
+        if measures["brightness"] > self.max_brightness:
+            return "overexposed", measures
+        if measures["contrast"] < self.min_contrast:
+            return "low_contrast", measures
+        if measures["sharpness"] < self.min_sharpness:
+            return "blurry", measures
+        if measures["edges"] < self.min_edges:
+            return "no_edges", measures
+        return None, measures
+
+    def _thumbnail(self, image):
+        """Приведение к dimension по большей стороне: меньшие изображения увеличиваются"""
+        scale = self.dimension / max(image.shape[:2])
+        if scale == 1.0:
+            return image
+        size = (max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale)))
+        interpolation = cv.INTER_AREA if scale < 1.0 else cv.INTER_LINEAR
+        return cv.resize(image, size, interpolation=interpolation)
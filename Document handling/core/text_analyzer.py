@@ -1,165 +1,219 @@
-from utils.file_handler import FileHandler
-from models.document import Document
-from shared.constants import KERNEL, MAX_DIMENSION, DEBUG_INFO, DEBUG_IMAGE
-from shared.load_library import cv
-from shared.load_library import np
-from shared.load_library import sys
-
-class TextAnalyzer:
-
-    def process_document(self, document):
-        try:
-            if document is None:
-                print("Ошибка при загрузки документа")
-                return None
-            
-            # Получаем изображение из документа
-            image = document.get_transformed_img()
-            if image is None:
-                print("Нет изображения документа")
-                return None
-
-            # Делаем изображение черно-белым
-            gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
-            
-            # Превращаем в чисто черно-белое
-            _, binary = cv.threshold(gray, 0, 255, cv.THRESH_BINARY_INV + cv.THRESH_OTSU)
-            
-            # Соединяем текст в линии (делаем строки целыми)
-            horizontal_kernel = cv.getStructuringElement(cv.MORPH_RECT, (25, 1))
-            connected_text = cv.morphologyEx(binary, cv.MORPH_CLOSE, horizontal_kernel)
-
-            # Считаем белые пиксели по горизонтали
-            horizontal_sum = np.sum(connected_text, axis=1)
-            
-            # Находим строки текста
-            lines = self._find_text_lines(horizontal_sum)
-            
-            total_words = 0
-            
-            result_image = image.copy()
-            
-            # Обрабатываем каждую строку для поиска слов
-            for i, (start, end) in enumerate(lines):
-                # Рисуем зеленую рамку вокруг строки
-                cv.rectangle(result_image, (0, start), (image.shape[1], end), (0, 255, 0), 2)
-                
-                # Подписываем номер строки
-                cv.putText(result_image, f"Line {i+1}", (10, start + 15), 
-                          cv.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
-                
-                # Находим слова в строке
-                words_count = self._find_words_in_line(binary, start, end, result_image)
-                total_words += words_count
-            
-            if DEBUG_INFO is True:
-                print(f"Обработка завершена. Найдено {len(lines)} строк, {total_words} слов")
-            
-            # Отображаем промежуточные результаты только в debug режиме
-            if DEBUG_IMAGE is True:
-                cv.imshow("Binary", binary)
-                cv.imshow("Connected Lines", connected_text)
-                cv.imshow("Detected Lines", result_image)
-                cv.waitKey(0)
-                cv.destroyAllWindows()
-            
-            # Сохраняем результат обратно в документ
-            document.set_selected_text_img(result_image, len(lines), total_words)
-            return document
-            
-        except Exception as e:
-            print(f"Ошибка при обработке: {str(e)}")
-            return document
-    
-    def _find_text_lines(self, horizontal_sum):
-        """Находит строки текста по горизонтальной проекции"""
-        lines = []
-        in_line = False
-        line_start = 0
-        
-        if len(horizontal_sum) == 0:
-            return lines
-        
-        # Определяем порог для текста
-        non_zero_values = horizontal_sum[horizontal_sum > 0]
-        if len(non_zero_values) == 0:
-            return lines
-            
-        threshold = np.mean(non_zero_values) * 0.3
-        
-        for i, pixel_sum in enumerate(horizontal_sum):
-            if pixel_sum > threshold and not in_line:
-                # Начало строки
-                in_line = True
-                line_start = i
-            elif pixel_sum <= threshold and in_line:
-                # Конец строки
-                in_line = False
-                line_end = i
-                
-                # Добавляем строку, если она достаточно высокая
-                if line_end - line_start >= 5:
-                    lines.append((line_start, line_end))
-        
-        # Добавляем последнюю строку, если документ заканчивается текстом
-        if in_line:
-            line_end = len(horizontal_sum) - 1
-            if line_end - line_start >= 5:
-                lines.append((line_start, line_end))
-        
-        return lines
-    
-    def _find_words_in_line(self, binary_image, line_start, line_end, result_image):
-        """Находит слова в строке"""
-        words_count = 0
-        
-        # Проверяем валидность координат
-        if line_start >= line_end or line_start < 0 or line_end > binary_image.shape[0]:
-            return 0
-            
-        # Вырезаем область строки
-        line_region = binary_image[line_start:line_end, :]
-        
-        # Считаем белые пиксели по вертикали
-        vertical_sum = np.sum(line_region, axis=0)
-        
-        in_word = False
-        word_start = 0
-        
-        # Порог для определения слов
-        non_zero_vertical = vertical_sum[vertical_sum > 0]
-        if len(non_zero_vertical) == 0:
-            return 0
-            
-        word_threshold = np.mean(non_zero_vertical) * 0.5
-        
-        for j, pixel_sum in enumerate(vertical_sum):
-            if pixel_sum > word_threshold and not in_word:
-                # Начало слова
-                in_word = True
-                word_start = j
-            elif pixel_sum <= word_threshold and in_word:
-                # Конец слова
-                in_word = False
-                word_end = j
-                
-                # Если слово достаточно широкое
-                if word_end - word_start > 3:
-                    words_count += 1
-                    # Рисуем синюю рамку вокруг слова
-                    cv.rectangle(result_image, 
-                                (word_start, line_start), 
-                                (word_end, line_end), 
-                                (255, 0, 0), 1)
-        
-        # Обрабатываем последнее слово, если строка заканчивается текстом
-        if in_word:
-            word_end = len(vertical_sum) - 1
-            if word_end - word_start > 3:
-                words_count += 1
-                cv.rectangle(result_image, 
-                            (word_start, line_start), 
-                            (word_end, line_end), 
-                            (255, 0, 0), 1)
-        
-        return words_count
\ No newline at end of file
+from utils.file_handler import FileHandler
+from models.document import Document
+from core.projection_engine import ProjectionEngine
+from core.character_engine import CharacterEngine
+from utils.metrics import METRICS
+from utils.result_cache import ResultCache
+from shared.constants import KERNEL, MAX_DIMENSION, DEBUG_INFO, DEBUG_IMAGE
+from shared.constants import LINE_KERNEL_WIDTH, ADAPTIVE_TEXT, TEXT_HEIGHT, TEXT_PROBE_WIDTH
+from shared.load_library import cv
+from shared.load_library import np
+from shared.load_library import sys
+from shared.load_library import os
+from shared.load_library import ThreadPoolExecutor
+
+class TextAnalyzer:
+
+    def __init__(self, engine=None, metrics=None, cache=None, char_engine=None, adaptive=ADAPTIVE_TEXT,
+                 text_height=TEXT_HEIGHT, probe_width=TEXT_PROBE_WIDTH):
+        self.engine = engine if engine is not None else ProjectionEngine()
+        self.char_engine = char_engine if char_engine is not None else CharacterEngine()
+        self.metrics = metrics if metrics is not None else METRICS  # Замер этапов обработки
+        self.cache = cache  # Кэш рамок строк и слов (ResultCache или None)
+        self.adaptive = adaptive        # Анализ в рабочем разрешении, где высота текста равна text_height
+        self.text_height = text_height  # Высота текста, под которую подобраны пороги (пиксели)
+        self.probe_width = probe_width  # Минимальная ширина уменьшенной страницы для оценки высоты текста
+
+    def process_document(self, document):
+        try:
+            if document is None:
+                print("Ошибка при загрузки документа")
+                return None
+
+            # Получаем изображение из документа
+            image = document.get_transformed_img()
+            if image is None:
+                print("Нет изображения документа")
+                return None
+
+            # Рамки строк и слов из кэша, если документ уже анализировался с теми же параметрами
+            cache_key = None
+            cached = None
+            if self.cache is not None and document.cache_key is not None:
+                cache_key = ResultCache.make_key(document.cache_key, "text", self._cache_params())
+                cached = self.cache.get(cache_key)
+
+            binary = None
+            if cached is not None:
+                lines, words, characters = cached["lines"], cached["words"], cached["characters"]
+            else:
+                lines, words, characters, binary, connected_text = self._find_text_boxes(image)
+                if cache_key is not None:
+                    self.cache.put(cache_key, {"lines": lines, "words": words, "characters": characters})
+            total_words = len(words)
+            total_characters = len(characters)
+
+            # Сохраняем рамки и количество строк и символов в документ
+            document.set_selected_text_img(None, len(lines), total_characters)
+            document.set_text_boxes(lines, words, characters)
+
+            # Изображение с рамками рисуется сразу, кроме экономного режима (там - по запросу)
+            result_image = None
+            if document.lean is False or DEBUG_IMAGE is True:
+                with self.metrics.stage("rendering", image):
+                    result_image = document.render_selected_text()
+                if document.lean is False:
+                    document.set_selected_text_img(result_image, len(lines), total_characters)
+
+            if DEBUG_INFO is True:
+                print(f"Обработка завершена. Найдено {len(lines)} строк, {total_words} слов, {total_characters} символов")
+
+            # Отображаем промежуточные результаты только в debug режиме
+            if DEBUG_IMAGE is True and binary is not None:
+                cv.imshow("Binary", binary)
+                cv.imshow("Connected Lines", connected_text)
+                cv.imshow("Detected Lines", result_image)
+                cv.waitKey(0)
+                cv.destroyAllWindows()
+
+            return document
+
+        except Exception as e:
+            print(f"Ошибка при обработке: {str(e)}")
+            return document
+
+    def process_documents(self, documents, threads=0):
+        """Анализ нескольких выровненных документов одновременно в пуле потоков"""
+        if len(documents) <= 1:
+            return [self.process_document(document) for document in documents]
+
+        workers = threads if threads > 0 else min(len(documents), os.cpu_count() or 1)
+        with ThreadPoolExecutor(workers) as executor:
+            return list(executor.map(self.process_document, documents))
+
+    def _find_text_boxes(self, image):
+        """Бинаризация, соединение текста в строки и поиск рамок строк и слов"""
+        engine, char_engine, kernel_width = self.engine, self.char_engine, LINE_KERNEL_WIDTH
+        step = 1
+        if self.adaptive is True:
+            with self.metrics.stage("text_scale", image):
+                gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+
+                # Уменьшаем страницу в целое число раз так, чтобы высота текста стала
+                # не меньше text_height и меньше 2 * text_height; остаток учитывают пороги
+                step, probe, probe_step, factor = self._working_step(gray)
+                if step >= probe_step > 1:
+                    # Рабочая страница не больше уменьшенной для оценки - уменьшаем ее, а не исходную
+                    height, width = TextAnalyzer._reduced_size(gray, step)
+                    gray = probe if probe.shape == (height, width) \
+                        else cv.resize(probe, (width, height), interpolation=cv.INTER_AREA)
+                else:
+                    gray = TextAnalyzer._reduce(gray, step)
+                engine, char_engine, kernel_width = self._scaled_engines(factor)
+
+        with self.metrics.stage("threshold", image if self.adaptive is False else gray):
+            # Делаем изображение черно-белым
+            if self.adaptive is False:
+                gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+
+            # Превращаем в чисто черно-белое
+            _, binary = cv.threshold(gray, 0, 255, cv.THRESH_BINARY_INV + cv.THRESH_OTSU)
+
+        with self.metrics.stage("morphology", binary):
+            # Соединяем текст в линии (делаем строки целыми)
+            horizontal_kernel = cv.getStructuringElement(cv.MORPH_RECT, (kernel_width, 1))
+            connected_text = cv.morphologyEx(binary, cv.MORPH_CLOSE, horizontal_kernel)
+
+        with self.metrics.stage("projections", binary):
+            # Считаем белые пиксели по горизонтали
+            horizontal_sum = np.sum(connected_text, axis=1)
+
+            # Находим строки текста
+            lines = engine.find_lines(horizontal_sum, binary.shape[1])
+
+            # Находим слова во всех строках сразу
+            words = engine.find_words(binary, lines)
+
+        with self.metrics.stage("characters", binary):
+            # Символы - компоненты связности исходной бинарной маски, отнесенные к строкам
+            characters = char_engine.find_characters(binary, lines)
+
+        if step > 1:
+            # Рамки - в координатах исходного изображения
+            lines = TextAnalyzer._to_full_resolution(lines, step, image.shape)
+            lines["x2"] = image.shape[1]
+            words = TextAnalyzer._to_full_resolution(words, step, image.shape)
+            characters = TextAnalyzer._to_full_resolution(characters, step, image.shape)
+
+        return lines, words, characters, binary, connected_text
+
+    def _working_step(self, gray):
+        """Во сколько раз уменьшить страницу, уменьшенная для оценки страница и коэффициент порогов.
+
+        Высота текста - медианная высота компонент связности страницы, уменьшенной в целое
+        число раз до ширины не меньше probe_width. Уменьшение только в целое число раз: INTER_AREA с целым
+        коэффициентом в несколько раз быстрее дробного. Страница не увеличивается: если текст
+        мельче text_height, пороги умножаются на отношение высоты текста к text_height"""
+        probe_step = max(1, gray.shape[1] // self.probe_width)
+        probe = TextAnalyzer._reduce(gray, probe_step)
+        _, binary = cv.threshold(probe, 0, 255, cv.THRESH_BINARY_INV + cv.THRESH_OTSU)
+        # 16-битные метки быстрее; при переполнении - 32-битные, как в CharacterEngine
+        try:
+            _, _, stats, _ = cv.connectedComponentsWithStats(binary, connectivity=8, ltype=cv.CV_16U)
+        except cv.error:
+            _, _, stats, _ = cv.connectedComponentsWithStats(binary, connectivity=8, ltype=cv.CV_32S)
+        stats = stats[1:]  # Без фона
+
+        # Отбрасываем шум в один пиксель и линейки
+        height = stats[:, cv.CC_STAT_HEIGHT]
+        keep = (stats[:, cv.CC_STAT_AREA] >= 2) & (stats[:, cv.CC_STAT_WIDTH] <= height * self.char_engine.max_aspect)
+        if not np.any(keep):
+            # Текста нет - анализ в исходном разрешении с исходными порогами
+            return 1, probe, probe_step, 1.0
+        text_height = float(np.median(height[keep])) * probe_step
+
+        step = max(1, int(text_height // self.text_height))
+        return step, probe, probe_step, text_height / step / self.text_height
+
+    def _reduced_size(image, step):
+        """Размер (высота, ширина) изображения, уменьшенного в step раз"""
+        return max(1, image.shape[0] // step), max(1, image.shape[1] // step)
+
+    def _reduce(image, step):
+        """Уменьшение в целое число раз усреднением блоков step x step.
+        Края, не кратные step, обрезаются: иначе коэффициент по высоте или ширине
+        оказывается дробным, и INTER_AREA переходит на медленный общий путь"""
+        if step == 1:
+            return image
+        height, width = TextAnalyzer._reduced_size(image, step)
+        return cv.resize(image[:height * step, :width * step], (width, height), interpolation=cv.INTER_AREA)
+
+    def _scaled_engines(self, factor):
+        """Движки и ширина ядра с порогами в пикселях, умноженными на factor (площадь - на factor²)"""
+        if factor == 1.0:
+            return self.engine, self.char_engine, LINE_KERNEL_WIDTH
+        engine = ProjectionEngine(self.engine.line_threshold, self.engine.word_threshold,
+                                  max(1, round(self.engine.min_line_height * factor)),
+                                  max(1, round(self.engine.min_word_width * factor)))
+        char_engine = CharacterEngine(max(1, round(self.char_engine.min_area * factor * factor)),
+                                      self.char_engine.max_aspect, self.char_engine.dot_ratio,
+                                      self.char_engine.dot_gap, self.char_engine.split_width)
+        return engine, char_engine, max(1, round(LINE_KERNEL_WIDTH * factor))
+
+    def _to_full_resolution(boxes, step, shape):
+        """Переводит рамки из рабочего разрешения в исходное: пиксель p рабочего
+        изображения покрывает пиксели [p * step, (p + 1) * step) исходного"""
+        height, width = shape[:2]
+        boxes = boxes.copy()
+        boxes["x1"] *= step
+        boxes["y1"] *= step
+        boxes["x2"] = np.minimum((boxes["x2"] + 1) * step - 1, width - 1)
+        boxes["y2"] = np.minimum((boxes["y2"] + 1) * step - 1, height - 1)
+        return boxes
+
+    def _cache_params(self):
+        """Параметры, от которых зависят рамки строк и слов"""
+        return (LINE_KERNEL_WIDTH, self.engine.line_threshold, self.engine.word_threshold,
+                self.engine.min_line_height, self.engine.min_word_width, self.char_engine.min_area,
+                self.char_engine.max_aspect, self.char_engine.dot_ratio, self.char_engine.dot_gap,
+                self.char_engine.split_width, self.adaptive, self.text_height, self.probe_width)
@@ -0,0 +1,98 @@
+from shared.constants import WARP_TILE_SIZE, WARP_THREADS
+from shared.load_library import cv
+from shared.load_library import np
+from shared.load_library import os
+from shared.load_library import tempfile
+from shared.load_library import deque
+from shared.load_library import ThreadPoolExecutor
+
+# Запас вокруг области источника плитки для билинейной интерполяции (пиксели)
+SOURCE_MARGIN = 2
+
+class TiledWarp:
+
+    def __init__(self, tile_size=WARP_TILE_SIZE, threads=WARP_THREADS, memmap_dir=None):
+        self.tile_size = tile_size      # Сторона плитки выходного изображения (пиксели)
+        self.threads = threads if threads > 0 else (os.cpu_count() or 1)  # Потоки для плиток
+        self.memmap_dir = memmap_dir    # Каталог для выходных массивов в файлах (None - в памяти)
+
+    def warp(self, image, matrix, size, output=None):
+        """Перспективное преобразование по плиткам в output (массив, memmap или None - новый массив)"""
+        width, height = size
+        if output is None:
+            output = self.allocate_output((height, width) + image.shape[2:], image.dtype)
+        inverse = np.linalg.inv(matrix)
+
+        def warp_into(x, y):
+            # Плитка сразу записывается в выходной массив, в памяти только плитки в работе
+            tile_width, tile_height = min(self.tile_size, width - x), min(self.tile_size, height - y)
+            output[y:y + tile_height, x:x + tile_width] = self._warp_tile(
+                image, matrix, inverse, x, y, tile_width, tile_height)
+
+        with ThreadPoolExecutor(self.threads) as executor:
+            futures = [executor.submit(warp_into, x, y)
+                       for y in range(0, height, self.tile_size) for x in range(0, width, self.tile_size)]
+            for future in futures:
+                future.result()
+
+        if isinstance(output, np.memmap):
+            output.flush()
+        return output
+
+    def iter_strips(self, image, matrix, size):
+        """Полосы выходного изображения сверху вниз: (y, полоса высотой в плитку).
+        Пока отдается одна полоса, следующая уже считается; в памяти не больше двух полос"""
+        width, height = size
+        inverse = np.linalg.inv(matrix)
+
+        with ThreadPoolExecutor(self.threads) as executor:
+            pending = deque()
+            for y in range(0, height, self.tile_size):
+                strip_height = min(self.tile_size, height - y)
+                futures = [executor.submit(self._warp_tile, image, matrix, inverse,
+                                           x, y, min(self.tile_size, width - x), strip_height)
+                           for x in range(0, width, self.tile_size)]
+                pending.append((y, futures))
+                if len(pending) > 1:
+                    yield self._collect_strip(*pending.popleft())
+
+            while pending:
+                yield self._collect_strip(*pending.popleft())
+
+    def allocate_output(self, shape, dtype):
+        """Выходной массив в памяти или в файле .npy в каталоге memmap_dir"""
+        if self.memmap_dir is None:
+            return np.empty(shape, dtype)
+
+        os.makedirs(self.memmap_dir, exist_ok=True)
+        descriptor, path = tempfile.mkstemp(dir=self.memmap_dir, suffix=".npy")
+        os.close(descriptor)
+        return np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+
+    def _collect_strip(self, y, futures):
+        tiles = [future.result() for future in futures]
+        return y, tiles[0] if len(tiles) == 1 else np.hstack(tiles)
+
+    def _warp_tile(self, image, matrix, inverse, x, y, width, height):
+        """Преобразование одной плитки по ее области в исходном изображении"""
+        # Углы плитки переводим в исходное изображение обратной матрицей
+        corners = np.float64([[x, y], [x + width, y], [x + width, y + height], [x, y + height]])
+        source = cv.perspectiveTransform(corners.reshape(-1, 1, 2), inverse).reshape(-1, 2)
+
+        image_height, image_width = image.shape[:2]
+        x0 = max(int(np.floor(source[:, 0].min())) - SOURCE_MARGIN, 0)
+        y0 = max(int(np.floor(source[:, 1].min())) - SOURCE_MARGIN, 0)
+        x1 = min(int(np.ceil(source[:, 0].max())) + SOURCE_MARGIN + 1, image_width)
+        y1 = min(int(np.ceil(source[:, 1].max())) + SOURCE_MARGIN + 1, image_height)
+
+        tile_shape = (height, width) + image.shape[2:]
+        if x0 >= x1 or y0 >= y1:
+            # Плитка целиком за пределами исходного изображения
+            return np.zeros(tile_shape, image.dtype)
+
+        # Матрица для плитки: сдвиг в область источника и из начала плитки
+        shift_source = np.float64([[1, 0, x0], [0, 1, y0], [0, 0, 1]])
+        shift_tile = np.float64([[1, 0, -x], [0, 1, -y], [0, 0, 1]])
+        tile_matrix = shift_tile @ matrix @ shift_source
+
+        return cv.warpPerspective(image[y0:y1, x0:x1], tile_matrix, (width, height))
@@ -0,0 +1,187 @@
+from core.document_transformation import DocumentTransformation
+from shared.constants import DEBUG_INFO, SEGMENTATION_MIN_AREA
+from shared.constants import VIDEO_TRACK_DIMENSION, VIDEO_SEGMENTATION, VIDEO_MAX_FEATURES, VIDEO_MIN_CONFIDENCE
+from shared.constants import VIDEO_STABLE_FRAMES, VIDEO_STABLE_MOTION
+from shared.load_library import cv
+from shared.load_library import np
+from shared.load_library import time
+
+# Минимальное количество точек для оценки гомографии
+MIN_TRACK_POINTS = 8
+
+class VideoTracker:
+
+    def __init__(self, track_dimension=VIDEO_TRACK_DIMENSION, max_features=VIDEO_MAX_FEATURES,
+                 min_confidence=VIDEO_MIN_CONFIDENCE, stable_frames=VIDEO_STABLE_FRAMES,
+                 stable_motion=VIDEO_STABLE_MOTION, segmentation=VIDEO_SEGMENTATION):
+        # Сегментация только быстрым методом: GrabCut слишком медленный для видео (около 1 с на кадр),
+        # поэтому метод задается явно, а не берется из SEGMENTATION_METHOD
+        if segmentation == "grabcut":
+            raise ValueError("Для видео нужен быстрый метод сегментации: edges или threshold")
+        self.transform = DocumentTransformation(max_dimension=track_dimension, segmentation=segmentation,
+                                                grabcut_fallback=False)
+        self.track_dimension = track_dimension  # Максимальный размер кадра для отслеживания
+        self.max_features = max_features        # Количество отслеживаемых точек
+        self.min_confidence = min_confidence    # Порог уверенности отслеживания
+        self.stable_frames = stable_frames      # Количество неподвижных кадров перед выдачей
+        self.stable_motion = stable_motion      # Допустимое смещение углов неподвижной страницы
+        self.reset()
+
+    def reset(self):
+        """Сброс состояния отслеживания и статистики"""
+        self.prev_gray = None       # Предыдущий кадр в оттенках серого (масштаб отслеживания)
+        self.points = None          # Отслеживаемые точки (масштаб отслеживания)
+        self.initial_points = 0     # Количество точек после последней инициализации
+        self.corners = None         # Углы документа (масштаб исходного кадра)
+        self.confidence = 0.0       # Уверенность отслеживания на последнем кадре
+        self.stable_count = 0       # Количество подряд идущих неподвижных кадров
+        self.emitted = False        # Страница уже выдана в текущем неподвижном положении
+        self.count_frames = 0
+        self.count_detections = 0
+        self.count_emitted = 0
+        self.processing_time = 0.0
+
+    def process_frame(self, frame):
+        """Обработка одного кадра: возвращает выровненную страницу или None"""
+        start_time = time.perf_counter()
+
+        scale = min(1.0, self.track_dimension / max(frame.shape[:2]))
+        small_frame = frame if scale == 1.0 else cv.resize(frame, None, fx=scale, fy=scale,
+                                                          interpolation=cv.INTER_AREA)
+        gray = cv.cvtColor(small_frame, cv.COLOR_BGR2GRAY)
+
+        # Отслеживание углов, при потере уверенности - повторная сегментация
+        corners = None
+        if self.corners is not None and self.prev_gray is not None:
+            corners = self._track_corners(gray, scale)
+        if corners is None:
+            corners = self._detect_corners(small_frame, gray, scale)
+        self.prev_gray = gray
+        self.count_frames += 1
+
+        page = None
+        if corners is None:
+            self.corners = None
+            self.stable_count = 0
+            self.emitted = False
+        else:
+            # Страница неподвижна, если углы почти не сместились
+            if self.corners is not None and np.abs(corners - self.corners).max() <= self.stable_motion:
+                self.stable_count += 1
+            else:
+                self.stable_count = 0
+                self.emitted = False
+            self.corners = corners
+
+            if self.stable_count >= self.stable_frames and self.emitted is False:
+                page = self.transform._apply_perspective_transform(frame, corners.astype(np.float32))
+                self.emitted = True
+                self.count_emitted += 1
+
+        self.processing_time += time.perf_counter() - start_time
+        return page
+
+    def process_stream(self, source, callback=None, max_frames=0):
+        """Обработка видеофайла или камеры, страницы передаются в callback(page, frame_index)"""
+        capture = cv.VideoCapture(source)
+        if not capture.isOpened():
+            print(f"Не удалось открыть видеопоток {source}")
+            return None
+
+        self.reset()
+        start_time = time.perf_counter()
+        while max_frames <= 0 or self.count_frames < max_frames:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            page = self.process_frame(frame)
+            if page is not None and callback is not None:
+                callback(page, self.count_frames - 1)
+        capture.release()
+
+        return self.get_stats(time.perf_counter() - start_time)
+
+    def get_stats(self, elapsed=None):
+        """Статистика обработки: кадры, сегментации, выданные страницы и fps"""
+        stats = {
+            "frames": self.count_frames,
+            "detections": self.count_detections,
+            "emitted": self.count_emitted,
+            "processing_fps": self.count_frames / self.processing_time if self.processing_time > 0 else 0.0,
+        }
+        if elapsed is not None:
+            stats["elapsed"] = elapsed
+            stats["fps"] = self.count_frames / elapsed if elapsed > 0 else 0.0
+        return stats
+
+    def _detect_corners(self, small_frame, gray, scale):
+        """Полная сегментация кадра и выбор точек для отслеживания"""
+        self.count_detections += 1
+        corners = self.transform.detect_corners(small_frame)
+        if corners is None or len(corners) != 4:
+            self.points = None
+            return None
+
+        corners = corners / scale
+        self._init_points(gray, corners * scale)
+        self.confidence = 1.0
+        if DEBUG_INFO is True:
+            print(f"Кадр {self.count_frames}: углы найдены сегментацией, точек {self.initial_points}")
+        return corners
+
+    def _init_points(self, gray, small_corners):
+        """Выбор точек для отслеживания внутри документа и на его границе"""
+        mask = np.zeros(gray.shape, np.uint8)
+        polygon = small_corners.astype(np.int32)
+        cv.fillConvexPoly(mask, polygon, 255)
+        cv.polylines(mask, [polygon], True, 255, 15)
+
+        self.points = cv.goodFeaturesToTrack(gray, self.max_features, 0.01, 7, mask=mask)
+        self.initial_points = 0 if self.points is None else len(self.points)
+
+    def _track_corners(self, gray, scale):
+        """Перенос углов на новый кадр по гомографии оптического потока"""
+        if self.points is None or len(self.points) < MIN_TRACK_POINTS:
+            return None
+
+        next_points, status, _ = cv.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points, None,
+                                                         winSize=(21, 21), maxLevel=3)
+        status = status.ravel() == 1
+        if np.count_nonzero(status) < MIN_TRACK_POINTS:
+            return None
+
+        homography, inliers = cv.findHomography(self.points[status], next_points[status], cv.RANSAC, 3.0)
+        if homography is None:
+            return None
+
+        # Уверенность - доля точек, оставшихся инлаерами с момента инициализации
+        inliers = inliers.ravel() == 1
+        self.confidence = np.count_nonzero(inliers) / self.initial_points
+        if self.confidence < self.min_confidence:
+            if DEBUG_INFO is True:
+                print(f"Кадр {self.count_frames}: уверенность {self.confidence:.2f}, повторная сегментация")
+            return None
+
+        small_corners = cv.perspectiveTransform((self.corners * scale).reshape(-1, 1, 2).astype(np.float32),
+                                                homography).reshape(4, 2)
+        if not self._is_valid_quad(small_corners, gray.shape):
+            return None
+
+        self.points = next_points[status][inliers].reshape(-1, 1, 2)
+        # Пополняем точки, когда их осталось мало
+        if len(self.points) < self.initial_points // 2:
+            self._init_points(gray, small_corners)
+
+        return small_corners / scale
+
+    def _is_valid_quad(self, corners, img_shape):
+        """Проверка, что углы образуют выпуклый четырехугольник достаточной площади"""
+        height, width = img_shape[:2]
+        polygon = corners.astype(np.int32)
+        if not cv.isContourConvex(polygon):
+            return False
+        if cv.contourArea(polygon) < SEGMENTATION_MIN_AREA * height * width:
+            return False
+        margin = 0.1 * max(height, width)
+        return bool(np.all(corners >= -margin) and np.all(corners[:, 0] < width + margin)
+                    and np.all(corners[:, 1] < height + margin))
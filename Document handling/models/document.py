@@ -1,33 +1,95 @@
-import cv2 as cv
-
-class Document:
-    def __init__(self, image):
-        self.original_image = image
-        self.height, self.width = image.shape[:2]
-        self.transformed_img = None
-        self.selected_text_image = None
-        self.count_lines = 0
-        self.count_characters = 0
-    
-    def get_original_image(self):
-        return self.original_image
-
-    def get_dimensions(self):
-        return self.width, self.height
-    
-    def set_transformed_img(self, image):
-        self.transformed_img = image
-
-    def get_transformed_img(self):
-        return self.transformed_img
-    
-    def set_selected_text_img(self, image, count_lines, count_characters):
-        self.selected_text_image = image
-        self.count_lines = count_lines
-        self.count_characters = count_characters
-
-    def get_selected_text_img(self):
-        return self.selected_text_image
-    
-    def get_info_text_img(self):
-        return self.count_lines, self.count_characters
\ No newline at end of file
+import cv2 as cv
+import numpy as np
+
+class Document:
+    __slots__ = ("original_image", "height", "width", "transformed_img", "selected_text_image",
+                 "count_lines", "count_characters", "text_lines", "text_words", "text_characters",
+                 "cache_key", "lean")
+
+    def __init__(self, image, lean=False):
+        self.original_image = image
+        self.height, self.width = image.shape[:2]
+        self.transformed_img = None
+        self.selected_text_image = None
+        self.count_lines = 0
+        self.count_characters = 0
+        self.text_lines = None
+        self.text_words = None
+        self.text_characters = None
+        self.cache_key = None
+        # Экономный режим: исходное изображение освобождается после выравнивания,
+        # изображение с рамками не хранится, а рисуется по запросу
+        self.lean = lean
+
+    def get_original_image(self):
+        return self.original_image
+
+    def get_dimensions(self):
+        return self.width, self.height
+
+    def set_transformed_img(self, image):
+        self.transformed_img = image
+        if self.lean is True and image is not None:
+            self.original_image = None
+
+    def get_transformed_img(self):
+        return self.transformed_img
+
+    def set_selected_text_img(self, image, count_lines, count_characters):
+        self.selected_text_image = image
+        self.count_lines = count_lines
+        self.count_characters = count_characters
+
+    def get_selected_text_img(self):
+        if self.selected_text_image is not None or self.text_lines is None:
+            return self.selected_text_image
+
+        # Рисуем рамки по запросу; в экономном режиме результат не сохраняется
+        image = self.render_selected_text()
+        if self.lean is False:
+            self.selected_text_image = image
+        return image
+
+    def get_info_text_img(self):
+        return self.count_lines, self.count_characters
+
+    def get_count_words(self):
+        return len(self.text_words) if self.text_words is not None else 0
+
+    def set_text_boxes(self, lines, words, characters=None):
+        self.text_lines = lines
+        self.text_words = words
+        self.text_characters = characters
+
+    def get_text_boxes(self):
+        return self.text_lines, self.text_words
+
+    def get_character_boxes(self):
+        return self.text_characters
+
+    def render_selected_text(self):
+        """Рисует рамки строк и слов на копии выровненного изображения"""
+        lines, words = self.text_lines, self.text_words
+        result_image = self.transformed_img.copy()
+
+        # Зеленые рамки строк (от левого края) - одним вызовом
+        line_boxes = lines.copy()
+        line_boxes["x1"] = 0
+        cv.polylines(result_image, Document._box_polygons(line_boxes), True, (0, 255, 0), 2)
+
+        # Подписываем номера строк
+        for i, y1 in enumerate(lines["y1"].tolist()):
+            cv.putText(result_image, f"Line {i+1}", (10, y1 + 15),
+                      cv.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+
+        # Синие рамки слов - одним вызовом поверх строк и подписей
+        cv.polylines(result_image, Document._box_polygons(words), True, (255, 0, 0), 1)
+
+        return result_image
+
+    def _box_polygons(boxes):
+        """Рамки в виде списка четырехугольников для cv.polylines"""
+        x1, y1, x2, y2 = boxes["x1"], boxes["y1"], boxes["x2"], boxes["y2"]
+        polygons = np.stack([np.stack([x1, y1], 1), np.stack([x2, y1], 1),
+                             np.stack([x2, y2], 1), np.stack([x1, y2], 1)], axis=1)
+        return list(polygons.astype(np.int32))
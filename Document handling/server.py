@@ -0,0 +1,45 @@
+from core.document_service import DocumentService
+from shared.constants import MAX_DIMENSION, BATCH_CV_THREADS
+from shared.constants import SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_QUEUE_SIZE, SERVER_MAX_UPLOAD
+from shared.load_library import argparse
+from shared.load_library import asyncio
+
+def main():
+    """ Локальный HTTP-сервер обработки документов без графического интерфейса """
+    parser = argparse.ArgumentParser(description="Сервер обработки документов")
+    parser.add_argument("--host", default=SERVER_HOST, help="Адрес сервера")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="Порт сервера")
+    parser.add_argument("-w", "--workers", type=int, default=SERVER_WORKERS,
+                        help="Количество одновременно обрабатываемых запросов (0 - по числу ядер CPU)")
+    parser.add_argument("--queue-size", type=int, default=SERVER_QUEUE_SIZE,
+                        help="Количество запросов в очереди, сверх него - ответ 429")
+    parser.add_argument("--max-dimension", type=int, default=MAX_DIMENSION,
+                        help="Максимальный размер изображения для поиска углов")
+    parser.add_argument("--cv-threads", type=int, default=BATCH_CV_THREADS,
+                        help="Количество потоков OpenCV на процесс и потоков выравнивания по плиткам в каждом потоке обработки")
+    parser.add_argument("--max-upload", type=int, default=SERVER_MAX_UPLOAD,
+                        help="Максимальный размер изображения в запросе (байты)")
+    parser.add_argument("--lean", action="store_true", help="Экономный режим памяти")
+    parser.add_argument("--multiscale", action="store_true",
+                        help="Грубый поиск углов на маленьком изображении и уточнение по окнам в полном разрешении")
+    parser.add_argument("--adaptive-text", action="store_true",
+                        help="Анализ текста в рабочем разрешении по оценке высоты текста (быстрее на больших сканах)")
+    parser.add_argument("--prefilter", action="store_true",
+                        help="Отклонять размытые, темные, пересвеченные и пустые снимки до сегментации")
+    parser.add_argument("--cache-dir", help="Каталог кэша углов и рамок текста на диске")
+    args = parser.parse_args()
+
+    print("=== СЕРВЕР ОБРАБОТКИ ДОКУМЕНТОВ ===")
+
+    service = DocumentService(workers=args.workers, queue_size=args.queue_size,
+                              max_dimension=args.max_dimension, cv_threads=args.cv_threads,
+                              lean=args.lean, cache_dir=args.cache_dir, max_upload=args.max_upload,
+                              multiscale=args.multiscale, adaptive_text=args.adaptive_text,
+                              prefilter=args.prefilter)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Сервер остановлен")
+
+if __name__ == "__main__":
+    main()
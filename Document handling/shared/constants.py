@@ -1,10 +1,93 @@
-from shared.load_library import np
-
-DEBUG_INFO = False
-DEBUG_IMAGE = False
-
-FORMAT_IMAGE_FILE = "*.jpg *.jpeg *.png *.bmp"
-OUTPUT_PATH = "results/"
-
-MAX_DIMENSION = 1000
-KERNEL = np.ones((5,5), np.uint8)
\ No newline at end of file
+from shared.load_library import np
+
+DEBUG_INFO = False
+DEBUG_IMAGE = False
+
+FORMAT_IMAGE_FILE = "*.jpg *.jpeg *.png *.bmp"
+OUTPUT_PATH = "results/"
+OUTPUT_IMAGE_FORMAT = "png"     # Формат сохраняемых изображений: "png", "jpeg" или "webp"
+OUTPUT_PNG_COMPRESSION = 3      # Уровень сжатия PNG (0-9)
+OUTPUT_JPEG_QUALITY = 95        # Качество JPEG (0-100)
+OUTPUT_WEBP_QUALITY = 95        # Качество WebP (0-100, больше 100 - без потерь)
+OUTPUT_WRITER_THREADS = 2       # Количество потоков фоновой записи результатов
+OUTPUT_QUEUE_SIZE = 8           # Размер очереди фоновой записи (при заполнении обработка ждет)
+
+MAX_DIMENSION = 1000
+LEAN_DOCUMENT = False     # Экономный режим памяти для модели документа
+REDUCED_DECODE = False    # Поиск углов на JPEG, декодированном в уменьшенном разрешении (IMREAD_REDUCED_*)
+KERNEL = np.ones((5,5), np.uint8)
+
+# Перспективное преобразование по плиткам
+WARP_TILE_SIZE = 1024                 # Сторона плитки выходного изображения (пиксели)
+WARP_THREADS = 0                      # Количество потоков для плиток (0 - по числу ядер CPU)
+WARP_TILED_MIN_PIXELS = 16 * 10**6    # Размер выходного изображения, начиная с которого используются плитки
+
+# Поиск углов по пирамиде
+MULTISCALE_CORNERS = False  # Грубый поиск углов на маленьком уровне и уточнение в окнах на следующих уровнях
+COARSE_DIMENSION = 400      # Максимальный размер уровня грубого поиска углов
+REFINE_WINDOW = 24          # Длина участка стороны у угла для уточнения (пиксели уровня пирамиды)
+REFINE_SAMPLES = 16         # Количество точек на каждой стороне для подгонки прямой
+REFINE_MIN_ANGLE = 20.0     # Минимальный угол между сторонами у угла (градусы)
+
+# Предварительная проверка снимка до сегментации
+PREFILTER = False           # Отклонять заведомо непригодные снимки до сегментации
+GATE_DIMENSION = 512        # Размер миниатюры для проверки по большей стороне
+GATE_MIN_BRIGHTNESS = 30    # Минимальная средняя яркость миниатюры, ниже - "dark"
+GATE_MAX_BRIGHTNESS = 235   # Максимальная средняя яркость миниатюры, выше - "overexposed"
+GATE_MIN_CONTRAST = 8.0     # Минимальное стандартное отклонение яркости, ниже - "low_contrast"
+GATE_MIN_SHARPNESS = 50.0   # Минимальная дисперсия лапласиана миниатюры, ниже - "blurry"
+GATE_MIN_EDGES = 0.005      # Минимальная доля пикселей границ Canny, ниже - "no_edges"
+
+# Сегментация документа
+SEGMENTATION_METHOD = "grabcut"  # "edges", "threshold" или "grabcut"
+SEGMENTATION_MIN_AREA = 0.2      # Минимальная доля площади изображения для четырехугольника документа
+SEGMENTATION_MIN_SUPPORT = 0.7   # Минимальная доля точек каждой стороны четырехугольника, лежащих на перепаде яркости
+SEGMENTATION_EDGE_STEP = 10      # Минимальный перепад яркости поперек стороны (уровни на пиксель)
+SEGMENTATION_SUPPORT_SAMPLES = 32  # Количество точек на каждой стороне для проверки
+MULTI_DOCUMENT_MIN_AREA = 0.02   # Минимальная доля площади для каждого документа в режиме нескольких документов
+MULTI_DOCUMENT_SEGMENTATION = "edges"  # Метод для нескольких документов, если SEGMENTATION_METHOD - "grabcut"
+
+# Анализ текста
+LINE_KERNEL_WIDTH = 25    # Ширина ядра для соединения текста в строки
+LINE_THRESHOLD = 0.3      # Порог строки относительно среднего ненулевого значения проекции
+WORD_THRESHOLD = 0.5      # Порог слова относительно среднего ненулевого значения проекции
+MIN_LINE_HEIGHT = 5       # Минимальная высота строки (пиксели)
+MIN_WORD_WIDTH = 4        # Минимальная ширина слова (пиксели)
+CHAR_MIN_AREA = 4         # Минимальная площадь компоненты символа (пиксели), меньше - шум
+CHAR_MAX_ASPECT = 8.0     # Максимальное отношение ширины символа к высоте (больше - линейки, подчеркивания)
+CHAR_DOT_RATIO = 0.35     # Доля медианной площади символа, ниже которой компонента считается точкой
+CHAR_DOT_GAP = 2.0        # Максимальный зазор между точкой и основой символа (в высотах точки)
+CHAR_SPLIT_WIDTH = 1.8    # Компонента шире стольких медианных ширин символа делится на слипшиеся символы
+
+# Анализ текста в рабочем разрешении
+ADAPTIVE_TEXT = False     # Приводить страницу к рабочему разрешению по высоте текста перед анализом
+TEXT_HEIGHT = 14          # Высота текста (пиксели), под которую подобраны пороги анализа текста
+TEXT_PROBE_WIDTH = 1000   # Минимальная ширина уменьшенной страницы для оценки высоты текста
+
+# Видеорежим
+VIDEO_TRACK_DIMENSION = 640   # Максимальный размер кадра для отслеживания углов
+VIDEO_SEGMENTATION = "edges"  # Метод сегментации при потере отслеживания (только "edges" или "threshold")
+VIDEO_MAX_FEATURES = 200      # Количество отслеживаемых точек на документе
+VIDEO_MIN_CONFIDENCE = 0.5    # Минимальная доля точек-инлаеров, ниже - повторная сегментация
+VIDEO_STABLE_FRAMES = 5       # Количество неподвижных кадров перед выдачей страницы
+VIDEO_STABLE_MOTION = 2.0     # Максимальное смещение углов между кадрами для неподвижной страницы (пиксели)
+
+# Метрики этапов обработки
+METRICS_HISTORY = 10000       # Количество последних записей, хранимых для экспорта
+PROFILE_ENV = "DOC_PROFILE"   # Переменная окружения для профилирования: "cprofile" или "tracemalloc"
+
+# Кэш результатов
+CACHE_MEMORY_ENTRIES = 1024           # Количество записей в памяти (LRU)
+CACHE_DISK_MAX_BYTES = 512 * 2**20    # Максимальный размер кэша на диске (байты)
+
+# Пакетная обработка
+BATCH_WORKERS = 0         # Количество процессов (0 - по числу ядер CPU)
+BATCH_CV_THREADS = 1      # Количество потоков OpenCV в каждом процессе
+
+# Сервер
+SERVER_HOST = "127.0.0.1"         # Адрес сервера (по умолчанию только локальный)
+SERVER_PORT = 8080                # Порт сервера
+SERVER_WORKERS = 0                # Количество одновременно обрабатываемых запросов (0 - по числу ядер CPU)
+SERVER_QUEUE_SIZE = 16            # Количество запросов в очереди, сверх него - ответ 429
+SERVER_MAX_UPLOAD = 64 * 2**20    # Максимальный размер загружаемого изображения (байты)
+SERVER_LATENCY_HISTORY = 1000     # Количество последних запросов для расчета задержки
\ No newline at end of file
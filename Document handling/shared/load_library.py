@@ -1,9 +1,29 @@
-import cv2 as cv
-import numpy as np
-import sys
-import os
-
-
-from tkinter import filedialog
-
-from datetime import datetime, date
\ No newline at end of file
+import cv2 as cv
+import numpy as np
+import sys
+import os
+import glob
+import json
+import platform
+import time
+import argparse
+import multiprocessing
+import threading
+import queue
+import io
+import cProfile
+import pstats
+import tracemalloc
+import hashlib
+import tempfile
+import asyncio
+import base64
+
+
+# tkinter импортируется только при выборе файла (FileHandler.select_file_path),
+# чтобы пакетный режим и сервер работали без графического окружения
+
+from datetime import datetime, date
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
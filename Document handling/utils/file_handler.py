@@ -1,55 +1,128 @@
-from shared.load_library import sys
-from shared.load_library import os
-from shared.load_library import datetime, date
-from shared.load_library import filedialog
-from shared.load_library import cv
-from shared.constants import FORMAT_IMAGE_FILE
-from shared.constants import OUTPUT_PATH
-from models.document import Document
-
-class FileHandler:
-    
-    def select_file_path():
-        """Метод для выбора изображения в файловой системе"""
-        img_path = filedialog.askopenfilename(
-            title="Выберите изображение",
-            filetypes=[("Изображения", FORMAT_IMAGE_FILE), 
-            ("Все файлы", "*.*")]
-        )
-
-        if img_path is None or img_path == "":
-            sys.exit("Файл не выбран")
-
-        return img_path
-
-    def save_image(image, copy = False):
-        """Метод для сохранения изображения"""
-        today = date.today()
-        folder_path = OUTPUT_PATH +  datetime.now().strftime("%Y-%m-%d")
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path)
-        img_path = folder_path + "/img_doc_" + datetime.now().strftime("%H.%M.%S") 
-        if copy is True:
-            img_path += "copy"
-        img_path += ".png"
-        print(img_path)
-        return cv.imwrite(img_path, image)
-    
-    def save_info_text(document):
-        """Метод для сохранения информации о количестве строк и символах"""
-        today = date.today()
-        folder_path = OUTPUT_PATH +  datetime.now().strftime("%Y-%m-%d")
-        if not os.path.exists(folder_path):
-            os.makedirs(folder_path)
-        txt_path = folder_path + "/info_doc_" + datetime.now().strftime("%H.%M.%S") + ".txt"
-        try:
-            with open(txt_path, "x", encoding="utf-8") as file:
-                file.write(f"Количество строк: {document.count_lines}\n")
-                file.write(f"Количество символов: {document.count_characters}\n")
-            file.close()
-            print(txt_path)
-            return True
-        except FileExistsError:
-            print("Файл уже существует!")
-        return False
-        
\ No newline at end of file
+from shared.load_library import sys
+from shared.load_library import os
+from shared.load_library import datetime, date
+from shared.load_library import cv
+from shared.constants import FORMAT_IMAGE_FILE
+from shared.constants import OUTPUT_PATH
+from shared.constants import OUTPUT_IMAGE_FORMAT, OUTPUT_PNG_COMPRESSION, OUTPUT_JPEG_QUALITY, OUTPUT_WEBP_QUALITY
+from models.document import Document
+
+class FileHandler:
+    
+    def select_file_path():
+        """Метод для выбора изображения в файловой системе"""
+        # Графическое окружение нужно только здесь
+        from tkinter import filedialog
+        img_path = filedialog.askopenfilename(
+            title="Выберите изображение",
+            filetypes=[("Изображения", FORMAT_IMAGE_FILE), 
+            ("Все файлы", "*.*")]
+        )
+
+        if img_path is None or img_path == "":
+            sys.exit("Файл не выбран")
+
+        return img_path
+
+    def save_image(image, copy = False, name = None, writer = None,
+                   image_format = OUTPUT_IMAGE_FORMAT, quality = None):
+        """Метод для сохранения изображения (в фоне, если передан OutputWriter)"""
+        extension, params = FileHandler.encode_params(image_format, quality)
+        base_name = "img_doc_" + FileHandler._make_name(name)
+        if copy is True:
+            base_name += "copy"
+        if writer is not None:
+            writer.submit(FileHandler._write_image, image, base_name, extension, params)
+            return True
+        return FileHandler._write_image(image, base_name, extension, params)
+    
+    def save_info_text(document, name = None, writer = None, reserved = False):
+        """Метод для сохранения информации о количестве строк и символах
+        (reserved=True - в файл, заранее занятый reserve_name)"""
+        base_name = "info_doc_" + FileHandler._make_name(name)
+        text = (f"Количество строк: {document.count_lines}\n"
+                f"Количество слов: {document.get_count_words()}\n"
+                f"Количество символов: {document.count_characters}\n")
+        if writer is not None:
+            writer.submit(FileHandler._write_text, text, base_name, reserved)
+            return True
+        return FileHandler._write_text(text, base_name, reserved)
+
+    def reserve_name(name, image_format = OUTPUT_IMAGE_FORMAT):
+        """Одно имя для изображения, копии и информации об одном входном файле.
+        Имя закрепляется созданием пустого файла информации (атомарно, в том числе между процессами);
+        номер добавляется, пока занято любое из трех имен"""
+        extension, _ = FileHandler.encode_params(image_format)
+        folder_path = FileHandler._output_folder()
+        candidate = name
+        index = 1
+        while True:
+            images = [f"{folder_path}/img_doc_{candidate}{suffix}{extension}" for suffix in ("", "copy")]
+            if not any(os.path.exists(path) for path in images):
+                try:
+                    open(f"{folder_path}/info_doc_{candidate}.txt", "x").close()
+                    return candidate
+                except FileExistsError:
+                    pass
+            candidate = f"{name}_{index}"
+            index += 1
+
+    def release_name(name):
+        """Освобождение имени, занятого reserve_name, если информация так и не была записана"""
+        path = f"{FileHandler._output_folder()}/info_doc_{name}.txt"
+        if os.path.exists(path) and os.path.getsize(path) == 0:
+            os.remove(path)
+
+    def encode_params(image_format, quality = None):
+        """Расширение и параметры кодирования: уровень сжатия PNG (0-9), качество JPEG и WebP (0-100)"""
+        if image_format == "png":
+            return ".png", [cv.IMWRITE_PNG_COMPRESSION, OUTPUT_PNG_COMPRESSION if quality is None else quality]
+        if image_format == "jpeg":
+            return ".jpg", [cv.IMWRITE_JPEG_QUALITY, OUTPUT_JPEG_QUALITY if quality is None else quality]
+        if image_format == "webp":
+            return ".webp", [cv.IMWRITE_WEBP_QUALITY, OUTPUT_WEBP_QUALITY if quality is None else quality]
+        raise ValueError(f"Неизвестный формат изображения: {image_format}")
+
+    def _make_name(name):
+        # Имя файла по исходному изображению (пакетный режим) или по времени с микросекундами
+        return name if name is not None else datetime.now().strftime("%H.%M.%S.%f")
+
+    def _output_folder():
+        folder_path = OUTPUT_PATH + datetime.now().strftime("%Y-%m-%d")
+        os.makedirs(folder_path, exist_ok=True)
+        return folder_path
+
+    def _open_unique(base_name, extension, mode, encoding = None):
+        """Создание нового файла; если имя занято (в том числе другим процессом), добавляется номер"""
+        folder_path = FileHandler._output_folder()
+        path = folder_path + "/" + base_name + extension
+        index = 1
+        while True:
+            try:
+                return path, open(path, mode, encoding=encoding)
+            except FileExistsError:
+                path = f"{folder_path}/{base_name}_{index}{extension}"
+                index += 1
+
+    def _write_image(image, base_name, extension, params):
+        # Кодирование выполняется до создания файла, чтобы не оставлять пустых файлов при ошибке
+        success, encoded = cv.imencode(extension, image, params)
+        if not success:
+            print(f"Не удалось закодировать изображение {base_name}{extension}")
+            return False
+        img_path, file = FileHandler._open_unique(base_name, extension, "xb")
+        with file:
+            file.write(encoded.tobytes())
+        print(img_path)
+        return True
+
+    def _write_text(text, base_name, reserved = False):
+        if reserved is True:
+            txt_path = FileHandler._output_folder() + "/" + base_name + ".txt"
+            file = open(txt_path, "w", encoding="utf-8")
+        else:
+            txt_path, file = FileHandler._open_unique(base_name, ".txt", "x", encoding="utf-8")
+        with file:
+            file.write(text)
+        print(txt_path)
+        return True
@@ -0,0 +1,45 @@
+from shared.load_library import cv
+from shared.load_library import os
+
+# Коэффициенты уменьшения при декодировании JPEG (масштабирование DCT)
+REDUCED_FLAGS = ((8, cv.IMREAD_REDUCED_COLOR_8), (4, cv.IMREAD_REDUCED_COLOR_4), (2, cv.IMREAD_REDUCED_COLOR_2))
+
+# Маркеры JPEG SOF, содержащие размеры изображения
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+class ImageReader:
+
+    def read_jpeg_size(image_path):
+        """Размеры JPEG из заголовка без декодирования: (ширина, высота) или None"""
+        try:
+            with open(image_path, "rb") as file:
+                if file.read(2) != b"\xff\xd8":
+                    return None
+                while True:
+                    marker = file.read(2)
+                    if len(marker) < 2 or marker[0] != 0xFF:
+                        return None
+                    # Заполняющие байты 0xFF между маркерами
+                    while marker[1] == 0xFF:
+                        marker = marker[1:] + file.read(1)
+                    length = int.from_bytes(file.read(2), "big")
+                    if marker[1] in JPEG_SOF_MARKERS:
+                        header = file.read(5)
+                        height = int.from_bytes(header[1:3], "big")
+                        width = int.from_bytes(header[3:5], "big")
+                        return (width, height) if width > 0 and height > 0 else None
+                    file.seek(length - 2, os.SEEK_CUR)
+        except OSError:
+            return None
+
+    def read_reduced(image_path, max_dimension):
+        """Декодирование JPEG с уменьшением в 2, 4 или 8 раз, но не меньше max_dimension.
+        Для остальных форматов и небольших изображений возвращает None"""
+        size = ImageReader.read_jpeg_size(image_path)
+        if size is None:
+            return None
+
+        for factor, flag in REDUCED_FLAGS:
+            if max(size) / factor >= max_dimension:
+                return cv.imread(image_path, flag)
+        return None
@@ -0,0 +1,217 @@
+from shared.constants import METRICS_HISTORY, PROFILE_ENV
+from shared.load_library import os
+from shared.load_library import io
+from shared.load_library import json
+from shared.load_library import time
+from shared.load_library import threading
+from shared.load_library import cProfile
+from shared.load_library import pstats
+from shared.load_library import tracemalloc
+from shared.load_library import deque
+
+PROFILE_MODES = (None, "cprofile", "tracemalloc")
+
+class StageTimer:
+    """Замер одного этапа: используется через with metrics.stage(...),
+    изображение можно задать внутри блока через timer.image, дополнительные поля записи - через timer.fields"""
+
+    __slots__ = ("metrics", "name", "image", "fields", "wall", "cpu", "shared")
+
+    def __init__(self, metrics, name, image):
+        self.metrics = metrics
+        self.name = name
+        self.image = image
+        self.fields = None
+        self.shared = False
+
+    def __enter__(self):
+        if self.metrics.profiling == "tracemalloc":
+            self.metrics._enter_traced(self)
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        peak_bytes = self.metrics._exit_traced(self)
+        self.metrics.record(self.name, wall, cpu, self.image, self.fields, peak_bytes)
+        return False
+
+class Metrics:
+
+    def __init__(self, history=METRICS_HISTORY):
+        self.lock = threading.Lock()
+        self.records = deque(maxlen=history)   # Последние записи для экспорта JSON lines
+        self.totals = {}                       # Накопленные значения по этапам
+        self.callbacks = []
+        self.profiling = None
+        self.traced = set()                    # Этапы, выполняющиеся сейчас в режиме tracemalloc
+        self.profiler = None
+
+        # Режим профилирования можно включить без правки констант
+        mode = os.environ.get(PROFILE_ENV) or None
+        if mode in PROFILE_MODES:
+            self.set_profiling(mode)
+        else:
+            print(f"Неизвестный режим профилирования {PROFILE_ENV}={mode}")
+
+    def stage(self, name, image=None):
+        """Контекстный менеджер замера этапа, image - обрабатываемое изображение"""
+        return StageTimer(self, name, image)
+
+    def record(self, name, wall, cpu, image=None, fields=None, peak_bytes=None):
+        """Сохранение записи об этапе и передача её подписчикам;
+        fields - дополнительные поля записи (поле outcome считается по значениям),
+        peak_bytes - пиковый объем памяти процесса за время этапа (режим tracemalloc)"""
+        height, width = image.shape[:2] if image is not None else (0, 0)
+        entry = {"stage": name, "wall": wall, "cpu": cpu, "width": int(width),
+                 "height": int(height), "timestamp": time.time()}
+        if fields is not None:
+            entry.update(fields)
+        if peak_bytes is not None:
+            entry["peak_bytes"] = peak_bytes
+        self.add_records([entry])
+
+    def _enter_traced(self, timer):
+        """Начало этапа в режиме tracemalloc. Пик памяти у tracemalloc один на процесс,
+        поэтому он сбрасывается, только если других этапов сейчас нет; этапы, пересекшиеся
+        по времени (вложенные или в других потоках), помечаются и остаются без peak_bytes"""
+        with self.lock:
+            if self.traced:
+                timer.shared = True
+                for other in self.traced:
+                    other.shared = True
+            else:
+                tracemalloc.reset_peak()
+            self.traced.add(timer)
+
+    def _exit_traced(self, timer):
+        """Конец этапа: пик памяти, если этап выполнялся один, иначе None"""
+        with self.lock:
+            if timer not in self.traced:
+                return None
+            self.traced.discard(timer)
+            if timer.shared is True or not tracemalloc.is_tracing():
+                return None
+            return tracemalloc.get_traced_memory()[1]
+
+    def add_records(self, records):
+        """Добавление готовых записей (например, полученных из процессов пула)"""
+        with self.lock:
+            for entry in records:
+                self.records.append(entry)
+                total = self.totals.setdefault(entry["stage"], {"count": 0, "wall": 0.0, "cpu": 0.0, "pixels": 0})
+                total["count"] += 1
+                total["wall"] += entry["wall"]
+                total["cpu"] += entry["cpu"]
+                total["pixels"] += entry["width"] * entry["height"]
+                if "outcome" in entry:
+                    outcomes = total.setdefault("outcomes", {})
+                    outcomes[entry["outcome"]] = outcomes.get(entry["outcome"], 0) + 1
+            callbacks = list(self.callbacks)
+
+        for callback in callbacks:
+            for entry in records:
+                callback(entry)
+
+    def add_callback(self, callback):
+        """Подписка на записи: callback(entry) вызывается после каждого этапа"""
+        with self.lock:
+            self.callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        with self.lock:
+            self.callbacks.remove(callback)
+
+    def drain(self):
+        """Возвращает накопленные записи и очищает их"""
+        with self.lock:
+            records = list(self.records)
+            self.records.clear()
+        return records
+
+    def reset(self):
+        """Очистка записей и накопленных значений"""
+        with self.lock:
+            self.records.clear()
+            self.totals = {}
+
+    def to_json_lines(self):
+        """Экспорт записей в формате JSON lines"""
+        with self.lock:
+            records = list(self.records)
+        return "".join(json.dumps(entry) + "\n" for entry in records)
+
+    def to_prometheus(self, prefix="document"):
+        """Экспорт накопленных значений в текстовом формате Prometheus"""
+        with self.lock:
+            totals = {name: dict(total, outcomes=dict(total.get("outcomes", {}))) for name, total in self.totals.items()}
+
+        lines = [
+            f"# HELP {prefix}_stage_wall_seconds Wall time of pipeline stages",
+            f"# TYPE {prefix}_stage_wall_seconds summary",
+        ]
+        for name, total in totals.items():
+            lines.append(f'{prefix}_stage_wall_seconds_sum{{stage="{name}"}} {total["wall"]:.6f}')
+            lines.append(f'{prefix}_stage_wall_seconds_count{{stage="{name}"}} {total["count"]}')
+        lines += [
+            f"# HELP {prefix}_stage_cpu_seconds CPU time of pipeline stages",
+            f"# TYPE {prefix}_stage_cpu_seconds summary",
+        ]
+        for name, total in totals.items():
+            lines.append(f'{prefix}_stage_cpu_seconds_sum{{stage="{name}"}} {total["cpu"]:.6f}')
+            lines.append(f'{prefix}_stage_cpu_seconds_count{{stage="{name}"}} {total["count"]}')
+        lines += [
+            f"# HELP {prefix}_stage_pixels_total Pixels handled by pipeline stages",
+            f"# TYPE {prefix}_stage_pixels_total counter",
+        ]
+        for name, total in totals.items():
+            lines.append(f'{prefix}_stage_pixels_total{{stage="{name}"}} {total["pixels"]}')
+        lines += [
+            f"# HELP {prefix}_stage_outcomes_total Outcomes of pipeline stages (e.g. prefilter reject reasons)",
+            f"# TYPE {prefix}_stage_outcomes_total counter",
+        ]
+        for name, total in totals.items():
+            for outcome, count in total["outcomes"].items():
+                lines.append(f'{prefix}_stage_outcomes_total{{stage="{name}",outcome="{outcome}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def estimate_saved(rejected, rejected_time, processed, processed_time):
+        """Оценка времени, сэкономленного предварительной проверкой: отклоненный снимок
+        обрабатывался бы столько же, сколько в среднем обработанный, минус время до отклонения"""
+        if rejected == 0 or processed == 0:
+            return 0.0
+        return max(0.0, rejected * processed_time / processed - rejected_time)
+
+    def set_profiling(self, mode):
+        """Включение профилирования во время работы: None, "cprofile" или "tracemalloc" """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Неизвестный режим профилирования: {mode}")
+
+        # Останавливаем предыдущий режим
+        if self.profiling == "cprofile" and self.profiler is not None:
+            self.profiler.disable()
+        elif self.profiling == "tracemalloc" and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        self.profiling = mode
+        if mode == "cprofile":
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif mode == "tracemalloc":
+            tracemalloc.start()
+
+    def profile_report(self, limit=30):
+        """Текстовый отчет профилировщика для текущего режима"""
+        if self.profiling == "cprofile" and self.profiler is not None:
+            stream = io.StringIO()
+            pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+            return stream.getvalue()
+        if self.profiling == "tracemalloc" and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            return "\n".join(str(stat) for stat in snapshot.statistics("lineno")[:limit])
+        return ""
+
+# Общий экземпляр метрик процесса
+METRICS = Metrics()
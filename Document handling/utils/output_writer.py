@@ -0,0 +1,70 @@
+from shared.constants import OUTPUT_WRITER_THREADS, OUTPUT_QUEUE_SIZE
+from shared.load_library import queue
+from shared.load_library import threading
+
+class OutputWriter:
+    """Фоновая запись результатов: ограниченная очередь и пул потоков.
+    Очередь своя, а не из ThreadPoolExecutor, потому что у того она не ограничена"""
+
+    def __init__(self, threads=OUTPUT_WRITER_THREADS, queue_size=OUTPUT_QUEUE_SIZE):
+        self.tasks = queue.Queue(maxsize=queue_size)  # Задачи записи; при заполнении submit ждет
+        self.lock = threading.Lock()
+        self.written = 0
+        self.failed = 0
+        self.closed = False
+        self.threads = [threading.Thread(target=self._worker, name=f"output-writer-{i}", daemon=True)
+                        for i in range(max(1, threads))]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, function, *args):
+        """Постановка записи в очередь; ждет, только если очередь заполнена"""
+        if self.closed is True:
+            raise RuntimeError("OutputWriter уже закрыт")
+        self.tasks.put((function, args))
+
+    def flush(self):
+        """Ожидание завершения всех поставленных записей"""
+        self.tasks.join()
+
+    def close(self):
+        """Запись оставшихся задач и остановка потоков"""
+        if self.closed is True:
+            return
+        self.flush()
+        self.closed = True
+        for _ in self.threads:
+            self.tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def get_stats(self):
+        with self.lock:
+            return {"written": self.written, "failed": self.failed, "queued": self.tasks.qsize()}
+
+    def _worker(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                self.tasks.task_done()
+                return
+
+            function, args = task
+            try:
+                success = function(*args) is not False
+            except Exception as e:
+                print(f"Ошибка при сохранении: {str(e)}")
+                success = False
+
+            with self.lock:
+                if success:
+                    self.written += 1
+                else:
+                    self.failed += 1
+            self.tasks.task_done()
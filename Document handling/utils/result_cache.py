@@ -0,0 +1,126 @@
+from shared.constants import CACHE_MEMORY_ENTRIES, CACHE_DISK_MAX_BYTES
+from shared.load_library import np
+from shared.load_library import os
+from shared.load_library import hashlib
+from shared.load_library import tempfile
+from shared.load_library import threading
+from shared.load_library import OrderedDict
+
+class ResultCache:
+
+    def __init__(self, disk_path=None, memory_entries=CACHE_MEMORY_ENTRIES,
+                 disk_max_bytes=CACHE_DISK_MAX_BYTES):
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()             # Записи в памяти в порядке использования
+        self.memory_entries = memory_entries    # Максимальное количество записей в памяти
+        self.disk_path = disk_path              # Каталог кэша на диске (None - только память)
+        self.disk_max_bytes = disk_max_bytes    # Максимальный размер кэша на диске
+        self.disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        if self.disk_path is not None:
+            os.makedirs(self.disk_path, exist_ok=True)
+            self.disk_bytes = sum(os.path.getsize(path) for path in self._disk_files())
+
+    def file_digest(image_path):
+        """SHA-256 содержимого файла изображения"""
+        digest = hashlib.sha256()
+        with open(image_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def make_key(*parts):
+        """Ключ записи: хэш изображения (или родительского ключа) и параметры этапа"""
+        return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Запись по ключу (словарь массивов) или None"""
+        with self.lock:
+            value = self.memory.get(key)
+            if value is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = self._disk_get(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._memory_put(key, value)
+        return value
+
+    def put(self, key, value):
+        """Сохранение записи (словарь массивов и чисел) в памяти и на диске"""
+        with self.lock:
+            self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def get_stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "memory_entries": len(self.memory), "disk_bytes": self.disk_bytes}
+
+    def _memory_put(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _disk_files(self):
+        return [os.path.join(self.disk_path, name) for name in os.listdir(self.disk_path)
+                if name.endswith(".npz")]
+
+    def _disk_get(self, key):
+        if self.disk_path is None:
+            return None
+        path = os.path.join(self.disk_path, key + ".npz")
+        try:
+            with np.load(path) as data:
+                value = {name: data[name].item() if data[name].ndim == 0 else data[name]
+                         for name in data.files}
+            # Время изменения файла используется как время последнего обращения
+            os.utime(path)
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key, value):
+        if self.disk_path is None:
+            return
+        path = os.path.join(self.disk_path, key + ".npz")
+
+        # Запись через временный файл, чтобы другие процессы не прочитали неполную запись
+        descriptor, temp_path = tempfile.mkstemp(dir=self.disk_path, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as file:
+            np.savez(file, **value)
+        size = os.path.getsize(temp_path)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(temp_path, path)
+
+        with self.lock:
+            self.disk_bytes += size - old_size
+            if self.disk_bytes > self.disk_max_bytes:
+                self._disk_evict()
+
+    def _disk_evict(self):
+        """Удаление давно не использованных файлов, пока кэш больше допустимого размера"""
+        files = []
+        for path in self._disk_files():
+            try:
+                files.append((os.path.getmtime(path), os.path.getsize(path), path))
+            except OSError:
+                continue
+
+        self.disk_bytes = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if self.disk_bytes <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.disk_bytes -= size
+            except OSError:
+                continue
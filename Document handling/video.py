@@ -0,0 +1,38 @@
+
+from core.video_tracker import VideoTracker
+from utils.file_handler import FileHandler
+from utils.output_writer import OutputWriter
+from shared.load_library import argparse
+from shared.load_library import os
+from shared.load_library import sys
+
+def main():
+    """ Обработка видеофайла или потока с камеры """
+    parser = argparse.ArgumentParser(description="Выделение документов из видеопотока")
+    parser.add_argument("source", help="Путь к видеофайлу или номер камеры")
+    parser.add_argument("--max-frames", type=int, default=0, help="Ограничение количества кадров (0 - без ограничения)")
+    parser.add_argument("--no-save", action="store_true", help="Не сохранять выровненные страницы")
+    args = parser.parse_args()
+
+    print("=== ОБРАБОТКА ВИДЕОПОТОКА ===")
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    name = os.path.splitext(os.path.basename(str(args.source)))[0]
+
+    def save_page(page, frame_index):
+        print(f"Кадр {frame_index}: страница {page.shape[1]}x{page.shape[0]}")
+        if not args.no_save:
+            FileHandler.save_image(image=page, name=f"{name}_{frame_index:06d}", writer=writer)
+
+    # Страницы сохраняются в фоне, чтобы запись не задерживала обработку кадров
+    tracker = VideoTracker()
+    with OutputWriter() as writer:
+        stats = tracker.process_stream(source, callback=save_page, max_frames=args.max_frames)
+    if stats is None:
+        sys.exit(1)
+
+    print(f"Кадров: {stats['frames']}, сегментаций: {stats['detections']}, страниц: {stats['emitted']}")
+    print(f"Время: {stats['elapsed']:.2f}с, fps: {stats['fps']:.1f} (обработка без декодирования: {stats['processing_fps']:.1f})")
+
+if __name__ == "__main__":
+    main()